@@ -0,0 +1,27 @@
+'''
+Throughput of mml2sympy_batch at 1, 2, 4 and 8 workers.
+
+    python -m benchmarks.bench_batch
+'''
+import time
+
+from mml2sympy import mml2sympy_batch
+
+from .documents import mtable_document
+
+
+def main(documents=2000):
+    corpus = [mtable_document(rows=3, terms=4 + index % 5)
+              for index in range(documents)]
+    print('{0:>8} {1:>10} {2:>12}'.format('workers', 'time (s)', 'docs/s'))
+    for workers in [1, 2, 4, 8]:
+        start = time.perf_counter()
+        for _ in mml2sympy_batch(corpus, workers=workers):
+            pass
+        elapsed = time.perf_counter() - start
+        print('{0:>8} {1:>10.3f} {2:>12.1f}'
+              .format(workers, elapsed, documents / elapsed))
+
+
+if __name__ == '__main__':
+    main()
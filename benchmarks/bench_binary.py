@@ -0,0 +1,46 @@
+'''
+Size and decode time of the converted steps of a document stored three
+ways: srepr strings (decoded with sympify), pickled sympy expressions and
+the binary encoding of mml2sympy.binary.
+
+    python -m benchmarks.bench_binary
+'''
+import pickle
+
+from sympy import sympify
+
+from mml2sympy import mml2exprs, mml2sympy
+from mml2sympy.binary import binary2exprs, mml2binary
+
+from .documents import derivation_document, mtable_document, timed
+
+
+def sympify_all(sreprs):
+    return [sympify(s, evaluate=False) for s in sreprs]
+
+
+def main():
+    print('{0:>22} {1:>30} {2:>36}'.format(
+        '', 'size (KB) srepr/pickle/binary', 'decode (ms) sympify/pickle/binary'))
+    cases = [('mtable {0}x{1}'.format(rows, terms), mtable_document(rows, terms))
+             for rows, terms in [(10, 10), (50, 10), (100, 20)]]
+    cases += [('derivation {0}'.format(rows), derivation_document(rows))
+              for rows in [10, 50]]
+    for name, mml in cases:
+        sreprs = mml2sympy(mml)
+        pickled = pickle.dumps(mml2exprs(mml), pickle.HIGHEST_PROTOCOL)
+        encoded = mml2binary(mml)
+        assert binary2exprs(encoded) == sympify_all(sreprs)
+
+        sizes = [sum(len(s.encode('utf-8')) for s in sreprs), len(pickled),
+                 len(encoded)]
+        times = [timed(sympify_all, sreprs, repeat=3),
+                 timed(pickle.loads, pickled, repeat=3),
+                 timed(binary2exprs, encoded, repeat=3)]
+        print('{0:>22} {1:>30} {2:>36}'.format(
+            name, ' / '.join('{0:.1f}'.format(size / 1024) for size in sizes),
+            ' / '.join('{0:.2f}'.format(seconds * 1000) for seconds in times)))
+
+
+if __name__ == '__main__':
+    main()
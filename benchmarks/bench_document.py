@@ -0,0 +1,36 @@
+'''
+Time of getting both the sreprs and the steps of a document: mml2sympy and
+mml2steps, each parsing it, against one ParsedDocument. The parse alone
+(mml2steptrees) is what the ParsedDocument saves once.
+
+    python -m benchmarks.bench_document
+'''
+from mml2sympy import mml2steps, mml2sympy
+from mml2sympy.document import ParsedDocument
+from mml2sympy.mml import mml2steptrees
+
+from .documents import derivation_document, timed
+
+
+def separate(mml):
+    return mml2sympy(mml), mml2steps(mml)
+
+
+def parsed(mml):
+    document = ParsedDocument(mml)
+    return document.sreprs, document.steps
+
+
+def main():
+    print('{0:>6} {1:>10} {2:>12} {3:>16} {4:>16}'.format(
+        'rows', 'KB', 'parse (ms)', 'separate (ms)', 'parsed (ms)'))
+    for rows in [1, 10, 50, 200]:
+        mml = derivation_document(rows)
+        assert separate(mml) == parsed(mml)
+        print('{0:>6} {1:>10.1f} {2:>12.2f} {3:>16.2f} {4:>16.2f}'.format(
+            rows, len(mml) / 1024, timed(mml2steptrees, mml) * 1000,
+            timed(separate, mml) * 1000, timed(parsed, mml) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+'''
+Compares the srepr string + sympify path against building the sympy
+expressions directly with mml2exprs.
+
+    python -m benchmarks.bench_exprs
+'''
+from sympy import sympify
+
+from mml2sympy import mml2sympy, mml2exprs
+
+from .documents import mtable_document, timed
+
+
+def string_path(mml):
+    return [sympify(s, evaluate=False) for s in mml2sympy(mml)]
+
+
+def direct_path(mml):
+    return mml2exprs(mml)
+
+
+def main():
+    print('{0:>6} {1:>6} {2:>12} {3:>12} {4:>8}'
+          .format('rows', 'terms', 'string (s)', 'direct (s)', 'speedup'))
+    for rows, terms in [(10, 10), (50, 10), (100, 20)]:
+        mml = mtable_document(rows, terms)
+        assert string_path(mml) == direct_path(mml)
+        string_time = timed(string_path, mml, repeat=3)
+        direct_time = timed(direct_path, mml, repeat=3)
+        print('{0:>6} {1:>6} {2:>12.4f} {3:>12.4f} {4:>7.1f}x'
+              .format(rows, terms, string_time, direct_time,
+                      string_time / direct_time))
+
+
+if __name__ == '__main__':
+    main()
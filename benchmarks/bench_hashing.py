@@ -0,0 +1,33 @@
+'''
+Time to fingerprint the steps of a document: fingerprint against the
+mml2sympy, sympify and hash(srepr) path it replaces.
+
+    python -m benchmarks.bench_hashing
+'''
+from sympy import srepr, sympify
+
+from mml2sympy import fingerprint, mml2sympy
+
+from .documents import derivation_document, mtable_document, timed
+
+
+def sympy_path(mml):
+    return [hash(srepr(sympify(s, evaluate=False))) for s in mml2sympy(mml)]
+
+
+def main():
+    print('{0:>16} {1:>10} {2:>16} {3:>16} {4:>16}'.format(
+        '', 'KB', 'sympy (ms)', 'fingerprint (ms)', 'memoized (ms)'))
+    cases = [('mtable {0}x{1}'.format(rows, terms), mtable_document(rows, terms))
+             for rows, terms in [(10, 10), (50, 10), (100, 20)]]
+    cases += [('derivation {0}'.format(rows), derivation_document(rows))
+              for rows in [10, 50]]
+    for name, mml in cases:
+        print('{0:>16} {1:>10.1f} {2:>16.2f} {3:>16.2f} {4:>16.2f}'.format(
+            name, len(mml) / 1024, timed(sympy_path, mml, repeat=3) * 1000,
+            timed(fingerprint, mml) * 1000,
+            timed(lambda mml: fingerprint(mml, memoize=True), mml) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+'''
+Latency of single character edits in a 50 row derivation: converting the
+whole document with mml2sympy against IncrementalConverter.edit.
+
+    python -m benchmarks.bench_incremental
+'''
+import random
+import time
+
+from mml2sympy import mml2sympy
+from mml2sympy.incremental import IncrementalConverter
+
+from .documents import derivation_document
+
+ROWS = 50
+EDITS = 100
+
+
+def digit_positions(mml):
+    ' ~> returns the offsets of the digits inside mn elements '
+    positions = []
+    start = mml.find('<mn>')
+    while start != -1:
+        end = mml.index('</mn>', start)
+        positions.extend(i for i in range(start, end) if mml[i].isdigit())
+        start = mml.find('<mn>', end)
+    return positions
+
+
+def main():
+    mml = derivation_document(ROWS, terms=5)
+    rng = random.Random(0)
+    edits = [(position, str(rng.randint(1, 9)))
+             for position in rng.sample(digit_positions(mml), EDITS)]
+
+    converter = IncrementalConverter()
+    converter.update(mml)
+    full, incremental = [], []
+    for position, digit in edits:
+        start = time.perf_counter()
+        expected = mml2sympy(converter.mml[:position] + digit +
+                             converter.mml[position + 1:])
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        sreprs = converter.edit(position, position + 1, digit)
+        incremental.append(time.perf_counter() - start)
+        assert sreprs == expected
+
+    print('{0} single digit edits of a {1} row derivation ({2:.0f} KB)'
+          .format(EDITS, ROWS, len(mml) / 1024))
+    for name, times in [('mml2sympy', full), ('incremental', incremental)]:
+        times.sort()
+        print('{0:>12}: median {1:.2f} ms, p95 {2:.2f} ms'.format(
+            name, times[len(times) // 2] * 1000,
+            times[int(len(times) * 0.95)] * 1000))
+    print('rows converted {0}, reused {1}'.format(converter.rows_converted,
+                                                  converter.rows_reused))
+
+
+if __name__ == '__main__':
+    main()
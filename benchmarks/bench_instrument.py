@@ -0,0 +1,32 @@
+'''
+Cost of instrumentation: per document time with no hooks, with a
+StatsAggregator hook, and the per stage breakdown it collects.
+
+    python -m benchmarks.bench_instrument
+'''
+from mml2sympy import instrument, mml2sympy
+from mml2sympy.instrument import StatsAggregator
+
+from .documents import derivation_document, timed
+
+
+def main():
+    mml = derivation_document(rows=20, terms=5)
+    off = timed(mml2sympy, mml, repeat=20)
+
+    aggregator = StatsAggregator()
+    instrument.add_hook(aggregator)
+    try:
+        on = timed(mml2sympy, mml, repeat=20)
+    finally:
+        instrument.remove_hook(aggregator)
+
+    print('{0:>10} {1:>10} {2:>10}'.format('off (ms)', 'on (ms)', 'overhead'))
+    print('{0:>10.3f} {1:>10.3f} {2:>9.1f}%'.format(
+        off * 1000, on * 1000, (on - off) / off * 100))
+    print()
+    print(aggregator.expose(), end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+'''
+Cost of the limits of mml2sympy.limits: mml2sympy on a normal derivation
+with and without limits, and the time to reject pathological documents
+against the time to convert them.
+
+    python -m benchmarks.bench_limits
+'''
+from mml2sympy import MMLLimitError, mml2sympy
+from mml2sympy.limits import Limits, limited
+
+from .documents import derivation_document, linear_row, nested_document, timed
+
+LIMITS = Limits(max_nodes=20000, max_depth=100, max_leaf_length=1000,
+                max_seconds=10)
+
+
+def limited_mml2sympy(mml):
+    with limited(LIMITS):
+        try:
+            return mml2sympy(mml)
+        except MMLLimitError:
+            return None
+
+
+def main():
+    cases = [
+        ('derivation 50', derivation_document(50)),
+        ('nested 600', nested_document(600)),
+        ('mrow 100000 terms', '<math><mstyle>{0}</mstyle></math>'.format(
+            linear_row(0, 100000))),
+        ('mn 100000 digits', '<math><mstyle><mn>{0}</mn></mstyle></math>'
+         .format('9' * 100000)),
+    ]
+    print('{0:>20} {1:>10} {2:>16} {3:>16}'.format(
+        '', 'KB', 'no limits (ms)', 'limits (ms)'))
+    for name, mml in cases:
+        print('{0:>20} {1:>10.1f} {2:>16.2f} {3:>16.2f}'.format(
+            name, len(mml) / 1024, timed(mml2sympy, mml, repeat=3) * 1000,
+            timed(limited_mml2sympy, mml, repeat=3) * 1000))
+
+
+if __name__ == '__main__':
+    main()
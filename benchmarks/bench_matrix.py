@@ -0,0 +1,37 @@
+'''
+Conversion time of parsed numeric matrices through the NumPy fast path of
+table2matrix against building the sympy ImmutableMatrix.
+
+    python -m benchmarks.bench_matrix
+'''
+import random
+
+from mml2sympy.matrix import table2matrix
+from mml2sympy.mml import mml2tree
+
+from .documents import timed
+
+
+def matrix_table(size, seed=0):
+    rng = random.Random(seed)
+    rows = ''.join('<mtr>{0}</mtr>'.format(''.join(
+        '<mtd><mn> {0} </mn></mtd>'.format(rng.randint(-99, 99))
+        for _ in range(size))) for _ in range(size))
+    return '<mtable>{0}</mtable>'.format(rows)
+
+
+def main():
+    print('{0:>6} {1:>10} {2:>12} {3:>12} {4:>8}'
+          .format('size', 'cells', 'numpy (s)', 'sympy (s)', 'speedup'))
+    for size in [10, 50, 100, 200]:
+        mtable = mml2tree(matrix_table(size))
+        numeric = timed(lambda: table2matrix(mtable), repeat=3)
+        symbolic = timed(lambda: table2matrix(mtable, numeric=False),
+                         repeat=3)
+        print('{0:>6} {1:>10} {2:>12.4f} {3:>12.4f} {4:>7.1f}x'
+              .format(size, size * size, numeric, symbolic,
+                      symbolic / numeric))
+
+
+if __name__ == '__main__':
+    main()
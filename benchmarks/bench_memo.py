@@ -0,0 +1,36 @@
+'''
+Reuse ratio and time saved by SubtreeMemo on long derivations, where
+each mtable row repeats most of the previous row.
+
+    python -m benchmarks.bench_memo
+'''
+from mml2sympy.mml import (SubtreeMemo, mml2sympy, mml2exprs, mml2steptrees,
+                           modify, tree2sympy)
+
+from .documents import derivation_document, timed
+
+
+def reuse_ratio(mml):
+    memo = SubtreeMemo()
+    for step_tree in mml2steptrees(mml):
+        tree2sympy(modify(step_tree), memo=memo)
+    return memo.reuse_ratio()
+
+
+def main():
+    print('{0:>6} {1:>6} {2:>7} {3:>18} {4:>18}'
+          .format('rows', 'terms', 'hits', 'mml2sympy (s)', 'mml2exprs (s)'))
+    for rows, terms in [(5, 5), (20, 5), (50, 10), (100, 20)]:
+        mml = derivation_document(rows, terms)
+        assert mml2sympy(mml) == mml2sympy(mml, memoize=True)
+        times = []
+        for convert in [mml2sympy, mml2exprs]:
+            plain = timed(convert, mml, repeat=3)
+            memoized = timed(lambda: convert(mml, memoize=True), repeat=3)
+            times.append('{0:.3f} -> {1:.3f}'.format(plain, memoized))
+        print('{0:>6} {1:>6} {2:>7.1%} {3:>18} {4:>18}'
+              .format(rows, terms, reuse_ratio(mml), *times))
+
+
+if __name__ == '__main__':
+    main()
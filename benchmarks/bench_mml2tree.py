@@ -0,0 +1,47 @@
+'''
+Parse stage cost per KB: mml2tree on str, bytes and memoryview documents,
+with and without a MathML namespace declaration, against the old front end
+(a namespace text substitution, a str parse and a deannotate pass).
+
+    python -m benchmarks.bench_mml2tree
+'''
+from lxml import objectify
+
+from mml2sympy.mml import _parser, mml2tree
+
+from .documents import derivation_document, timed
+
+
+def substituted_mml2tree(mml):
+    ' mml2tree as it was before it took bytes '
+    tree = objectify.fromstring(
+        mml.replace(' xmlns="', ' xmlnamespace="'), _parser)
+    objectify.deannotate(tree, cleanup_namespaces=True)
+    return tree
+
+
+def per_kb(func, document, size):
+    return '{0:.1f}'.format(timed(func, document, repeat=5) * 1e6 / size)
+
+
+def main():
+    print('{0:>6} {1:>8} {2:>8} {3:>14} {4:>14} {5:>14} {6:>14}'.format(
+        'rows', 'xmlns', 'KB', 'old (us/KB)', 'str (us/KB)', 'bytes (us/KB)',
+        'view (us/KB)'))
+    for rows in [1, 10, 100, 1000]:
+        namespaced = derivation_document(rows)
+        plain = namespaced.replace(
+            ' xmlns="http://www.w3.org/1998/Math/MathML"', '')
+        for xmlns, document in [('yes', namespaced), ('no', plain)]:
+            data = document.encode('utf-8')
+            size = len(data) / 1024
+            print('{0:>6} {1:>8} {2:>8.1f} {3:>14} {4:>14} {5:>14} {6:>14}'
+                  .format(rows, xmlns, size,
+                          per_kb(substituted_mml2tree, document, size),
+                          per_kb(mml2tree, document, size),
+                          per_kb(mml2tree, data, size),
+                          per_kb(mml2tree, memoryview(data), size)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+'''
+Time and peak memory of the modify stage on deeply nested mrow/mfenced
+documents. Both should grow linearly with the nesting depth.
+
+    python -m benchmarks.bench_modify
+'''
+import tracemalloc
+
+from mml2sympy import mml2sympy
+from mml2sympy.mml import mml2steptrees, modify
+
+from .documents import nested_document, timed
+
+
+ROW_ELEMENTS = ["mrow", "mfenced", "mstyle", "mtr", "mtd"]
+
+
+def modify_all(mml):
+    ''' Parses mml and runs modify over every nested row, like tree2sympy '''
+    def walk(tree):
+        if tree.tag in ROW_ELEMENTS and len(tree.getchildren()) > 1:
+            modify(tree)
+        for child in tree.getchildren():
+            walk(child)
+
+    for step_tree in mml2steptrees(mml):
+        walk(step_tree)
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    print('{0:>6} {1:>12} {2:>14} {3:>12} {4:>14}'
+          .format('depth', 'modify (s)', 'per level (us)', 'peak (KB)',
+                  'mml2sympy (s)'))
+    for depth in [15, 30, 60, 120]:
+        mml = nested_document(depth)
+        modify_time = timed(modify_all, mml)
+        convert_time = timed(mml2sympy, mml)
+        peak = peak_memory(modify_all, mml)
+        print('{0:>6} {1:>12.5f} {2:>14.1f} {3:>12.1f} {4:>14.5f}'
+              .format(depth, modify_time, modify_time / depth * 1e6,
+                      peak / 1024, convert_time))
+
+
+if __name__ == '__main__':
+    main()
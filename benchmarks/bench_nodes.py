@@ -0,0 +1,69 @@
+'''
+Memory per node and conversion time of the Node tree against the
+lxml objectify tree it is built from.
+
+    python -m benchmarks.bench_nodes
+'''
+import gc
+import os
+
+from mml2sympy.mml import mml2steptrees, mml2tree, modify, tree2sympy
+from mml2sympy.nodes import element2node
+
+from .documents import derivation_document, timed
+
+COPIES = 200
+
+
+def resident_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+
+def bytes_per_node(build, mml, nodes):
+    gc.collect()
+    before = resident_bytes()
+    trees = [build(mml) for _ in range(COPIES)]
+    gc.collect()
+    used = resident_bytes() - before
+    del trees
+    return used / (nodes * COPIES)
+
+
+def objectify_tree(mml):
+    ' The parsed tree with the proxies the converters hold while walking. '
+    tree = mml2tree(mml)
+    return list(tree.iter())
+
+
+def objectify_path(mml):
+    return [tree2sympy(modify(step_tree)) for step_tree in mml2steptrees(mml)]
+
+
+def node_path(mml):
+    return [tree2sympy(modify(element2node(step_tree)))
+            for step_tree in mml2steptrees(mml)]
+
+
+def main():
+    print('{0:>6} {1:>8} {2:>14} {3:>14} {4:>14} {5:>14}'
+          .format('rows', 'nodes', 'objectify B/n', 'Node B/n',
+                  'objectify (s)', 'Node (s)'))
+    for rows, terms in [(5, 5), (20, 10), (50, 20)]:
+        mml = derivation_document(rows, terms)
+        assert objectify_path(mml) == node_path(mml)
+        nodes = count_nodes(element2node(mml2tree(mml)))
+        objectify_memory = bytes_per_node(objectify_tree, mml, nodes)
+        node_memory = bytes_per_node(
+            lambda mml: element2node(mml2tree(mml)), mml, nodes)
+        print('{0:>6} {1:>8} {2:>14.1f} {3:>14.1f} {4:>14.4f} {5:>14.4f}'
+              .format(rows, nodes, objectify_memory, node_memory,
+                      timed(objectify_path, mml), timed(node_path, mml)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+'''
+Points per second of a compiled step against sympify + subs/evalf per
+point, the way graders used to check answers.
+
+    python -m benchmarks.bench_numeric
+'''
+import random
+import time
+
+import numpy
+from sympy import Symbol, sympify
+
+from mml2sympy import mml2sympy
+from mml2sympy.numeric import mml2funcs
+
+from .documents import derivation_document
+
+
+def subs_points_per_second(srepr, names, points):
+    expr = sympify(srepr, evaluate=False)
+    expr = expr.lhs - expr.rhs
+    symbols = [Symbol(name) for name in names]
+    start = time.perf_counter()
+    for point in points:
+        expr.subs(dict(zip(symbols, point))).evalf()
+    return len(points) / (time.perf_counter() - start)
+
+
+def compiled_points_per_second(step, points):
+    start = time.perf_counter()
+    step.evaluate(points)
+    return len(points) / (time.perf_counter() - start)
+
+
+def main():
+    mml = derivation_document(rows=1, terms=5)
+    step = mml2funcs(mml)[0]
+    srepr = mml2sympy(mml)[0]
+    rng = random.Random(0)
+    print('{0:>8} {1:>14} {2:>16}'.format('points', 'subs (pt/s)',
+                                           'compiled (pt/s)'))
+    for count in [100, 1000, 100000]:
+        points = numpy.array([[rng.uniform(1, 2) for _ in step.symbols]
+                              for _ in range(count)])
+        subs = subs_points_per_second(srepr, step.symbols, points[:200])
+        compiled = compiled_points_per_second(step, points)
+        print('{0:>8} {1:>14.0f} {2:>16.0f}'.format(count, subs, compiled))
+
+
+if __name__ == '__main__':
+    main()
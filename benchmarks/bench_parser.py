@@ -0,0 +1,27 @@
+'''
+Time of the precedence parser in modify on single rows of increasing
+width. The time per element should stay flat.
+
+    python -m benchmarks.bench_parser
+'''
+from mml2sympy.mml import mml2tree, modify
+
+from .documents import linear_row, timed
+
+
+def main():
+    print('{0:>8} {1:>10} {2:>12} {3:>16}'
+          .format('terms', 'elements', 'modify (s)', 'per element (us)'))
+    for terms in [10, 100, 1000, 10000]:
+        mtd = '<mtd>{0}</mtd>'.format(linear_row(0, terms))
+        elements = len(mml2tree(mtd).getchildren())
+        # modify regroups in place, so parse a fresh tree for every run
+        modify_time = timed(lambda: modify(mml2tree(mtd))) - \
+            timed(lambda: mml2tree(mtd))
+        print('{0:>8} {1:>10} {2:>12.5f} {3:>16.2f}'
+              .format(terms, elements, modify_time,
+                      modify_time / elements * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''
+Time per step pair of check_steps against simplifying every pair with
+sympy, and how many pairs each tier decides.
+
+    python -m benchmarks.bench_steps
+'''
+import time
+
+from sympy import simplify
+
+from mml2sympy import mml2exprs
+from mml2sympy.steps import TierStats, check_steps
+
+from .documents import derivation_document
+
+
+def simplify_all(mml):
+    exprs = mml2exprs(mml)
+    for previous, current in zip(exprs, exprs[1:]):
+        simplify((previous.lhs - previous.rhs) / (current.lhs - current.rhs))
+
+
+def main():
+    print('{0:>6} {1:>16} {2:>18}  {3}'.format(
+        'rows', 'tiered (ms/pair)', 'simplify (ms/pair)', 'decided by'))
+    for rows in [5, 20]:
+        mml = derivation_document(rows, terms=3)
+        stats = TierStats()
+        start = time.perf_counter()
+        check_steps(mml, stats=stats)
+        tiered = (time.perf_counter() - start) * 1000 / (rows - 1)
+        start = time.perf_counter()
+        simplify_all(mml)
+        simplified = (time.perf_counter() - start) * 1000 / (rows - 1)
+        print('{0:>6} {1:>16.2f} {2:>18.2f}  {3}'.format(
+            rows, tiered, simplified, stats.decided))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+'''
+Peak memory of mml2sympy_stream over archives of growing size. Each
+size runs in a fresh interpreter so ru_maxrss is not shared; the peak
+should stay flat while the archive grows.
+
+    python -m benchmarks.bench_stream
+'''
+import os
+import subprocess
+import sys
+import tempfile
+
+from .documents import mtable_document
+
+CHILD = '''
+import resource, sys, time
+from mml2sympy import mml2sympy_stream
+start = time.perf_counter()
+count = sum(1 for _ in mml2sympy_stream(sys.argv[1]))
+elapsed = time.perf_counter() - start
+print(count, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def write_archive(path, documents):
+    answer = '<answer>{0}</answer>'.format(mtable_document(rows=3, terms=4))
+    with open(path, 'w') as f:
+        f.write('<answers>')
+        for _ in range(documents):
+            f.write(answer)
+        f.write('</answers>')
+
+
+def main():
+    print('{0:>10} {1:>10} {2:>10} {3:>14}'
+          .format('documents', 'size (MB)', 'time (s)', 'peak RSS (MB)'))
+    with tempfile.TemporaryDirectory() as directory:
+        for documents in [1000, 4000, 16000]:
+            path = os.path.join(directory, 'archive.xml')
+            write_archive(path, documents)
+            output = subprocess.check_output(
+                [sys.executable, '-c', CHILD, path]).decode('utf-8')
+            count, elapsed, peak = output.split()
+            print('{0:>10} {1:>10.1f} {2:>10.2f} {3:>14.1f}'
+                  .format(int(count), os.path.getsize(path) / 2 ** 20,
+                          float(elapsed), int(peak) / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+'''
+Explicit-stack tree2sympy and modify against the recursive versions they
+replaced, on nested msqrt/mfenced documents and on flat runs of mo
+fences. The recursive versions fail once the depth nears the recursion
+limit.
+
+    python -m benchmarks.bench_walkers
+'''
+from mml2sympy.mml import (CLOSE_FENCES, DIV_OPS_TAG, IMPLICIT_MUL_POWER,
+                           LEAF_FLOAT, LEAF_INTEGER, MINUS_SIGN, MUL_OPS_TAG,
+                           OPEN_FENCES, PLUS_SIGN, SKIP_ELEMENTS, UNARY_POWER,
+                           _classify_leaf, _negative_one_node, _op_precedence,
+                           _op_text, _PrecedenceParser, modify, tree2sympy)
+from mml2sympy.nodes import Node
+
+from .documents import timed
+
+
+class RecursiveParser(_PrecedenceParser):
+    ' The recursive precedence climbing of modify before the rewrite. '
+
+    def prefix(self):
+        element = self.elements[self.pos]
+        self.pos += 1
+        op = _op_text(element)
+        if op is None:
+            return element
+        elif op == PLUS_SIGN:
+            return self.expression(UNARY_POWER)
+        elif op == MINUS_SIGN:
+            return self.negate(self.expression(UNARY_POWER))
+        grouped = self.expression(0)
+        self.pos += 1
+        return grouped
+
+    def expression(self, min_power):
+        left = self.prefix()
+        chain = None
+        operands = None
+        while self.pos < len(self.elements):
+            element = self.elements[self.pos]
+            op = _op_text(element)
+            implicit = op is None or op in OPEN_FENCES
+            if op in CLOSE_FENCES:
+                break
+            elif implicit:
+                power, tag = IMPLICIT_MUL_POWER, MUL_OPS_TAG
+            else:
+                power, tag = _op_precedence(element, op)
+            if power <= min_power:
+                break
+            if not implicit:
+                self.pos += 1
+            right = self.expression(power)
+            if op == MINUS_SIGN:
+                right = self.negate(right)
+            if chain == (power, tag):
+                operands.append(right)
+                continue
+            if chain is not None:
+                left = self.make(chain[1], operands)
+            if tag == DIV_OPS_TAG:
+                left = self.make(tag, [left, right])
+                chain = None
+            else:
+                operands = [left, right]
+                chain = (power, tag)
+        if chain is not None:
+            left = self.make(chain[1], operands)
+        return left
+
+
+def recursive_modify(node):
+    children = RecursiveParser(node.children, Node.make,
+                               _negative_one_node).parse()
+    return node._replace(children=tuple(children))
+
+
+def recursive_tree2sympy(tree, evaluate=False):
+    ' The recursive tree2sympy before the rewrite, without the memo. '
+    children = tree.getchildren()
+    close = ',evaluate={0})'.format(evaluate)
+    if tree.tag in ('madd', 'mmul'):
+        return ('Add(' if tree.tag == 'madd' else 'Mul(') + ''.join(
+            recursive_tree2sympy(child) + ',' for child in children) + close[1:]
+    elif tree.tag == 'meq':
+        return ('Eq(' + recursive_tree2sympy(children[0]) + ',' +
+                recursive_tree2sympy(children[1]) + close)
+    elif tree.tag == 'msup':
+        return ('Pow(' + recursive_tree2sympy(children[0]) + ',' +
+                recursive_tree2sympy(children[1]) + close)
+    elif tree.tag == 'mfrac':
+        return ('Mul(' + recursive_tree2sympy(children[0]) + ',Pow(' +
+                recursive_tree2sympy(children[1]) + ',Integer(-1))' + close)
+    elif tree.tag == 'msqrt':
+        return ('Pow(' + recursive_tree2sympy(children[0]) +
+                ',Rational(1,2)' + close)
+    elif tree.tag in SKIP_ELEMENTS:
+        if len(children) > 1:
+            return recursive_tree2sympy(recursive_modify(tree), evaluate)
+        return ''.join(recursive_tree2sympy(child) for child in children)
+    elif tree.tag in ('mn', 'mi'):
+        kind, content = _classify_leaf(tree.text)
+        if kind == LEAF_INTEGER:
+            return 'Integer(' + content + ')'
+        elif kind == LEAF_FLOAT:
+            return "Float('" + content + "', prec = 15)"
+        return "Symbol('" + content + "')"
+    return ''
+
+
+def nested_roots(depth):
+    ' mtd(msqrt(mrow(x + 1 + msqrt(mrow(...))))) as a Node tree '
+    node = Node.leaf('mi', 'x')
+    for _ in range(depth):
+        node = Node.make('msqrt', [Node.make('mrow', [
+            Node.leaf('mi', 'x'), Node.leaf('mo', '+'),
+            Node.leaf('mn', '1'), Node.leaf('mo', '+'), node])])
+    return Node.make('mtd', [node])
+
+
+def flat_fences(depth):
+    ' mtd(( ( ( ... x + 1 ) ) )) as a Node tree '
+    return Node.make('mtd', [Node.leaf('mo', '(')] * depth + [
+        Node.leaf('mi', 'x'), Node.leaf('mo', '+'), Node.leaf('mn', '1')] +
+        [Node.leaf('mo', ')')] * depth)
+
+
+def best(func, *args):
+    try:
+        return '{0:.5f}'.format(timed(func, *args))
+    except RecursionError:
+        return 'RecursionError'
+
+
+def main():
+    print('{0:>8} {1:>20} {2:>16} {3:>16}'.format(
+        'depth', 'case', 'recursive (s)', 'explicit (s)'))
+    for depth in [10, 100, 400, 2000, 10000]:
+        tree = nested_roots(depth)
+        print('{0:>8} {1:>20} {2:>16} {3:>16}'.format(
+            depth, 'tree2sympy(msqrt)', best(recursive_tree2sympy, tree),
+            best(tree2sympy, tree)))
+        tree = flat_fences(depth)
+        print('{0:>8} {1:>20} {2:>16} {3:>16}'.format(
+            depth, 'modify(mo fences)', best(recursive_modify, tree),
+            best(modify, tree)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+'''
+Time per output KB of tree2sympy, which writes its pieces to one list,
+against joining the children's strings at every level as before, on
+deep msqrt chains and wide madd rows. Also streams the deepest tree to
+a file.
+
+    python -m benchmarks.bench_writer
+'''
+import os
+import tempfile
+
+from mml2sympy.mml import tree2sympy
+from mml2sympy.nodes import Node
+
+from .bench_walkers import nested_roots, recursive_tree2sympy
+from .documents import timed
+
+
+def wide_row(width):
+    ' mtd(madd(2 x0, 3 x1, ...)) as a modified Node tree '
+    return Node.make('mtd', [Node.make('madd', [
+        Node.make('mmul', [Node.leaf('mn', str(term + 2)),
+                           Node.leaf('mi', 'x{0}'.format(term))])
+        for term in range(width)])])
+
+
+def per_kb(func, tree, size):
+    try:
+        return '{0:.1f}'.format(timed(func, tree, repeat=3) * 1e6 / size)
+    except RecursionError:
+        return 'RecursionError'
+
+
+def main():
+    print('{0:>20} {1:>10} {2:>16} {3:>16}'.format(
+        'tree', 'KB', 'joined (us/KB)', 'writer (us/KB)'))
+    cases = [('msqrt depth {0}'.format(depth), nested_roots(depth))
+             for depth in [100, 300, 1000, 3000]]
+    cases += [('madd width {0}'.format(width), wide_row(width))
+              for width in [100, 1000, 10000, 100000]]
+    for name, tree in cases:
+        size = len(tree2sympy(tree)) / 1024
+        print('{0:>20} {1:>10.1f} {2:>16} {3:>16}'.format(
+            name, size, per_kb(recursive_tree2sympy, tree, size),
+            per_kb(tree2sympy, tree, size)))
+
+    tree = nested_roots(10000)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'srepr.txt')
+        with open(path, 'w') as out:
+            seconds = timed(lambda: tree2sympy(tree, out=out), repeat=1)
+        size = os.path.getsize(path) / 1024
+    print('streamed msqrt depth 10000: {0:.1f} KB in {1:.3f} s'.format(
+        size, seconds))
+
+
+if __name__ == '__main__':
+    main()
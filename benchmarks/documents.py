@@ -0,0 +1,95 @@
+'''
+Helpers for building MathML documents used by the benchmarks.
+'''
+
+MATH_TEMPLATE = '''
+<math xmlns="http://www.w3.org/1998/Math/MathML">
+  <mstyle displaystyle="true">
+{0}
+  </mstyle>
+</math>
+'''
+
+MTABLE_TEMPLATE = '''
+    <mtable columnalign="left">
+{0}
+    </mtable>
+'''
+
+MTR_TEMPLATE = '''
+      <mtr>
+        <mtd>
+{0}
+        </mtd>
+      </mtr>
+'''
+
+
+def linear_row(index, terms):
+    ''' Builds the mml for a row like 2 x1 - 3 x2 + ... = index '''
+    parts = []
+    for term in range(terms):
+        if term:
+            parts.append('<mo> {0} </mo>'.format('+-'[term % 2]))
+        parts.append('<mn> {0} </mn><mi> x{1} </mi>'.format(term + 2, term))
+    parts.append('<mo> = </mo>')
+    parts.append('<mfrac><mrow><mn> {0} </mn></mrow>'
+                 '<mrow><mn> 2 </mn></mrow></mfrac>'.format(index + 1))
+    return ''.join(parts)
+
+
+def mtable_document(rows, terms=10):
+    ''' Builds a multi-step mtable document with rows of linear equations '''
+    mtrs = ''.join(MTR_TEMPLATE.format(linear_row(index, terms))
+                   for index in range(rows))
+    return MATH_TEMPLATE.format(MTABLE_TEMPLATE.format(mtrs))
+
+
+def timed(func, *args, repeat=5):
+    ''' Returns the best wall time in seconds of repeat calls to func '''
+    import time
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def nested_document(depth):
+    ''' Builds a document of depth nested mfenced rows: 1 + (2 + (3 + ...)) '''
+    opening = ''.join('<mrow><mn> {0} </mn><mo> + </mo><mfenced>'
+                      .format(level + 1) for level in range(depth))
+    closing = '</mfenced></mrow>' * depth
+    return MATH_TEMPLATE.format(opening + '<mi> x </mi>' + closing)
+
+
+def fraction(terms, offset=0):
+    ''' Builds an mfrac of two nested polynomial rows '''
+    def polynomial(start):
+        parts = []
+        for term in range(terms):
+            if term:
+                parts.append('<mo> + </mo>')
+            parts.append('<mn> {0} </mn><msup><mi> x </mi><mn> {1} </mn>'
+                         '</msup>'.format(start + term, term + 1))
+        return '<mrow>{0}</mrow>'.format(''.join(parts))
+
+    return '<mfrac>{0}{1}</mfrac>'.format(polynomial(offset + 1),
+                                         polynomial(offset + 2))
+
+
+def derivation_document(rows, terms=10):
+    '''
+    Builds a long derivation where each row keeps the fractions of the
+    previous one and only changes its right hand side, like
+    2x - 4 = 7 followed by 2x = 11
+    '''
+    left = ''.join('<mfenced><mrow>{0}</mrow></mfenced><mo> + </mo>'
+                   .format(fraction(terms, offset)) for offset in range(3))
+    mtrs = ''.join(MTR_TEMPLATE.format(
+        '{0}<mi> y </mi><mo> = </mo><mn> {1} </mn>'.format(left, row))
+        for row in range(rows))
+    return MATH_TEMPLATE.format(MTABLE_TEMPLATE.format(mtrs))
@@ -0,0 +1,106 @@
+'''
+Seeded generator of random presentation MathML documents that mml2sympy
+can convert, for the benchmark suite.
+
+    >>> from benchmarks.generator import MathMLGenerator
+    >>> generator = MathMLGenerator(seed=1, depth=3, width=4, rows=5)
+    >>> mml = generator.document()
+'''
+import random
+
+from .documents import MATH_TEMPLATE, MTABLE_TEMPLATE, MTR_TEMPLATE
+
+# probability that an operand is each kind of layout element rather
+# than a leaf (while the depth allows it)
+DEFAULT_DENSITY = {
+    'mfrac': 0.2,
+    'msup': 0.2,
+    'msqrt': 0.1,
+    'mfenced': 0.15,
+}
+
+SYMBOLS = ['x', 'y', 'z', 'a', 'b', 'θ']
+OPERATORS = ['+', '-', '×', '/']
+
+
+class MathMLGenerator(object):
+    '''
+    Builds random documents: rows (one step each, in a mtable when there
+    is more than one) of an equation between two expressions. An
+    expression has 1 to width operands separated by operators, and each
+    operand is a leaf or, while depth is left, one of the layout
+    elements of density holding smaller expressions.
+    '''
+
+    def __init__(self, seed=0, depth=3, width=4, rows=1, density=None):
+        self.random = random.Random(seed)
+        self.depth = depth
+        self.width = width
+        self.rows = rows
+        self.density = dict(DEFAULT_DENSITY if density is None else density)
+        if depth < 0 or width < 1 or rows < 1:
+            raise ValueError('depth must be at least 0, width and rows at '
+                             'least 1')
+        if sum(self.density.values()) > 1:
+            raise ValueError('the densities must add up to at most 1')
+
+    def document(self):
+        rows = [self.row() for _ in range(self.rows)]
+        if len(rows) == 1:
+            return MATH_TEMPLATE.format(rows[0])
+        mtrs = ''.join(MTR_TEMPLATE.format(row) for row in rows)
+        return MATH_TEMPLATE.format(MTABLE_TEMPLATE.format(mtrs))
+
+    def documents(self, count):
+        return [self.document() for _ in range(count)]
+
+    def row(self):
+        return '{0}<mo> = </mo>{1}'.format(self.expression(self.depth),
+                                            self.expression(self.depth))
+
+    def expression(self, depth):
+        parts = [self.operand(depth)]
+        for _ in range(self.random.randint(1, self.width) - 1):
+            parts.append('<mo> {0} </mo>'.format(
+                self.random.choice(OPERATORS)))
+            parts.append(self.operand(depth))
+        return ''.join(parts)
+
+    def operand(self, depth):
+        if depth > 0:
+            pick = self.random.random()
+            for tag, density in sorted(self.density.items()):
+                if pick < density:
+                    return getattr(self, tag)(depth - 1)
+                pick -= density
+        return self.leaf()
+
+    def leaf(self):
+        kind = self.random.random()
+        if kind < 0.4:
+            return '<mn> {0} </mn>'.format(self.random.randint(1, 99))
+        if kind < 0.5:
+            return '<mn> {0:.2f} </mn>'.format(self.random.uniform(0, 10))
+        if kind < 0.8:
+            return '<mi> {0} </mi>'.format(self.random.choice(SYMBOLS))
+        return '<mn> {0} </mn><mi> {1} </mi>'.format(
+            self.random.randint(2, 9), self.random.choice(SYMBOLS))
+
+    def mrow(self, depth):
+        return '<mrow>{0}</mrow>'.format(self.expression(depth))
+
+    def mfrac(self, depth):
+        return '<mfrac>{0}{1}</mfrac>'.format(self.mrow(depth),
+                                              self.mrow(depth))
+
+    def msup(self, depth):
+        base = ('<mi> {0} </mi>'.format(self.random.choice(SYMBOLS))
+                if self.random.random() < 0.5 else self.mfenced(depth))
+        return '<msup>{0}<mn> {1} </mn></msup>'.format(
+            base, self.random.randint(2, 4))
+
+    def msqrt(self, depth):
+        return '<msqrt>{0}</msqrt>'.format(self.mrow(depth))
+
+    def mfenced(self, depth):
+        return '<mfenced>{0}</mfenced>'.format(self.mrow(depth))
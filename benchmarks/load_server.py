@@ -0,0 +1,113 @@
+'''
+Load test of the HTTP server on localhost: starts mml2sympy.server in a
+subprocess and sends requests from concurrent keep-alive connections,
+then reports throughput, latency percentiles and response statuses.
+
+    python -m benchmarks.load_server [--requests 2000] [--concurrency 32]
+'''
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from .documents import mtable_document
+
+
+async def client(port, payloads, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while payloads:
+            body = payloads.pop()
+            start = time.perf_counter()
+            writer.write('POST /mml2sympy HTTP/1.1\r\nContent-Length: {0}\r\n'
+                         '\r\n'.format(len(body)).encode('latin-1') + body)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.lower().split(b'content-length:')[1]
+                         .split(b'\r\n')[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[int(head.split(b' ')[1])] += 1
+            if b'connection: close' in head.lower():
+                break
+    finally:
+        writer.close()
+
+
+async def load(port, payloads, concurrency):
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*[client(port, payloads, latencies, statuses)
+                           for _ in range(concurrency)])
+    return time.perf_counter() - start, sorted(latencies), statuses
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('the server did not start')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--batch', type=int, default=1,
+                        help='documents per request')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pending', type=int, default=None)
+    parser.add_argument('--max-queued', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    command = [sys.executable, '-m', 'mml2sympy.server', '--port', str(port)]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    if args.max_pending:
+        command += ['--max-pending', str(args.max_pending)]
+    if args.max_queued is not None:
+        command += ['--max-queued', str(args.max_queued)]
+    server = subprocess.Popen(command)
+    try:
+        wait_until_up(port)
+        mml = mtable_document(rows=3, terms=4)
+        payload = ({'mml': mml} if args.batch == 1 else
+                   {'documents': [mml] * args.batch})
+        payloads = [json.dumps(payload).encode('utf-8')] * args.requests
+        # start the worker processes before timing
+        asyncio.run(load(port, payloads[:args.concurrency], 1))
+        seconds, latencies, statuses = asyncio.run(
+            load(port, payloads, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = statuses[200]
+    print('{0} requests in {1:.2f} s: {2:.0f} requests/s, {3:.0f} documents/s'
+          .format(len(latencies), seconds, len(latencies) / seconds,
+                  ok * args.batch / seconds))
+    print('latency p50 {0:.1f} ms, p95 {1:.1f} ms, p99 {2:.1f} ms'.format(
+        *[percentile(latencies, f) * 1000 for f in (0.5, 0.95, 0.99)]))
+    print('statuses', dict(statuses))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+'''
+Benchmark suite over corpora of generated documents: throughput and peak
+traced memory of mml2sympy and mml2steps, and the seconds per document of
+each stage (from the instrument hooks). Results can be saved as JSON and
+compared against an earlier run to catch regressions.
+
+    python -m benchmarks.suite [--save results.json] [--compare old.json]
+'''
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from mml2sympy import mml2steps, mml2sympy
+from mml2sympy.instrument import Recorder
+
+from .generator import MathMLGenerator
+
+DOCUMENTS = 50
+
+# name: MathMLGenerator arguments
+CORPORA = {
+    'flat': dict(depth=0, width=8),
+    'wide': dict(depth=1, width=30),
+    'deep': dict(depth=8, width=2),
+    'table': dict(depth=2, width=4, rows=20),
+    'fractions': dict(depth=4, width=3,
+                      density={'mfrac': 0.6, 'mfenced': 0.2}),
+    'powers': dict(depth=4, width=3,
+                   density={'msup': 0.5, 'msqrt': 0.3}),
+}
+
+# a metric this much slower than in the compared run is a regression
+REGRESSION = 1.25
+
+
+def corpus(name, documents=DOCUMENTS):
+    return MathMLGenerator(seed=name, **CORPORA[name]).documents(documents)
+
+
+def throughput(func, documents):
+    ' ~> returns (documents per second, KB per second) of the best of 3 '
+    size = sum(len(document.encode('utf-8')) for document in documents)
+    for document in documents:  # warm up the leaf and compile caches
+        func(document)
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for document in documents:
+            func(document)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(documents) / best, size / 1024 / best
+
+
+def peak_memory(func, documents):
+    ' ~> returns the peak traced memory in KB of converting each document '
+    peak = 0
+    for document in documents:
+        tracemalloc.start()
+        try:
+            func(document)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peak / 1024
+
+
+def stage_seconds(documents):
+    ' ~> returns {stage: mean seconds per document} of mml2sympy '
+    with Recorder() as recorder:
+        for document in documents:
+            mml2sympy(document)
+    totals = {}
+    for stats in recorder.documents:
+        for stage, seconds in stats.seconds.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    return dict((stage, seconds / len(documents))
+                for stage, seconds in totals.items())
+
+
+def run(names, documents=DOCUMENTS):
+    results = {}
+    for name in names:
+        docs = corpus(name, documents)
+        result = {}
+        for func in [mml2sympy, mml2steps]:
+            docs_per_second, kb_per_second = throughput(func, docs)
+            result[func.__name__ + '.docs_per_second'] = docs_per_second
+            result[func.__name__ + '.kb_per_second'] = kb_per_second
+            result[func.__name__ + '.peak_kb'] = peak_memory(func, docs)
+        for stage, seconds in stage_seconds(docs).items():
+            result['stage.' + stage + '.ms'] = seconds * 1000
+        results[name] = result
+    return results
+
+
+def regressions(results, baseline, threshold=REGRESSION):
+    ' ~> returns [(corpus, metric, old, new)] that got threshold worse '
+    worse = []
+    for name, result in results.items():
+        for metric, new in result.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old:
+                continue
+            # throughputs should go up, times and memory down
+            ratio = old / new if 'per_second' in metric else new / old
+            if ratio > threshold:
+                worse.append((name, metric, old, new))
+    return worse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('corpora', nargs='*', default=sorted(CORPORA))
+    parser.add_argument('--documents', type=int, default=DOCUMENTS)
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run')
+    parser.add_argument('--threshold', type=float, default=REGRESSION,
+                        help='ratio that counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.corpora, args.documents)
+    for name, result in results.items():
+        print(name)
+        for metric, value in sorted(result.items()):
+            print('  {0:<32} {1:>12.2f}'.format(metric, value))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            worse = regressions(results, json.load(f), args.threshold)
+        for name, metric, old, new in worse:
+            print('REGRESSION {0} {1}: {2:.2f} -> {3:.2f}'.format(
+                name, metric, old, new))
+        return 1 if worse else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,42 @@
 __version__ = '0.3.0'
 
-from .mml import mml2tree, tree2sympy, table2trees, modify, mml2sympy, mml2steps
+from .mml import mml2tree, tree2sympy, tree2expr, table2trees, modify, mml2sympy, mml2exprs, mml2steps
+from .exceptions import MMLError, MMLTypeError, MMLParseError, MMLStructureError, MMLLimitError
+
+# names imported from their module on first access, so that importing the
+# package for mml2sympy/mml2steps doesn't load multiprocessing, sqlite3, ...
+_LAZY_NAMES = {
+    'mml2sympy_batch': 'batch',
+    'DocumentError': 'batch',
+    'mml2sympy_stream': 'stream',
+    'ConversionCache': 'cache',
+    'MemoryBackend': 'cache',
+    'SQLiteBackend': 'cache',
+    'mml2matrices': 'matrix',
+    'table2matrix': 'matrix',
+    'mml2funcs': 'numeric',
+    'compile_step': 'numeric',
+    'check_steps': 'steps',
+    'Recorder': 'instrument',
+    'StatsAggregator': 'instrument',
+    'AsyncConverter': 'aio',
+    'IncrementalConverter': 'incremental',
+    'ParsedDocument': 'document',
+    'mml2binary': 'binary',
+    'binary2exprs': 'binary',
+    'fingerprint': 'hashing',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_NAMES:
+        raise AttributeError("module {0!r} has no attribute {1!r}"
+                             .format(__name__, name))
+    from importlib import import_module
+    value = getattr(import_module('.' + _LAZY_NAMES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_NAMES))
@@ -0,0 +1,191 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import DEFAULT_CHUNKSIZE, _init_worker, _run
+from .exceptions import MMLTypeError
+from .mml import MML_TYPES, mml2steps, mml2sympy
+
+# the conversions an AsyncConverter runs, by name
+FUNCS = {
+    'mml2sympy': mml2sympy,
+    'mml2steps': mml2steps,
+}
+
+
+class ConverterBusy(Exception):
+    ' Raised instead of waiting when all of the pending slots are taken. '
+
+
+class AsyncConverter(object):
+    '''
+    Runs conversions in an executor (by default a pool of worker
+    processes) for asyncio code, so they don't block the event loop.
+
+    At most max_pending conversions are submitted at once; further calls
+    wait for a slot. With wait=False, a call raises ConverterBusy instead
+    when max_queued calls are already waiting. A conversion that takes
+    longer than timeout seconds raises TimeoutError, but keeps its slot
+    until the executor is done with it. limits (see mml2sympy.limits)
+    are set in the worker processes of the default executor.
+
+        >>> async with AsyncConverter(workers=4) as converter:
+        ...     sreprs = await converter.convert(mml)
+    '''
+
+    def __init__(self, workers=None, max_pending=None, max_queued=None,
+                 timeout=None, executor=None, limits=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.max_queued = (4 * self.max_pending if max_queued is None
+                           else max_queued)
+        self.timeout = timeout
+        self.limits = limits
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._loop = None
+        self._slots = None
+        self._pending = 0
+        self._queued = 0
+
+    @property
+    def pending(self):
+        ' the number of conversions submitted and not done yet '
+        return self._pending
+
+    async def convert(self, mml, func='mml2sympy', timeout=None, wait=True):
+        '''
+        Converts one document with FUNCS[func].
+
+        ~> returns the result of the conversion, raising its errors
+        '''
+        return await self._submit(timeout, wait, _run_one, func, mml)
+
+    async def convert_many(self, documents, func='mml2sympy', timeout=None,
+                           wait=True, chunksize=DEFAULT_CHUNKSIZE):
+        '''
+        Converts the documents in chunks of chunksize, each taking one
+        slot and one round trip to the executor. With wait=False only the
+        first chunk can raise ConverterBusy, the others wait their turn.
+        When a chunk fails, the chunks not started yet are cancelled.
+
+        ~> returns, in order, the result of each document or a
+            DocumentError for documents that failed
+        '''
+        if isinstance(documents, MML_TYPES):
+            raise MMLTypeError('documents must be an iterable of documents, '
+                               'not a single document')
+        documents = list(documents)
+        chunks = [asyncio.ensure_future(self._submit(
+                      timeout, wait or start > 0, _run_chunk, func, start,
+                      documents[start:start + chunksize]))
+                  for start in range(0, len(documents), chunksize)]
+        try:
+            done = await asyncio.gather(*chunks)
+        except BaseException:
+            # a failed batch (e.g. ConverterBusy) converts no more chunks
+            for chunk in chunks:
+                chunk.cancel()
+            await asyncio.gather(*chunks, return_exceptions=True)
+            raise
+        results = []
+        for chunk in done:
+            results.extend(chunk)
+        return results
+
+    async def _submit(self, timeout, wait, task, func, *args):
+        if func not in FUNCS:
+            raise ValueError('unknown conversion {0!r}'.format(func))
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # a semaphore belongs to one event loop
+            self._loop, self._slots = loop, asyncio.Semaphore(self.max_pending)
+            self._pending = self._queued = 0
+        if self._slots.locked():
+            if not wait and self._queued >= self.max_queued:
+                raise ConverterBusy('{0} conversions pending, {1} queued'
+                                    .format(self._pending, self._queued))
+            self._queued += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self._queued -= 1
+        else:
+            await self._slots.acquire()
+
+        try:
+            future = self.executor.submit(task, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._pending += 1
+        slots = self._slots
+        future.add_done_callback(
+            lambda _: _call_soon(loop, self._release, slots))
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future),
+                                          timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise TimeoutError('conversion took longer than {0}s'
+                               .format(timeout)) from None
+
+    def _release(self, slots):
+        if slots is self._slots:
+            self._pending -= 1
+            slots.release()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(self.limits,))
+        return self._executor
+
+    def close(self, wait=True):
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close(wait=False)
+
+
+_default = None
+
+
+async def convert(mml, func='mml2sympy', timeout=None):
+    '''
+    Converts mml with FUNCS[func] on a shared AsyncConverter, created
+    with the default settings on first use.
+
+    ~> returns the result of the conversion
+    '''
+    global _default
+    if _default is None:
+        _default = AsyncConverter()
+    return await _default.convert(mml, func, timeout)
+
+
+def _call_soon(loop, callback, *args):
+    ' Schedules callback from an executor thread, unless loop is closed. '
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        pass
+
+
+def _run_one(func, mml):
+    return FUNCS[func](mml)
+
+
+def _run_chunk(func, start, documents):
+    func = FUNCS[func]
+    return [_run((func, start + offset, document))
+            for offset, document in enumerate(documents)]
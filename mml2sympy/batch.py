@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import namedtuple
+from multiprocessing import Pool
+
+from .exceptions import MMLTypeError
+from .limits import limited, set_limits
+from .mml import MML_TYPES, mml2sympy
+
+DEFAULT_CHUNKSIZE = 64
+
+# chunks of items submitted to the worker pool ahead of the results
+# taken; bounds the memory of huge inputs since Pool.imap would
+# otherwise read its whole iterable ahead
+WINDOW_CHUNKS = 16
+
+# returned in place of the result of a document that failed to convert
+DocumentError = namedtuple('DocumentError', ['index', 'error', 'message'])
+
+
+def mml2sympy_batch(iterable, workers=None, chunksize=DEFAULT_CHUNKSIZE,
+                    limits=None):
+    '''
+    Converts every MML string in iterable with mml2sympy, spread over a
+    pool of worker processes. With limits (see mml2sympy.limits), a
+    document over them fails with an MMLLimitError.
+
+    ~> yields, in input order, the list of sympy srepr expressions of
+        each document, or a DocumentError for documents that failed.
+    '''
+    return batch_convert(mml2sympy, iterable, workers, chunksize, limits)
+
+
+def batch_convert(func, iterable, workers=None, chunksize=DEFAULT_CHUNKSIZE,
+                  limits=None):
+    '''
+    Applies func (a module level function, so it can be pickled) to every
+    item of iterable over a pool of worker processes, under limits (a
+    mml2sympy.limits.Limits) when given. workers defaults to the cpu
+    count; with workers=1 everything runs in this process. iterable is
+    read at most WINDOW_CHUNKS chunks ahead of the results taken.
+
+    ~> yields func(item) or a DocumentError for each item, in input order.
+    '''
+    if isinstance(iterable, MML_TYPES):
+        raise MMLTypeError('iterable must be an iterable of documents, '
+                           'not a single document')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1')
+    # the arguments are checked on the call, the documents converted
+    # as the results are iterated
+    return _batch_convert(func, iterable, workers, chunksize, limits)
+
+
+def _batch_convert(func, iterable, workers, chunksize, limits):
+    tasks = ((func, index, item) for index, item in enumerate(iterable))
+    if workers == 1:
+        for task in tasks:
+            if limits is None:
+                yield _run(task)
+                continue
+            with limited(limits):
+                result = _run(task)
+            yield result
+        return
+
+    window = threading.Semaphore(WINDOW_CHUNKS * chunksize)
+    stopped = threading.Event()
+
+    def submitted():
+        # runs in the pool's task handler thread
+        for task in tasks:
+            window.acquire()
+            if stopped.is_set():
+                return
+            yield task
+
+    pool = Pool(workers, initializer=_init_worker, initargs=(limits,))
+    try:
+        for result in pool.imap(_run, submitted(), chunksize):
+            window.release()
+            yield result
+    finally:
+        # wake up the task handler so terminate can join it
+        stopped.set()
+        window.release()
+        pool.terminate()
+
+
+def _init_worker(limits=None):
+    '''
+    Import lxml once per worker, before the first document, and set the
+    worker's limits. sympy is left to the functions that need it, which
+    import it on their first call.
+    '''
+    import lxml.objectify  # noqa
+    if limits is not None:
+        set_limits(limits)
+
+
+def _run(task):
+    func, index, item = task
+    try:
+        return func(item)
+    except Exception as e:
+        return DocumentError(index, type(e).__name__, str(e))
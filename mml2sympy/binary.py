@@ -0,0 +1,312 @@
+'''
+A compact binary encoding of converted documents, for storing many of them:
+
+    >>> from mml2sympy.binary import mml2binary, binary2exprs
+    >>> data = mml2binary(mml)
+    >>> binary2exprs(data)  # as mml2exprs(mml)
+
+The encoding is a version byte, a table of the distinct symbol names and
+float literals, the number of steps, then the modified tree of each step
+as a prefix order stream: one opcode byte per element, followed by its
+arity (madd, mmul), its shape (mtable) or its value (varint integers,
+table indexes for the others). A subtree seen before in the document is
+written as a reference to it, and decodes to the same sympy object.
+Decoding builds the same sympy objects as tree2expr, without parsing.
+'''
+from . import limits
+from .exceptions import MMLStructureError, MMLTypeError
+from .mml import (LEAF_FLOAT, LEAF_INTEGER, MML_TYPES, SKIP_ELEMENTS,
+                  SubtreeMemo, _as_node, _classify_leaf, _modify_step,
+                  _radicand, _sympy, _table_rows, _tostring, mml2steptrees,
+                  modify)
+
+VERSION = 1
+
+OP_EMPTY = 0
+OP_INTEGER = 1
+OP_FLOAT = 2
+OP_SYMBOL = 3
+OP_REF = 4
+OP_EQ = 5
+OP_ADD = 6
+OP_MUL = 7
+OP_POW = 8
+OP_FRAC = 9
+OP_SQRT = 10
+OP_MATRIX = 11
+
+# or'ed into the opcode of an operation built with evaluate=True
+EVALUATE = 0x80
+
+# modified tag: (opcode, fewest children, children encoded or None for all)
+OPERATIONS = {
+    'meq': (OP_EQ, 2, 2),
+    'madd': (OP_ADD, 2, None),
+    'mmul': (OP_MUL, 2, None),
+    'msup': (OP_POW, 2, 2),
+    'mfrac': (OP_FRAC, 2, 2),
+    'msqrt': (OP_SQRT, 1, 1),
+}
+
+# the children of every fixed arity operation
+_ARITIES = {OP_EQ: 2, OP_POW: 2, OP_FRAC: 2, OP_SQRT: 1}
+
+
+def mml2binary(mml):
+    '''
+    Converts the MML document like mml2sympy, encoding all of its steps.
+
+    ~> returns the encoded bytes
+    '''
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+
+    started = limits.begin()
+    try:
+        encoder = _Encoder()
+        for step_tree in mml2steptrees(mml):
+            encoder.add(_modify_step(step_tree))
+    finally:
+        limits.end(started)
+    return encoder.getvalue()
+
+
+def tree2binary(mmltree, skip_elements=SKIP_ELEMENTS, evaluate=False):
+    '''
+    Encodes a modified mmltree as a document of one step, element for
+    element like tree2sympy, leaving an lxml mmltree unchanged.
+
+    ~> returns the encoded bytes
+    '''
+    started = limits.begin()
+    try:
+        limits.check_time()
+        encoder = _Encoder()
+        encoder.add(_as_node(mmltree), skip_elements, evaluate)
+    finally:
+        limits.end(started)
+    return encoder.getvalue()
+
+
+class _Encoder(object):
+
+    def __init__(self):
+        self.stream = bytearray()
+        self.steps = 0
+        self.strings = {}  # symbol name or float literal: table index
+        self.operations = 0  # written so far, the index of the next one
+        self.refs = {}  # SubtreeMemo key: operation index
+        self.memo = SubtreeMemo()
+
+    def add(self, tree, skip_elements=SKIP_ELEMENTS, evaluate=False):
+        ' Writes the prefix stream of one step. '
+        self.steps += 1
+        stream = self.stream
+        stack = [tree]
+        polls = limits.POLL_INTERVAL
+        while stack:
+            polls -= 1
+            if not polls:
+                limits.check_time()
+                polls = limits.POLL_INTERVAL
+            element = stack.pop()
+            children = element.getchildren()
+            key = None
+            if children and skip_elements is SKIP_ELEMENTS and not evaluate:
+                key = self.memo.key(element)
+                if key in self.refs:
+                    stream.append(OP_REF)
+                    _write_varint(stream, self.refs[key])
+                    continue
+
+            tag = element.tag
+            if tag in skip_elements and len(children) > 1:
+                # nested rows are left ungrouped by modify, as in tree2sympy
+                element = modify(element)
+                children = element.getchildren()
+                tag = element.tag
+
+            if tag in OPERATIONS:
+                opcode, fewest, kept = OPERATIONS[tag]
+                if len(children) < fewest:
+                    raise MMLStructureError(
+                        "{0} element {1} doesn't have at least {2} rows."
+                        .format(tag, _tostring(element), fewest))
+                if tag == 'msqrt':
+                    children = _radicand(children)
+                children = children[:kept]
+                stream.append(opcode | EVALUATE if evaluate else opcode)
+                if kept is None:
+                    _write_varint(stream, len(children))
+                self._count(key)
+            elif tag == 'mtable':
+                rows = _table_rows(element)
+                stream.append(OP_MATRIX)
+                _write_varint(stream, len(rows))
+                _write_varint(stream, len(rows[0]) if rows else 0)
+                children = [cell for row in rows for cell in row]
+                self._count(key)
+            elif tag in skip_elements:
+                if not children:
+                    stream.append(OP_EMPTY)
+            elif tag == 'mn' or tag == 'mi':
+                self._write_leaf(element.text)
+                children = None
+            else:
+                stream.append(OP_EMPTY)
+                children = None
+
+            if children:
+                stack.extend(reversed(children))
+            skip_elements, evaluate = SKIP_ELEMENTS, False
+
+    def _count(self, key):
+        if key is not None:
+            self.refs[key] = self.operations
+        self.operations += 1
+
+    def _write_leaf(self, text):
+        kind, content = _classify_leaf(text)
+        if kind == LEAF_INTEGER:
+            value = int(content)
+            self.stream.append(OP_INTEGER)
+            _write_varint(self.stream, value * 2 if value >= 0 else
+                          -value * 2 - 1)
+        else:
+            self.stream.append(OP_FLOAT if kind == LEAF_FLOAT else OP_SYMBOL)
+            _write_varint(self.stream,
+                          self.strings.setdefault(content, len(self.strings)))
+
+    def getvalue(self):
+        header = bytearray([VERSION])
+        _write_varint(header, len(self.strings))
+        for string in self.strings:  # in index order
+            string = string.encode('utf-8')
+            _write_varint(header, len(string))
+            header += string
+        _write_varint(header, self.steps)
+        return bytes(header + self.stream)
+
+
+def binary2exprs(data):
+    '''
+    Decodes the bytes of mml2binary or tree2binary.
+
+    ~> returns a list of sympy expressions, like mml2exprs, with None for
+        steps with no value
+    '''
+    sympy = _sympy()
+    if not data or data[0] != VERSION:
+        raise ValueError('not version {0} mml2sympy binary data'
+                         .format(VERSION))
+    count, position = _read_varint(data, 1)
+    strings = []
+    for _ in range(count):
+        size, position = _read_varint(data, position)
+        strings.append(bytes(data[position:position + size]).decode('utf-8'))
+        position += size
+    steps, position = _read_varint(data, position)
+
+    symbols, floats = {}, {}
+    operations = []  # every decoded operation, for OP_REF
+    exprs = []
+    stack = []  # [opcode, evaluate, children left, results, shape, index]
+    while len(exprs) < steps:
+        opcode = data[position]
+        position += 1
+        evaluate = bool(opcode & EVALUATE)
+        opcode &= ~EVALUATE
+        if opcode == OP_INTEGER:
+            value, position = _read_varint(data, position)
+            expr = sympy.Integer(-(value >> 1) - 1 if value & 1 else
+                                 value >> 1)
+        elif opcode == OP_SYMBOL:
+            index, position = _read_varint(data, position)
+            expr = symbols.get(index)
+            if expr is None:
+                expr = symbols[index] = sympy.Symbol(strings[index])
+        elif opcode == OP_FLOAT:
+            index, position = _read_varint(data, position)
+            expr = floats.get(index)
+            if expr is None:
+                expr = floats[index] = sympy.Float(strings[index], 15)
+        elif opcode == OP_REF:
+            index, position = _read_varint(data, position)
+            expr = operations[index]
+        elif opcode == OP_EMPTY:
+            expr = None
+        else:
+            shape = None
+            if opcode in _ARITIES:
+                arity = _ARITIES[opcode]
+            elif opcode == OP_MATRIX:
+                rows, position = _read_varint(data, position)
+                columns, position = _read_varint(data, position)
+                arity, shape = rows * columns, (rows, columns)
+            elif opcode == OP_ADD or opcode == OP_MUL:
+                arity, position = _read_varint(data, position)
+            else:
+                raise ValueError('unknown opcode {0}'.format(opcode))
+            frame = [opcode, evaluate, arity, [], shape, len(operations)]
+            operations.append(None)
+            if arity:
+                stack.append(frame)
+                continue
+            expr = operations[frame[5]] = _build(sympy, frame)
+
+        # close the operations this completes
+        while stack:
+            frame = stack[-1]
+            frame[3].append(expr)
+            frame[2] -= 1
+            if frame[2]:
+                break
+            stack.pop()
+            expr = operations[frame[5]] = _build(sympy, frame)
+        else:
+            exprs.append(expr)
+
+    if position != len(data):
+        raise ValueError('trailing data after the last step')
+    return exprs
+
+
+def _build(sympy, frame):
+    opcode, evaluate, _, args, shape, _ = frame
+    if opcode == OP_ADD:
+        return sympy.Add(*args, evaluate=evaluate)
+    if opcode == OP_MUL:
+        return sympy.Mul(*args, evaluate=evaluate)
+    if opcode == OP_POW:
+        return sympy.Pow(args[0], args[1], evaluate=evaluate)
+    if opcode == OP_FRAC:
+        # the srepr form leaves the inner Pow evaluated, so match it
+        return sympy.Mul(args[0], sympy.Pow(args[1], sympy.Integer(-1)),
+                         evaluate=evaluate)
+    if opcode == OP_EQ:
+        return sympy.Eq(args[0], args[1], evaluate=evaluate)
+    if opcode == OP_SQRT:
+        return sympy.Pow(args[0], sympy.Rational(1, 2), evaluate=evaluate)
+    rows, columns = shape
+    return sympy.ImmutableMatrix([args[row * columns:(row + 1) * columns]
+                                  for row in range(rows)])
+
+
+def _write_varint(stream, value):
+    ' Appends the unsigned int value, 7 bits per byte, low bits first. '
+    while value > 0x7f:
+        stream.append(value & 0x7f | 0x80)
+        value >>= 7
+    stream.append(value)
+
+
+def _read_varint(data, position):
+    ' ~> returns (value, position after it) '
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .mml import MML_TYPES, mml2sympy, mml2steps
+from .util import normalize_mml
+
+
+def cache_key(name, mml):
+    '''
+    Content address of mml for the conversion called name. A str and
+    its UTF-8 bytes share an address.
+    '''
+    if isinstance(mml, str):
+        mml = normalize_mml(mml).encode('utf-8')
+    else:
+        mml = normalize_mml(bytes(mml))
+    digest = hashlib.sha256(mml).hexdigest()
+    return '{0}:{1}'.format(name, digest)
+
+
+def _size(key, value):
+    ' The UTF-8 size of an entry, in bytes. '
+    return len(key) + sum(len(s.encode('utf-8')) for s in value)
+
+
+class MemoryBackend(object):
+    '''
+    In process LRU store, bounded by max_entries and/or max_bytes (the
+    summed UTF-8 size of the keys and cached strings).
+    '''
+
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= _size(key, self._entries.pop(key))
+            self._entries[key] = value
+            self.bytes += _size(key, value)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _evict(self):
+        while self._entries and (
+                (self.max_entries is not None and
+                 len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            key, value = self._entries.popitem(last=False)
+            self.bytes -= _size(key, value)
+
+
+class SQLiteBackend(object):
+    '''
+    On disk LRU store in a sqlite database, which can be shared by
+    several worker processes. Bounded by max_entries and/or max_bytes.
+    '''
+
+    def __init__(self, path, max_entries=None, max_bytes=None, timeout=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, value TEXT, size INTEGER, used INTEGER)')
+        # the LRU clock and eviction order are read from used
+        self._connect().execute(
+            'CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def _connect(self):
+        ' One connection per thread and process (connections do not survive fork). '
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _clock(self, connection):
+        return connection.execute(
+            'SELECT COALESCE(MAX(used), 0) + 1 FROM entries').fetchone()[0]
+
+    def get(self, key):
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE entries SET used = ? WHERE key = ?',
+                           (self._clock(connection), key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), _size(key, value),
+                 self._clock(connection)))
+            self._evict(connection)
+
+    def clear(self):
+        self._connect().execute('DELETE FROM entries')
+
+    def _evict(self, connection):
+        if self.max_entries is not None:
+            connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                'ORDER BY used DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        if self.max_bytes is not None:
+            total = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            rows = connection.execute(
+                'SELECT key, size FROM entries ORDER BY used').fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+                total -= size
+
+
+class ConversionCache(object):
+    '''
+    Content addressed cache in front of mml2sympy and mml2steps. Inputs
+    that only differ in the whitespace between tags or in the xmlns
+    declaration share an entry, and so do a str and its UTF-8 bytes.
+
+        >>> cache = ConversionCache(MemoryBackend(max_entries=10000))
+        >>> cache.mml2sympy(mml)
+    '''
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def mml2sympy(self, mml):
+        return self._cached(mml2sympy, mml)
+
+    def mml2steps(self, mml):
+        return self._cached(mml2steps, mml)
+
+    def stats(self):
+        ' ~> returns the hit/miss counters and the number of entries. '
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self.backend)}
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, func, mml):
+        if not isinstance(mml, MML_TYPES):
+            return func(mml)  # let func raise its MMLTypeError
+
+        key = cache_key(func.__name__, mml)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return list(value)
+
+        self.misses += 1
+        value = func(mml)
+        self.backend.set(key, value)
+        return list(value)
@@ -0,0 +1,215 @@
+'''
+Bulk conversion from the command line:
+
+    mml2sympy answers.jsonl -o sreprs.jsonl --jobs 8
+    mml2sympy answers.csv --field answer --steps -o steps.jsonl --resume
+
+Reads one document per row of a JSONL file (the --field key of each
+object), a CSV or TSV file (the --field column) or a plain file (one
+document per line), and writes one JSON object per row, in input order:
+{"row": 0, "id": ..., "result": [...]} or {"row": 1, "error": ...,
+"message": ...}. With --resume, rows already in the output are skipped
+and the rest appended.
+'''
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from .batch import DEFAULT_CHUNKSIZE, DocumentError, batch_convert
+from .limits import Limits
+from .mml import mml2steps, mml2sympy
+
+FORMATS = ['jsonl', 'csv', 'tsv', 'lines']
+
+# the delimiter of each format read with the csv module
+DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+# bytes read at a time from the end of the output by resume_point
+RESUME_BLOCK = 1 << 16
+
+
+def read_rows(f, fmt, field='mml', id_field='id'):
+    '''
+    ~> yields (id, document) for every row of f, with an exception in
+        place of the document for rows that can't be read
+    '''
+    if fmt in DELIMITERS:
+        for record in csv.DictReader(f, delimiter=DELIMITERS[fmt]):
+            if field not in record:
+                yield None, KeyError('no {0!r} column'.format(field))
+            else:
+                yield record.get(id_field), record[field]
+        return
+
+    for line in f:
+        line = line.rstrip('\r\n')
+        if fmt == 'lines':
+            yield None, line
+            continue
+        try:
+            record = json.loads(line)
+            yield record.get(id_field), record[field]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            yield None, ValueError('unreadable row: {0}'.format(e))
+
+
+def resume_point(path):
+    '''
+    Drops a partly written last line from the output at path.
+
+    ~> returns the number of rows already written
+    '''
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        # only the tail is read, back from the end to the last newline
+        # and on to the one before it
+        end = f.seek(0, os.SEEK_END)
+        tail = b''
+        while end > 0 and tail.count(b'\n') < 2:
+            start = max(0, end - RESUME_BLOCK)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+        cut = tail.rfind(b'\n') + 1
+        f.truncate(end + cut)
+    if not cut:
+        return 0
+    last = tail[:cut - 1].rsplit(b'\n', 1)[-1]
+    return json.loads(last.decode('utf-8'))['row'] + 1
+
+
+def convert_rows(rows, steps=False, jobs=1, chunksize=DEFAULT_CHUNKSIZE,
+                 limits=None):
+    '''
+    Converts the documents of rows with mml2sympy.batch.batch_convert,
+    over a pool of jobs worker processes (or in this process for 1),
+    under limits when given.
+
+    ~> yields (id, result or DocumentError) in input order
+    '''
+    func = _steps_row if steps else _sympy_row
+    row_ids = deque()  # of the rows read, in order
+
+    def documents():
+        for row_id, document in rows:
+            row_ids.append(row_id)
+            yield document
+
+    results = batch_convert(func, documents(), jobs, chunksize, limits)
+    try:
+        for result in results:
+            yield row_ids.popleft(), result
+    finally:
+        results.close()
+
+
+def _sympy_row(document):
+    if isinstance(document, Exception):
+        raise document
+    return mml2sympy(document)
+
+
+def _steps_row(document):
+    if isinstance(document, Exception):
+        raise document
+    return mml2steps(document)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='mml2sympy', description='Convert presentation MathML to sympy',
+        epilog=__doc__.split('\n\n')[2],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="input file, or - for stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help='JSONL output file (default: stdout)')
+    parser.add_argument('--format', choices=FORMATS,
+                        help='input format (default: from the extension)')
+    parser.add_argument('--field', default='mml',
+                        help='JSONL key or CSV column of the documents')
+    parser.add_argument('--id-field', default='id',
+                        help='JSONL key or CSV column copied to the output')
+    parser.add_argument('--steps', action='store_true',
+                        help='write mml2steps documents instead of sreprs')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='worker processes (0: the cpu count)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='rows per worker task, and per output flush')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the rows already in the output file')
+    parser.add_argument('--max-nodes', type=int,
+                        help='fail documents with more elements')
+    parser.add_argument('--max-depth', type=int,
+                        help='fail documents nested deeper')
+    parser.add_argument('--max-leaf-length', type=int,
+                        help='fail documents with a longer text')
+    parser.add_argument('--max-seconds', type=float,
+                        help='fail documents taking longer to convert')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or _format_of(args.input)
+    jobs = args.jobs or os.cpu_count() or 1
+    if args.resume and args.output == '-':
+        parser.error('--resume needs an --output file')
+    done = resume_point(args.output) if args.resume else 0
+    limits = Limits(args.max_nodes, args.max_depth, args.max_leaf_length,
+                    args.max_seconds)
+
+    source = (sys.stdin if args.input == '-' else
+              open(args.input, newline='' if fmt in DELIMITERS else None,
+                   encoding='utf-8'))
+    sink = (sys.stdout if args.output == '-' else
+            open(args.output, 'a' if args.resume else 'w', encoding='utf-8'))
+    start = time.perf_counter()
+    rows = errors = 0
+    try:
+        remaining = itertools.islice(
+            read_rows(source, fmt, args.field, args.id_field), done, None)
+        for row_id, result in convert_rows(remaining, args.steps, jobs,
+                                           args.chunksize, limits):
+            record = {'row': done + rows}
+            if row_id is not None:
+                record['id'] = row_id
+            if isinstance(result, DocumentError):
+                record['error'] = result.error
+                record['message'] = result.message
+                errors += 1
+            else:
+                record['result'] = result
+            sink.write(json.dumps(record, ensure_ascii=False) + '\n')
+            rows += 1
+            if rows % args.chunksize == 0:
+                sink.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+        else:
+            sink.flush()
+
+        seconds = time.perf_counter() - start
+        sys.stderr.write(
+            '{0} rows converted ({1} errors, {2} skipped) in {3:.2f} s, '
+            '{4:.0f} rows/s\n'.format(rows, errors, done, seconds,
+                                      rows / seconds if seconds else 0))
+    return 0
+
+
+def _format_of(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if extension in DELIMITERS:
+        return extension
+    return 'lines'
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+from . import instrument, limits
+from .exceptions import MMLTypeError
+from .mml import (MML_TYPES, SubtreeMemo, _modify_step, mml2steptrees,
+                  step_document, tree2expr, tree2sympy)
+
+
+class ParsedDocument(object):
+    '''
+    A document parsed once, for callers that need more than one of its
+    conversions. steps (like mml2steps), sreprs (like mml2sympy) and
+    exprs (like mml2exprs) are each computed on first use and kept, and
+    share the parsed and modified trees. With memoize, subtrees repeated
+    across the steps are converted once (see SubtreeMemo). The parse
+    and each conversion run under their own max_seconds clock.
+
+        >>> document = ParsedDocument(mml)
+        >>> document.steps
+        >>> document.sreprs
+    '''
+
+    def __init__(self, mml, memoize=False):
+        if not isinstance(mml, MML_TYPES):
+            raise MMLTypeError('mml must be a string containing the math ML XML')
+
+        self.mml = mml
+        self.memoize = memoize
+        started = limits.begin()
+        try:
+            self.step_trees = instrument.stage('mml2steptrees',
+                                               mml2steptrees, mml)
+        finally:
+            limits.end(started)
+        self._modified = None
+        self._steps = None
+        self._sreprs = None
+        self._exprs = None
+
+    def __len__(self):
+        return len(self.step_trees)
+
+    @property
+    def modified(self):
+        ' the modified Node tree of every step '
+        if self._modified is None:
+            started = limits.begin()
+            try:
+                self._modified = [instrument.stage('modify', _modify_step,
+                                                   step_tree)
+                                  for step_tree in self.step_trees]
+            finally:
+                limits.end(started)
+        return self._modified
+
+    @property
+    def steps(self):
+        ' the MML document of every step, as mml2steps returns them '
+        if self._steps is None:
+            started = limits.begin()
+            try:
+                self._steps = [instrument.stage('step_document',
+                                                step_document, step_tree)
+                               for step_tree in self.step_trees]
+            finally:
+                limits.end(started)
+        return self._steps
+
+    @property
+    def sreprs(self):
+        ' the sympy srepr of every step, as mml2sympy returns them '
+        if self._sreprs is None:
+            memo = self._memo()
+            started = limits.begin()
+            try:
+                self._sreprs = [instrument.stage('tree2sympy', tree2sympy,
+                                                 step_tree, memo=memo)
+                                for step_tree in self.modified]
+            finally:
+                limits.end(started)
+        return self._sreprs
+
+    @property
+    def exprs(self):
+        ' the sympy expression of every step, as mml2exprs returns them '
+        if self._exprs is None:
+            memo = self._memo()
+            started = limits.begin()
+            try:
+                self._exprs = [instrument.stage('tree2expr', tree2expr,
+                                                step_tree, memo=memo)
+                               for step_tree in self.modified]
+            finally:
+                limits.end(started)
+        return self._exprs
+
+    def _memo(self):
+        # sreprs and exprs keep different results, so never share a memo
+        return SubtreeMemo() if self.memoize else None
@@ -0,0 +1,18 @@
+class MMLError(Exception):
+    ''' Base class for every error raised while converting math ML. '''
+
+
+class MMLTypeError(MMLError, TypeError):
+    ''' The mml or mmltree given is not of the expected type. '''
+
+
+class MMLParseError(MMLError):
+    ''' The mml string is not well formed XML. '''
+
+
+class MMLStructureError(MMLError):
+    ''' The math ML tree can't be converted, e.g. an op without operands. '''
+
+
+class MMLLimitError(MMLError):
+    ''' The document breaks one of the limits set in mml2sympy.limits. '''
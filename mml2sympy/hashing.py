@@ -0,0 +1,119 @@
+'''
+Fingerprints of converted steps, for deduplicating answers at scale
+without building sympy objects:
+
+    >>> from mml2sympy import fingerprint
+    >>> fingerprint(mml)
+    ['cefb86276b6a88ff22c70704c862af82']
+
+A fingerprint is a BLAKE2b digest of the modified tree, built bottom up:
+the terms of a madd and the factors of a mmul are hashed in sorted order,
+so reordering them keeps the fingerprint, and leaves are hashed by value
+(" 2 " and "02" are the same integer). A subtracted term is a mmul with
+-1 in the modified tree, so its sign is part of the digest and a - b
+never collides with a + b. The digests only depend on this
+module, not on the sympy version.
+'''
+import hashlib
+
+from . import limits
+from .binary import OPERATIONS
+from .exceptions import MMLStructureError, MMLTypeError
+from .mml import (LEAF_FLOAT, LEAF_INTEGER, MML_TYPES, SKIP_ELEMENTS,
+                  SubtreeMemo, _as_node, _classify_leaf, _modify_step,
+                  _radicand, _table_rows, _tostring, _walk, mml2steptrees,
+                  modify)
+
+DIGEST_SIZE = 16
+
+# operations whose children are hashed in sorted order
+COMMUTATIVE_TAGS = frozenset(['madd', 'mmul'])
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+# the digest of elements with no value, like an empty mrow
+EMPTY_DIGEST = _digest(b'')
+
+
+def fingerprint(mml, memoize=False):
+    '''
+    Fingerprints every step of the MML document. With memoize, subtrees
+    repeated across the steps are hashed once (see SubtreeMemo).
+
+    ~> returns a list of hex digests, one per step
+    '''
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+
+    started = limits.begin()
+    try:
+        memo = SubtreeMemo() if memoize else None
+        return [tree2fingerprint(_modify_step(step_tree), memo=memo)
+                for step_tree in mml2steptrees(mml)]
+    finally:
+        limits.end(started)
+
+
+def tree2fingerprint(mmltree, skip_elements=SKIP_ELEMENTS, memo=None):
+    '''
+    Fingerprints a modified mmltree, element for element like tree2sympy,
+    leaving an lxml mmltree unchanged.
+
+    ~> returns the hex digest
+    '''
+    started = limits.begin()
+    try:
+        limits.check_time()
+        return _walk(_as_node(mmltree), _expand_digest, skip_elements, False,
+                     memo).hex()
+    finally:
+        limits.end(started)
+
+
+def _expand_digest(mmltree, skip_elements, evaluate):
+    '''
+    ~> returns (children, build) for tree2fingerprint, build making the
+        digest of mmltree from the digests of children, or (None, digest)
+    '''
+    children = mmltree.getchildren()
+    tag = mmltree.tag
+
+    if tag in OPERATIONS:
+        _, fewest, kept = OPERATIONS[tag]
+        if len(children) < fewest:
+            raise MMLStructureError(
+                "{0} element {1} doesn't have at least {2} rows."
+                .format(tag, _tostring(mmltree), fewest))
+        prefix = tag.encode('ascii') + b':'
+        if tag == 'msqrt':
+            children = _radicand(children)
+        if tag in COMMUTATIVE_TAGS:
+            return children, lambda r: _digest(prefix + b''.join(sorted(r)))
+        return children[:kept], lambda r: _digest(prefix + b''.join(r))
+
+    elif tag == 'mtable':
+        rows = _table_rows(mmltree)
+        prefix = 'mtable:{0}x{1}:'.format(
+            len(rows), len(rows[0]) if rows else 0).encode('ascii')
+        return ([cell for row in rows for cell in row],
+                lambda r: _digest(prefix + b''.join(r)))
+
+    elif tag in skip_elements:
+        if len(children) > 1:
+            return _expand_digest(modify(mmltree), skip_elements, evaluate)
+        if children:
+            return children, lambda r: r[0]
+        return None, EMPTY_DIGEST
+
+    elif tag == 'mn' or tag == 'mi':
+        kind, content = _classify_leaf(mmltree.text)
+        if kind == LEAF_INTEGER:
+            return None, _digest(b'I:' + str(int(content)).encode('ascii'))
+        elif kind == LEAF_FLOAT:
+            return None, _digest(b'F:' + repr(float(content)).encode('ascii'))
+        return None, _digest(b'S:' + content.encode('utf-8'))
+
+    return None, EMPTY_DIGEST
@@ -0,0 +1,72 @@
+from lxml import etree
+
+from . import limits
+from .mml import SubtreeMemo, _modify_step, mml2steptrees, tree2sympy
+
+# the subtree memo is started over when it holds more results than this
+MAX_MEMO_ENTRIES = 100000
+
+
+class IncrementalConverter(object):
+    '''
+    Converts successive versions of a document, like the states of an
+    equation editor, with mml2sympy. Each version is parsed, but only
+    rows whose serialized XML differs from every row of the previous
+    version are converted again, and within them subtrees converted
+    before (e.g. the untouched side of an equation) come from a
+    SubtreeMemo.
+
+        >>> converter = IncrementalConverter()
+        >>> converter.update(mml)
+        >>> converter.edit(start, end, '3')  # mml[start:end] = '3'
+    '''
+
+    def __init__(self, max_memo_entries=MAX_MEMO_ENTRIES):
+        self.max_memo_entries = max_memo_entries
+        self.mml = None
+        self.sreprs = []
+        self.rows_converted = 0
+        self.rows_reused = 0
+        self._rows = {}  # row XML: srepr, for the rows of self.mml
+        self._memo = SubtreeMemo()
+
+    def update(self, mml):
+        '''
+        Converts a new version of the document.
+
+        ~> returns the list of sympy srepr expressions, like mml2sympy
+        '''
+        rows = {}
+        sreprs = []
+        started = limits.begin()
+        try:
+            for step_tree in mml2steptrees(mml):
+                row = etree.tostring(step_tree, with_tail=False)
+                srepr = rows.get(row) or self._rows.get(row)
+                if srepr is None:
+                    srepr = tree2sympy(_modify_step(step_tree),
+                                       memo=self._memo)
+                    self.rows_converted += 1
+                else:
+                    self.rows_reused += 1
+                rows[row] = srepr
+                sreprs.append(srepr)
+        finally:
+            limits.end(started)
+            self._memo.clear_elements()
+            if len(self._memo.results) > self.max_memo_entries:
+                self._memo = SubtreeMemo()
+
+        self.mml, self.sreprs, self._rows = mml, sreprs, rows
+        return sreprs
+
+    def edit(self, start, end, text):
+        '''
+        Replaces mml[start:end] of the current version with text and
+        converts the result.
+
+        ~> returns the list of sympy srepr expressions
+        '''
+        if self.mml is None:
+            raise ValueError('edit needs a document, call update first')
+        return self.update(self.mml[:start] + text + self.mml[end:])
@@ -0,0 +1,206 @@
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ['mml2tree', 'mml2steptrees', 'modify', 'tree2sympy', 'tree2expr',
+          'sympify']
+
+# callables given a DocumentStats after each document; empty means that
+# instrumentation is off and the converters skip all of it
+_hooks = []
+_local = threading.local()
+
+
+class DocumentStats(object):
+    '''
+    What converting one document cost: seconds spent in each stage (not
+    counting nested stages), the number and depth of the modified tree
+    nodes and the size of the output.
+    '''
+    __slots__ = ('name', 'seconds', 'steps', 'nodes', 'depth', 'output_size',
+                 '_nested')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = {}
+        self.steps = 0
+        self.nodes = 0
+        self.depth = 0
+        self.output_size = 0
+        self._nested = 0.0
+
+    @property
+    def total_seconds(self):
+        return sum(self.seconds.values())
+
+    def __repr__(self):
+        return ('DocumentStats({0!r}, seconds={1!r}, steps={2}, nodes={3}, '
+                'depth={4}, output_size={5})'.format(
+                    self.name, self.seconds, self.steps, self.nodes,
+                    self.depth, self.output_size))
+
+
+def add_hook(hook):
+    ' Call hook(stats) with the DocumentStats of every converted document. '
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def enabled():
+    return bool(_hooks)
+
+
+class Recorder(object):
+    '''
+    Context manager that turns instrumentation on and keeps the
+    DocumentStats of the documents converted inside it:
+
+        >>> with Recorder() as recorder:
+        ...     mml2sympy(mml)
+        >>> recorder.documents
+        [DocumentStats('mml2sympy', seconds={'mml2tree': ...}, ...)]
+    '''
+
+    def __init__(self):
+        self.documents = []
+
+    def __call__(self, stats):
+        self.documents.append(stats)
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_hook(self)
+
+
+class StatsAggregator(object):
+    '''
+    Hook that sums up the DocumentStats of many documents, to be scraped
+    with export (a flat dict) or expose (Prometheus text format).
+    '''
+
+    def __init__(self, prefix='mml2sympy'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.documents = 0
+            self.steps = 0
+            self.nodes = 0
+            self.max_depth = 0
+            self.output_size = 0
+            self.seconds = dict((stage, 0.0) for stage in STAGES)
+
+    def __call__(self, stats):
+        with self._lock:
+            self.documents += 1
+            self.steps += stats.steps
+            self.nodes += stats.nodes
+            self.max_depth = max(self.max_depth, stats.depth)
+            self.output_size += stats.output_size
+            for stage, seconds in stats.seconds.items():
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def export(self):
+        ' ~> returns {metric name: value} '
+        with self._lock:
+            metrics = {
+                'documents_total': self.documents,
+                'steps_total': self.steps,
+                'nodes_total': self.nodes,
+                'depth_max': self.max_depth,
+                'output_bytes_total': self.output_size,
+            }
+            for stage, seconds in self.seconds.items():
+                metrics['seconds_total.' + stage] = seconds
+        return metrics
+
+    def expose(self):
+        ' ~> returns the metrics in the Prometheus text format '
+        lines = []
+        for name, value in sorted(self.export().items()):
+            name, _, stage = name.partition('.')
+            label = '{{stage="{0}"}}'.format(stage) if stage else ''
+            lines.append('{0}_{1}{2} {3}'.format(self.prefix, name, label,
+                                                 value))
+        return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def document(name):
+    '''
+    Groups the stages run inside it into one DocumentStats, e.g. to time
+    the sympify of the srepr strings along with their conversion. Does
+    nothing when instrumentation is off or a document is already open.
+    '''
+    stats = begin(name)
+    try:
+        yield stats
+    finally:
+        end(stats)
+
+
+def begin(name):
+    ' ~> returns the new current DocumentStats, or None '
+    if not _hooks or getattr(_local, 'document', None) is not None:
+        return None
+    stats = _local.document = DocumentStats(name)
+    return stats
+
+
+def end(stats):
+    if stats is None:
+        return
+    _local.document = None
+    for hook in list(_hooks):
+        hook(stats)
+
+
+def stage(name, func, *args, **kwargs):
+    ' ~> returns func(*args, **kwargs), timed as the stage name '
+    stats = getattr(_local, 'document', None) if _hooks else None
+    if stats is None:
+        return func(*args, **kwargs)
+
+    outer, stats._nested = stats._nested, 0.0
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.seconds[name] = (stats.seconds.get(name, 0.0) + elapsed -
+                               stats._nested)
+        stats._nested = outer + elapsed
+
+
+def observe_tree(tree):
+    ' Counts the nodes and depth of a modified step tree. '
+    stats = getattr(_local, 'document', None) if _hooks else None
+    if stats is None:
+        return
+
+    stats.steps += 1
+    level, depth = [tree], 0
+    while level:
+        depth += 1
+        stats.nodes += len(level)
+        level = [child for node in level for child in node.getchildren()]
+    stats.depth = max(stats.depth, depth)
+
+
+def observe_output(output, step=False):
+    '''
+    Adds the length of an output string to the output size, counting a
+    step when there is no modified tree for observe_tree to count.
+    '''
+    stats = getattr(_local, 'document', None) if _hooks else None
+    if stats is not None:
+        stats.output_size += len(output)
+        stats.steps += 1 if step else 0
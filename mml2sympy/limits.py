@@ -0,0 +1,125 @@
+'''
+Limits on the documents the converters take, so hostile or broken input
+(a megabyte long mrow, thousands of nested mfenced, a huge mn) fails
+fast with an MMLLimitError instead of pinning a worker:
+
+    >>> from mml2sympy import limits
+    >>> limits.set_limits(limits.Limits(max_nodes=10000, max_seconds=2))
+    >>> with limits.limited(max_depth=50):
+    ...     mml2sympy(mml)
+
+max_nodes, max_depth and max_leaf_length (the longest text, before
+stripping) are checked by mml2tree on the parsed tree with XPath
+queries, which run inside libxml2, before anything is converted.
+max_seconds is checked between the stages and steps of a conversion
+and every POLL_INTERVAL elements of the walks within a step, so it is
+overrun by at most that much work.
+
+Every converter taking a document (mml2sympy, mml2exprs, mml2steps,
+ParsedDocument, IncrementalConverter, check_steps, mml2binary,
+fingerprint) parses it with mml2tree and runs under the clock, as do
+the tree2 converters, which check an lxml tree they are given.
+'''
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+from lxml import etree
+
+from .exceptions import MMLLimitError
+
+Limits = namedtuple('Limits', ['max_nodes', 'max_depth', 'max_leaf_length',
+                               'max_seconds'],
+                    defaults=(None, None, None, None))
+
+NO_LIMITS = Limits()
+
+# elements walked between two check_time calls within a step
+POLL_INTERVAL = 1024
+
+_limits = NO_LIMITS  # for every thread without limited()
+_local = threading.local()
+
+# relative to the element checked, which can be a subtree of a document
+_count_elements = etree.XPath('count(descendant-or-self::*)')
+_longer_text = etree.XPath(
+    'boolean(descendant-or-self::*/text()[string-length() > $length])')
+
+
+def set_limits(limits):
+    ' Sets the limits of the process, None for no limits. '
+    global _limits
+    _limits = limits or NO_LIMITS
+
+
+def get_limits():
+    ' ~> returns the Limits in force in this thread '
+    return getattr(_local, 'limits', None) or _limits
+
+
+@contextmanager
+def limited(limits=None, **kwargs):
+    ' Applies limits, or Limits(**kwargs), in this thread inside the block. '
+    outer = getattr(_local, 'limits', None)
+    _local.limits = limits if limits is not None else Limits(**kwargs)
+    try:
+        yield _local.limits
+    finally:
+        _local.limits = outer
+
+
+def check_tree(tree, size=None):
+    '''
+    Checks a parsed document of size characters, or an element of one,
+    against the structural limits, raising MMLLimitError on the first
+    one it breaks. Only the element and its descendants are counted.
+    '''
+    limits = get_limits()
+    if limits.max_nodes is not None:
+        nodes = int(_count_elements(tree))
+        if nodes > limits.max_nodes:
+            raise MMLLimitError('the document has {0} elements, over the '
+                                'limit of {1}'.format(nodes, limits.max_nodes))
+    if limits.max_depth is not None and _deeper_than(limits.max_depth)(tree):
+        raise MMLLimitError('the document is nested deeper than {0} elements'
+                            .format(limits.max_depth))
+    if (limits.max_leaf_length is not None and
+            (size is None or size > limits.max_leaf_length) and
+            _longer_text(tree, length=limits.max_leaf_length)):
+        raise MMLLimitError('the document has a text longer than {0} '
+                            'characters'.format(limits.max_leaf_length))
+
+
+@lru_cache(maxsize=16)
+def _deeper_than(depth):
+    ' ~> returns an XPath query for whether any element is below depth '
+    return etree.XPath('boolean(self::*' + '/*' * depth + ')')
+
+
+def begin():
+    '''
+    Starts the max_seconds clock of a document, unless there is no limit
+    or one is running already (e.g. mml2steptrees inside mml2sympy).
+
+    ~> returns whether it was started, to hand to end
+    '''
+    seconds = get_limits().max_seconds
+    if seconds is None or getattr(_local, 'deadline', None) is not None:
+        return False
+    _local.deadline = time.perf_counter() + seconds
+    return True
+
+
+def end(started):
+    if started:
+        _local.deadline = None
+
+
+def check_time():
+    ' Raises MMLLimitError if the running document is out of time. '
+    deadline = getattr(_local, 'deadline', None)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise MMLLimitError('the conversion took longer than {0}s'
+                            .format(get_limits().max_seconds))
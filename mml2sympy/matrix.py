@@ -0,0 +1,109 @@
+from lxml import etree
+
+from .exceptions import MMLStructureError
+from .mml import (LEAF_FLOAT, LEAF_INTEGER, LEAF_SYMBOL, MML_NUM, MINUS_SIGN,
+                  OPEN_FENCES, PLUS_SIGN, _classify_leaf, _op_text,
+                  _table_rows, mml2tree, tree2expr)
+
+_SINGLE_MN_TEXTS = etree.XPath('mtr/mtd[count(*) = 1]/mn/text()',
+                               smart_strings=False)
+_COUNT_MTD = etree.XPath('count(mtd)')
+
+
+def mml2matrices(mml, numeric=True):
+    '''
+    Converts every matrix of the MML string, i.e. every mtable inside an
+    mfenced or between mo fences such as [ and ].
+
+    ~> returns a list of NumPy arrays (numeric tables, when numeric and
+        NumPy is installed) or sympy ImmutableMatrix objects.
+    '''
+    tree = mml2tree(mml)
+    return [table2matrix(mtable, numeric) for mtable in tree.iter('mtable')
+            if _is_fenced(mtable)]
+
+
+def table2matrix(mtable, numeric=True):
+    '''
+    Converts a mtable into a matrix, taking the fast table2array path for
+    all numeric tables when numeric is set.
+
+    ~> returns a NumPy array or a sympy ImmutableMatrix
+    '''
+    if mtable.tag != 'mtable':
+        raise MMLStructureError("mmltree does not contain mtable as its root Element")
+
+    if numeric:
+        array = table2array(mtable)
+        if array is not None:
+            return array
+    return tree2expr(mtable)
+
+
+def table2array(mtable):
+    '''
+    Fast path for numeric tables: the text of every cell is parsed by
+    NumPy in one go, without building any sympy object.
+
+    ~> returns the NumPy array, or None when a cell is not a single
+        (signed) mn, an integer does not fit in int64 or NumPy is not
+        installed.
+    '''
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    numbers = None
+    if hasattr(mtable, 'xpath'):
+        # lxml: when every cell is a single mn, let XPath pull the texts
+        # without creating a proxy per cell
+        widths = [int(_COUNT_MTD(mtr)) for mtr in mtable.iterchildren('mtr')]
+        if len(set(widths)) <= 1:
+            shape = (len(widths), widths[0] if widths else 0)
+            texts = _SINGLE_MN_TEXTS(mtable)
+            if len(texts) == shape[0] * shape[1]:
+                numbers = [_classify_leaf(text) for text in texts]
+
+    if numbers is None:
+        rows = _table_rows(mtable)
+        shape = (len(rows), len(rows[0]) if rows else 0)
+        numbers = [_cell_number(cell) for row in rows for cell in row]
+
+    if any(number is None or number[0] == LEAF_SYMBOL for number in numbers):
+        return None
+    is_float = any(kind == LEAF_FLOAT for kind, _ in numbers)
+    texts = [text for _, text in numbers]
+
+    try:
+        array = numpy.array(texts).astype(float if is_float else numpy.int64)
+    except OverflowError:
+        return None
+    return array.reshape(shape)
+
+
+def _cell_number(cell):
+    ' ~> returns (kind, text) of a cell holding one (signed) mn, else None '
+    children = cell.getchildren()
+    while len(children) == 1 and children[0].getchildren():
+        children = children[0].getchildren()  # unwrap mrow
+
+    sign = ''
+    if len(children) == 2 and _op_text(children[0]) in (PLUS_SIGN, MINUS_SIGN):
+        sign = _op_text(children[0])
+        children = children[1:]
+    if len(children) != 1 or children[0].tag != MML_NUM:
+        return None
+
+    kind, text = _classify_leaf(children[0].text or '')
+    if kind not in (LEAF_INTEGER, LEAF_FLOAT) or (sign and text[0] in '+-'):
+        return None
+    return kind, sign + text
+
+
+def _is_fenced(mtable):
+    parent = mtable.getparent()
+    if parent is not None and parent.tag == 'mfenced':
+        return True
+    previous = mtable.getprevious()
+    return previous is not None and _op_text(previous) in OPEN_FENCES
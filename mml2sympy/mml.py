@@ -1,8 +1,11 @@
-from copy import deepcopy
+import re
+import threading
+from functools import lru_cache
 from lxml import etree, objectify
-from sympy import *
 
-from .util import isplit
+from . import instrument, limits
+from .exceptions import MMLTypeError, MMLParseError, MMLStructureError
+from .nodes import Node, element2node, node2element
 
 MML_OP = 'mo'
 MML_NUM = 'mn'
@@ -12,305 +15,940 @@ PLUS_SIGN = '+'
 MINUS_SIGN = '-'
 ADD_OPS = [PLUS_SIGN, MINUS_SIGN]
 MUL_OPS = ['*', '×']
-DIV_OPS = ['/', '÷']  # TODO: section to handle modification of division to mfrac
+DIV_OPS = ['/', '÷']
 EQ_OPS = ['=']
 OPS = ADD_OPS + MUL_OPS + EQ_OPS + DIV_OPS
 
-SIMILAR_OPS = {
-    '+': ADD_OPS,
-    '-': ADD_OPS,
-    '=': EQ_OPS,
-    '*': MUL_OPS,
-    '×': MUL_OPS,
-    '/': MUL_OPS,
-}
-
 ADD_OPS_TAG = 'madd'
 MUL_OPS_TAG = 'mmul'
 EQ_OPS_TAG = 'meq'
+DIV_OPS_TAG = 'mfrac'
+
+# mo fences that group the elements between them, like an mfenced
+OPEN_FENCES = {'(': ')', '[': ']', '{': '}'}
+CLOSE_FENCES = frozenset(OPEN_FENCES.values())
+
+# binding powers used by modify, from the loosest to the tightest;
+# juxtaposed operands (2x, 2(x+1)) bind tighter than an explicit op
+EQ_POWER = 10
+ADD_POWER = 20
+MUL_POWER = 30
+IMPLICIT_MUL_POWER = 40
+UNARY_POWER = 50
+
+# (binding power, modified tag) of every infix operator
+OP_PRECEDENCE = dict(
+    [(op, (EQ_POWER, EQ_OPS_TAG)) for op in EQ_OPS] +
+    [(op, (ADD_POWER, ADD_OPS_TAG)) for op in ADD_OPS] +
+    [(op, (MUL_POWER, MUL_OPS_TAG)) for op in MUL_OPS] +
+    [(op, (MUL_POWER, DIV_OPS_TAG)) for op in DIV_OPS]
+)
+
+# the types of MML documents the converters take
+MML_TYPES = (str, bytes, bytearray, memoryview)
+
+# objectify's default parser, minus comments and processing instructions
+# huge_tree lifts libxml2's nesting limit from 256 to 2048 levels
+_PARSER_OPTIONS = dict(remove_blank_text=True, remove_comments=True,
+                       remove_pis=True, huge_tree=True)
+_parser = objectify.makeparser(**_PARSER_OPTIONS)
+
+# the usual namespace: one default declaration, on the root math element,
+# which is fed to the parser as a plain xmlnamespace attribute so tags
+# stay unqualified (mtable, not {...MathML}mtable) with no pass over them
+_ROOT_XMLNS_RE = re.compile(
+    br'\s*(?:<\?[^<>]*\?>\s*)?<math\s(?:[^<>]*?\s)?(xmlns)\s*=')
+_XMLNS = b'xmlns'
+_XMLNAMESPACE = b'xmlnamespace'
+
+# feed parsers keep state between calls, so each thread gets its own
+_feed_parsers = threading.local()
+
+# the most of a document fed to a feed parser at once
+FEED_CHUNK = 1 << 16
+
+# elements with no value of their own, converted as their only child
+SKIP_ELEMENTS = ["mrow", "mfenced", "mstyle", "mtr", "mtd"]
+
+# the end of a srepr call, by its evaluate flag
+_CLOSES = {False: r",evaluate=False)", True: r",evaluate=True)"}
+
+# tree2sympy writes to out whenever this many pieces are pending
+OUT_CHUNK_PIECES = 4096
+
+# subtrees SubtreeMemo converts once per structure
+MEMO_TAGS = frozenset(['mrow', 'mfenced', 'mfrac', 'msup', 'msqrt',
+                       ADD_OPS_TAG, MUL_OPS_TAG, EQ_OPS_TAG])
+
+# builds plain elements, without the py:pytype annotations
+# that objectify.Element adds
+_maker = objectify.ElementMaker(annotate=False)
+
+LEAF_INTEGER = 'integer'
+LEAF_FLOAT = 'float'
+LEAF_SYMBOL = 'symbol'
+LEAF_CACHE_SIZE = 4096
+
+INTEGER_RE = re.compile(r'[+-]?[0-9]+\Z')
+FLOAT_RE = re.compile(r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?\Z')
+
+
+@lru_cache(maxsize=LEAF_CACHE_SIZE)
+def _classify_leaf(text):
+    '''
+    Lexically classifies the raw text of an mn/mi element as an integer,
+    a float or a symbol, without going through sympify.
 
-
-def is_add(element):
-    return element.tag == MML_OP and element.text.strip() in ADD_OPS
-
-
-def is_mul(element):
-    return element.tag == MML_OP and element.text.strip() in MUL_OPS
-
-
-def is_div(element):
-    return element.tag == MML_OP and element.text.strip() in DIV_OPS
-
-
-def is_mfenced(element):
-    return element.tag == 'mfenced'
+    ~> returns a (kind, content) tuple with the stripped content.
+    '''
+    content = text.strip()
+    if INTEGER_RE.match(content):
+        return LEAF_INTEGER, content
+    if FLOAT_RE.match(content):
+        return LEAF_FLOAT, content
+    return LEAF_SYMBOL, content
 
 
-def mml2sympy(mml):
+def mml2sympy(mml, memoize=False):
     '''
     Converts the MML string into a list of
-    sympy expressions.
+    sympy expressions. With memoize, subtrees repeated across
+    the steps are converted once (see SubtreeMemo).
 
     ~> returns a list of sympy srepr expressions.
         These expressions can be sympified into sympy code.
     '''
-    if not isinstance(mml, str):
-        raise Exception('mml must be a string containing the math ML XML')
-
-    step_trees = mml2steptrees(mml)
-    step_trees = [modify(step_tree) for step_tree in step_trees]
-    step_sympies = [tree2sympy(step_tree) for step_tree in step_trees]
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+
+    stats = instrument.begin('mml2sympy')
+    started = limits.begin()
+    try:
+        memo = SubtreeMemo() if memoize else None
+        step_trees = instrument.stage('mml2steptrees', mml2steptrees, mml)
+        step_trees = [instrument.stage('modify', _modify_step, step_tree)
+                      for step_tree in step_trees]
+        step_sympies = [instrument.stage('tree2sympy', tree2sympy, step_tree,
+                                         memo=memo)
+                        for step_tree in step_trees]
+        if instrument.enabled():
+            for step_tree, step_sympy in zip(step_trees, step_sympies):
+                instrument.observe_tree(step_tree)
+                instrument.observe_output(step_sympy)
+    finally:
+        limits.end(started)
+        instrument.end(stats)
 
     return step_sympies
 
 
+def mml2exprs(mml, evaluate=False, memoize=False):
+    '''
+    Converts the MML string into a list of sympy expressions.
+
+    Unlike mml2sympy, the sympy objects are built directly from the
+    modified trees, so there is no srepr string to sympify afterwards.
+
+    ~> returns a list of sympy expressions.
+    '''
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+
+    stats = instrument.begin('mml2exprs')
+    started = limits.begin()
+    try:
+        memo = SubtreeMemo() if memoize else None
+        step_trees = instrument.stage('mml2steptrees', mml2steptrees, mml)
+        step_trees = [instrument.stage('modify', _modify_step, step_tree)
+                      for step_tree in step_trees]
+        step_exprs = [instrument.stage('tree2expr', tree2expr, step_tree,
+                                       evaluate=evaluate, memo=memo)
+                      for step_tree in step_trees]
+        if instrument.enabled():
+            for step_tree in step_trees:
+                instrument.observe_tree(step_tree)
+    finally:
+        limits.end(started)
+        instrument.end(stats)
+
+    return step_exprs
+
+
 def mml2steps(mml):
     '''
     Takes mml and converts it into a list of separate MML documents
     containing the mml code for each individual step. Converts rows
     in mtable into a list of basic mml expressions.
     '''
-    if not isinstance(mml, str):
-        raise Exception('mml must be a string containing the math ML XML')
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+
+    stats = instrument.begin('mml2steps')
+    started = limits.begin()
+    try:
+        step_trees = instrument.stage('mml2steptrees', mml2steptrees, mml)
+
+        steps = []
+        for step_tree in step_trees:
+            limits.check_time()
+            steps.append(step_document(step_tree))
+            instrument.observe_output(steps[-1], step=True)
+    finally:
+        limits.end(started)
+        instrument.end(stats)
 
-    step_trees = mml2steptrees(mml)
-
-    steps = []
-    for step_tree in step_trees:
-        math = objectify.Element('math')
-        mstyle = objectify.SubElement(math, 'mstyle')
-        mstyle.extend(step_tree.getchildren())
+    return steps
 
-        # take the newly build complete mathml object, clean it, string it
-        objectify.deannotate(math, cleanup_namespaces=True)
-        steps.append(etree.tostring(math).decode('UTF-8'))
 
-    return steps
+def step_document(step_tree):
+    '''
+    Serializes the children of a step tree as a document of its own,
+    <math><mstyle>...</mstyle></math>, leaving the tree untouched.
+    '''
+    children = b''.join(etree.tostring(child)
+                        for child in step_tree.iterchildren())
+    if not children:
+        return '<math><mstyle/></math>'
+    return '<math><mstyle>' + children.decode('utf-8') + '</mstyle></math>'
 
 
 def mml2steptrees(mml):
-    if not isinstance(mml, str):
-        raise Exception('mml must be a string containing the math ML XML')
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
 
-    tree = mml2tree(mml)
+    tree = instrument.stage('mml2tree', mml2tree, mml)
 
     if hasattr(tree, 'mstyle'):
-        tree = tree.xpath('/math/mstyle')[0]
+        tree = tree.mstyle
 
-    if hasattr(tree, 'mtable'):
-        step_trees = table2trees(tree.mtable)
+    # only a mtable standing alone is a list of steps, a fenced one
+    # (e.g. A = [ mtable ]) is a matrix within a single step
+    children = tree.getchildren()
+    if len(children) == 1 and children[0].tag == 'mtable':
+        step_trees = table2trees(children[0])
     else:
         step_trees = [tree]
 
     return step_trees
 
 
+class SubtreeMemo(object):
+    '''
+    Memo of converted subtrees keyed on their structure, so identical
+    subtrees (e.g. repeated across the rows of a mtable) are converted
+    once. Structures are hash-consed: every distinct (tag, text,
+    children) gets a small int id, so each element is hashed once.
+    '''
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.results = {}
+        self._ids = {}
+        self._keys = {}
+        self._elements = []  # keeps the ids in _keys from being reused
+
+    def reuse_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def key(self, element):
+        key = self._keys.get(id(element))
+        if key is not None:
+            return key
+
+        # children before parents, with an explicit stack for deep trees
+        stack = [(element, False)]
+        while stack:
+            element, expanded = stack.pop()
+            if id(element) in self._keys:
+                continue
+            children = element.getchildren()
+            if children and not expanded:
+                stack.append((element, True))
+                stack.extend((child, False) for child in children)
+                continue
+            children = tuple(self._keys[id(child)] for child in children)
+            text = '' if children else (element.text or '').strip()
+            key = self._ids.setdefault((element.tag, text, children),
+                                       len(self._ids))
+            self._keys[id(element)] = key
+            self._elements.append(element)
+        return key
+
+    def clear_elements(self):
+        '''
+        Forgets the keys of the elements seen so far, keeping the results,
+        so a long lived memo doesn't hold on to every tree it was given.
+        '''
+        self._keys.clear()
+        del self._elements[:]
+
+    def lookup(self, element, convert, *args):
+        ' ~> returns the memoized convert(element, *args, memo=self) '
+        key = self.key(element)
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+
+        self.misses += 1
+        result = convert(element, *args, memo=self)
+        self.results[key] = result
+        return result
+
+
 def tree2sympy(mmltree,
-               skip_elements=["mrow", "mfenced", "mstyle", "mtr", "mtd"],
-               evaluate=False):
-    sympyres = r""
+               skip_elements=SKIP_ELEMENTS,
+               evaluate=False,
+               memo=None,
+               out=None):
+    '''
+    Converts a modified mmltree into a sympy srepr string. With a
+    SubtreeMemo, identical subtrees are only converted once.
+
+    The string is written in pieces to a list joined once at the end,
+    or with out (a file-like object) streamed to out.write in chunks of
+    about OUT_CHUNK_PIECES pieces, in which case None is returned.
+    An lxml mmltree is converted as a Node tree, so it is left unchanged.
+    '''
+    started = limits.begin()
+    try:
+        limits.check_time()
+        parts = []
+        _write_sympy(_as_node(mmltree), skip_elements, evaluate, memo, parts,
+                     out)
+    finally:
+        limits.end(started)
+    if out is None:
+        return r"".join(parts)
+    out.write(r"".join(parts))
+
+
+def _write_sympy(tree, skip_elements, evaluate, memo, parts, out):
+    '''
+    Appends the srepr of tree to parts, in document order, with an
+    explicit stack of the open elements: an element's first piece is
+    written when it is opened and one more after each of its children.
+    Memoized subtrees are joined when they close, unless out has been
+    given the start of them already.
+    '''
+    write = parts.append
+    flushed = 0  # pieces already written to out
+    stack = []  # (remaining children, remaining pieces, start, memo key)
+    element = tree
+    polls = limits.POLL_INTERVAL
+    while True:
+        polls -= 1
+        if not polls:
+            limits.check_time()
+            polls = limits.POLL_INTERVAL
+        key = None
+        if memo is not None and element.tag in MEMO_TAGS:
+            key = memo.key(element)
+        if key is not None and key in memo.results:
+            memo.hits += 1
+            write(memo.results[key])
+        else:
+            if key is not None:
+                memo.misses += 1
+            children, pieces = _sympy_pieces(element, skip_elements, evaluate)
+            if children:
+                start = flushed + len(parts)
+                pieces = iter(pieces)
+                write(next(pieces))
+                children = iter(children)
+                element = next(children)
+                stack.append((children, pieces, start, key))
+                skip_elements, evaluate = SKIP_ELEMENTS, False
+                continue
+            write(pieces)
+            if key is not None:
+                memo.results[key] = parts[-1]
+
+        # close the open elements this completes
+        while stack:
+            children, pieces, start, key = stack[-1]
+            write(next(pieces))
+            element = next(children, None)
+            if element is not None:
+                break
+            stack.pop()
+            if key is not None and start >= flushed:
+                memo.results[key] = r"".join(parts[start - flushed:])
+        else:
+            return
+        skip_elements, evaluate = SKIP_ELEMENTS, False
+
+        if out is not None and len(parts) >= OUT_CHUNK_PIECES:
+            out.write(r"".join(parts))
+            flushed += len(parts)
+            del parts[:]
+
+
+def _sympy_pieces(mmltree, skip_elements, evaluate):
+    '''
+    ~> returns (children, pieces) for tree2sympy, where the srepr of
+        mmltree is pieces[0] + srepr(children[0]) + pieces[1] + ... +
+        pieces[-1], or (None, srepr) for an element without children
+        to convert
+    '''
+    children = mmltree.getchildren()
 
     # Non-atomic elements
     if mmltree.tag == "meq":
-        if len(mmltree.getchildren()) < 2:
-            raise Exception('meq element {0} doesn"t have at least 2 rows.'
-                            .format(etree.tostring(mmltree)))
-        sympyres += r"Eq("
-        sympyres += tree2sympy(mmltree.getchildren()[0])
-        sympyres += r","
-        sympyres += tree2sympy(mmltree.getchildren()[1])
-        sympyres += r",evaluate={0})".format(evaluate)
+        if len(children) < 2:
+            raise MMLStructureError('meq element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children[:2], [r"Eq(", r",", _close(evaluate)]
     elif mmltree.tag == "madd":
-        if len(mmltree.getchildren()) < 2:
-            raise Exception('madd element {0} doesn"t have at least 2 rows.'
-                            .format(etree.tostring(mmltree)))
-        sympyres += r"Add("
-        for child in mmltree.getchildren():
-            sympyres += tree2sympy(child)
-            sympyres += r","
-        sympyres += r"evaluate={0})".format(evaluate)
+        if len(children) < 2:
+            raise MMLStructureError('madd element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children, ([r"Add("] + [r","] * (len(children) - 1) +
+                          [_close(evaluate)])
     elif mmltree.tag == "mmul":
-        if len(mmltree.getchildren()) < 2:
-            raise Exception('mmul element {0} doesn"t have at least 2 rows.'
-                            .format(etree.tostring(mmltree)))
-        sympyres += r"Mul("
-        for child in mmltree.getchildren():
-            sympyres += tree2sympy(child)
-            sympyres += r","
-        sympyres += r"evaluate={0})".format(evaluate)
+        if len(children) < 2:
+            raise MMLStructureError('mmul element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children, ([r"Mul("] + [r","] * (len(children) - 1) +
+                          [_close(evaluate)])
     elif mmltree.tag == "msup":
-        if len(mmltree.getchildren()) < 2:
-            raise Exception('msup element {0} doesn"t have at least 2 rows.'
-                            .format(etree.tostring(mmltree)))
-        sympyres += r"Pow("
-        sympyres += tree2sympy(mmltree.getchildren()[0])
-        sympyres += r","
-        sympyres += tree2sympy(mmltree.getchildren()[1])
-        sympyres += r",evaluate={0})".format(evaluate)
+        if len(children) < 2:
+            raise MMLStructureError('msup element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children[:2], [r"Pow(", r",", _close(evaluate)]
     elif mmltree.tag == "mfrac":
-        if len(mmltree.getchildren()) < 2:
-            raise Exception("mfrac element {0} doesn't have at least 2 rows."
-                            .format(etree.tostring(mmltree)))
-        sympyres += r"Mul("
-        sympyres += tree2sympy(mmltree.getchildren()[0])
-        sympyres += r",Pow("
-        sympyres += tree2sympy(mmltree.getchildren()[1])
-        sympyres += r",Integer(-1))"  # close Pow
-        sympyres += r",evaluate={0})".format(evaluate)
+        if len(children) < 2:
+            raise MMLStructureError("mfrac element {0} doesn't have at least 2 rows."
+                                    .format(_tostring(mmltree)))
+        return children[:2], [r"Mul(", r",Pow(",
+                              r",Integer(-1))" + _close(evaluate)]
     elif mmltree.tag == "msqrt":
-        if len(mmltree.getchildren()) < 1:
-            raise Exception("msqrt element {0} doesn't have any elements."
-                            .format(etree.tostring(mmltree)))
-        sympyres += r"Pow("
-        sympyres += mml2sympy(mmltree.getchildren()[0])
-        sympyres += r",Rational(1,2)"
-        sympyres += r",evaluate={0})".format(evaluate)
+        if len(children) < 1:
+            raise MMLStructureError("msqrt element {0} doesn't have any elements."
+                                    .format(_tostring(mmltree)))
+        return _radicand(children), [r"Pow(",
+                                     r",Rational(1,2)" + _close(evaluate)]
+
+    elif mmltree.tag == "mtable":
+        # a mtable nested in an expression is a matrix
+        cells, pieces, piece = [], [], r"ImmutableMatrix(["
+        for row_index, row in enumerate(_table_rows(mmltree)):
+            piece += r",[" if row_index else r"["
+            for cell_index, cell in enumerate(row):
+                pieces.append(piece + r"," if cell_index else piece)
+                cells.append(cell)
+                piece = r""
+            piece += r"]"
+        pieces.append(piece + r"])")
+        if not cells:
+            return None, pieces[0]
+        return cells, pieces
 
     # Skip elements (mrow, mstyle, mfenced, etc.)
     elif mmltree.tag in skip_elements:
+        # nested rows (e.g. inside mfenced or mfrac) are left ungrouped
+        # by modify, so group them here before converting
+        if len(children) > 1:
+            return _sympy_pieces(modify(mmltree), skip_elements, evaluate)
         # handle the fill mrow tag... combine all subexpressions
-        sympyres += ''.join([tree2sympy(mmltree_child)
-                            for mmltree_child in mmltree.getchildren()])
+        if children:
+            return children, [r"", r""]
+        return None, r""
 
     # Atomic elements (mi, mn)
     elif mmltree.tag == "mn" or mmltree.tag == "mi":
-        content = mmltree.text.strip()
-        content_type = type(sympify(content))
+        kind, content = _classify_leaf(mmltree.text)
         # Handle integer content (.text method) in 'cn' tags
-        if content_type == Integer or\
-                str(content_type) == "<class 'sympy.core.numbers.One'>":
-            sympyres += r"Integer(" + content + r")"
+        if kind == LEAF_INTEGER:
+            return None, r"Integer(" + content + r")"
         # Handle float content (.text method) in 'cn' tags
-        elif content_type == Float:
-            sympyres += r"Float('" + content + r"', prec = 15)"
+        elif kind == LEAF_FLOAT:
+            return None, r"Float('" + content + r"', prec = 15)"
         # Handle symbol
         else:
-            sympyres += r"Symbol('" + content + r"')"
+            return None, r"Symbol('" + content + r"')"
+
+    return None, r""
+
+
+def _close(evaluate):
+    ' ~> returns the end of a srepr call with its evaluate flag '
+    return _CLOSES.get(evaluate) or r",evaluate={0})".format(evaluate)
 
-    return sympyres
+
+def tree2expr(mmltree,
+              skip_elements=SKIP_ELEMENTS,
+              evaluate=False,
+              memo=None):
+    '''
+    Builds the sympy expression for a modified mmltree directly.
+
+    Mirrors tree2sympy element for element, so that
+    tree2expr(tree) == sympify(tree2sympy(tree), evaluate=False).
+    An lxml mmltree is converted as a Node tree, so it is left unchanged.
+
+    ~> returns a sympy expression, or None for elements with no value.
+    '''
+    started = limits.begin()
+    try:
+        limits.check_time()
+        return _walk(_as_node(mmltree), _expand_expr, skip_elements,
+                     evaluate, memo)
+    finally:
+        limits.end(started)
+
+
+def _expand_expr(mmltree, skip_elements, evaluate):
+    '''
+    ~> returns (children, build) for tree2expr: the children to convert
+        first and build(child results) making the expression of mmltree,
+        or (None, expression) when there is nothing to convert first
+    '''
+    sympy = _sympy()
+    children = mmltree.getchildren()
+
+    # Non-atomic elements
+    if mmltree.tag == "meq":
+        if len(children) < 2:
+            raise MMLStructureError('meq element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children[:2], lambda r: sympy.Eq(r[0], r[1], evaluate=evaluate)
+    elif mmltree.tag == "madd":
+        if len(children) < 2:
+            raise MMLStructureError('madd element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children, lambda r: sympy.Add(*r, evaluate=evaluate)
+    elif mmltree.tag == "mmul":
+        if len(children) < 2:
+            raise MMLStructureError('mmul element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children, lambda r: sympy.Mul(*r, evaluate=evaluate)
+    elif mmltree.tag == "msup":
+        if len(children) < 2:
+            raise MMLStructureError('msup element {0} doesn"t have at least 2 rows.'
+                                    .format(_tostring(mmltree)))
+        return children[:2], lambda r: sympy.Pow(r[0], r[1], evaluate=evaluate)
+    elif mmltree.tag == "mfrac":
+        if len(children) < 2:
+            raise MMLStructureError("mfrac element {0} doesn't have at least 2 rows."
+                                    .format(_tostring(mmltree)))
+        # the srepr form leaves the inner Pow evaluated, so match it
+        return children[:2], lambda r: sympy.Mul(
+            r[0], sympy.Pow(r[1], sympy.Integer(-1)), evaluate=evaluate)
+    elif mmltree.tag == "msqrt":
+        if len(children) < 1:
+            raise MMLStructureError("msqrt element {0} doesn't have any elements."
+                                    .format(_tostring(mmltree)))
+        return _radicand(children), lambda r: sympy.Pow(
+            r[0], sympy.Rational(1, 2), evaluate=evaluate)
+
+    elif mmltree.tag == "mtable":
+        # a mtable nested in an expression is a matrix
+        rows = _table_rows(mmltree)
+        widths = [len(row) for row in rows]
+
+        def build(r):
+            cells = iter(r)
+            return sympy.ImmutableMatrix([[next(cells) for _ in range(width)]
+                                          for width in widths])
+        return [cell for row in rows for cell in row], build
+
+    # Skip elements (mrow, mstyle, mfenced, etc.)
+    elif mmltree.tag in skip_elements:
+        if len(children) > 1:
+            return _expand_expr(modify(mmltree), skip_elements, evaluate)
+        if children:
+            return children, lambda r: r[0]
+        return None, None
+
+    # Atomic elements (mi, mn)
+    elif mmltree.tag == "mn" or mmltree.tag == "mi":
+        kind, content = _classify_leaf(mmltree.text)
+        if kind == LEAF_INTEGER:
+            return None, sympy.Integer(content)
+        elif kind == LEAF_FLOAT:
+            return None, sympy.Float(content, 15)
+        else:
+            return None, sympy.Symbol(content)
+
+    return None, None
+
+
+def _walk(tree, expand, skip_elements, evaluate, memo):
+    '''
+    Converts tree bottom up with an explicit stack of frames instead of
+    recursion, so deeply nested trees don't hit the recursion limit.
+
+    expand(element, skip_elements, evaluate) gives the children to
+    convert first and the function building the element's result from
+    theirs. Only the root is expanded with skip_elements and evaluate,
+    its descendants get the defaults. Results of MEMO_TAGS elements are
+    looked up in and stored to the memo.
+    '''
+    stack = []  # (remaining children, build, results, memo key)
+    element = tree
+    polls = limits.POLL_INTERVAL
+    while True:
+        polls -= 1
+        if not polls:
+            limits.check_time()
+            polls = limits.POLL_INTERVAL
+        key = None
+        if memo is not None and element.tag in MEMO_TAGS:
+            key = memo.key(element)
+        if key is not None and key in memo.results:
+            memo.hits += 1
+            result = memo.results[key]
+        else:
+            if key is not None:
+                memo.misses += 1
+            children, result = expand(element, skip_elements, evaluate)
+            if children:
+                children = iter(children)
+                element = next(children)
+                stack.append((children, result, [], key))
+                skip_elements, evaluate = SKIP_ELEMENTS, False
+                continue
+            if children is not None:
+                result = result([])
+            if key is not None:
+                memo.results[key] = result
+
+        # hand the result up to the open elements it completes
+        while stack:
+            children, build, results, key = stack[-1]
+            results.append(result)
+            element = next(children, None)
+            if element is not None:
+                break
+            stack.pop()
+            result = build(results)
+            if key is not None:
+                memo.results[key] = result
+        else:
+            return result
+        skip_elements, evaluate = SKIP_ELEMENTS, False
 
 
 def modify(mmltree):
     '''
-    Recursively modifies the mmltree so that collections of mn, mi, mo
+    Modifies the mmltree so that collections of mn, mi, mo
     objects are properly made into extended mml trees with
     custom elements in order to facilitate proper building
     of Add, Mul, etc.
 
+    The children are parsed by operator precedence (see OP_PRECEDENCE)
+    and regrouped in place: elements are moved under the new
+    madd/mmul/meq/mfrac elements, never copied. A Node tree is
+    immutable, so a new Node is returned for it instead.
+
     ~> returns the mmltree with elements modified accordingly
     '''
     if mmltree is None or not mmltree.getchildren():
         return mmltree
 
-    # build a copy to use to modify and remove its children
-    modified_tree = deepcopy(mmltree)
-    [modified_tree.remove(child) for child in modified_tree.getchildren()]
+    if isinstance(mmltree, Node):
+        children = _PrecedenceParser(mmltree.children, Node.make,
+                                     _negative_one_node).parse()
+        return mmltree._replace(children=tuple(children))
 
     all_elements = mmltree.getchildren()
+    for child in all_elements:
+        mmltree.remove(child)
 
-    # if first element is an ADD op, handle applying that op
-    # as a mmul of the op and the following mn/mi
-    first_elem = all_elements[0]
-    if first_elem.tag == MML_OP and first_elem.text.strip() in ADD_OPS:
-        second_elem = all_elements[1] if len(all_elements) > 1 else None
-
-        if first_elem.text.strip() == PLUS_SIGN:
-            all_elements.remove(first_elem)  # just remove it...
-        elif first_elem.text.strip() == MINUS_SIGN:
-            mmul = objectify.Element(MUL_OPS_TAG)
-            negative_one = objectify.fromstring('<mn> -1 </mn>')
-            mmul.append(negative_one)
-            mmul.append(second_elem)
-
-            # replace the first_elem, second_elem with the new mmul
-            all_elements.remove(first_elem)
-            all_elements.remove(second_elem)
-            all_elements.insert(0, mmul)
-
-    if hasattr(mmltree, 'mfenced'):
-        # if the mmltree itself is not already a mmul element..
-        # otherwise, just ignore mfenced is already handled..
-        if mmltree.tag != MUL_OPS_TAG:
-            # grab all the add, div elements in all_elements
-            add_div_elems = [e for e in all_elements if is_add(e) or is_div(e)]
-            split_by_not_mul = isplit(all_elements, add_div_elems)
-            for group in split_by_not_mul:
-                # if they contain an mfenced and two or more elements...
-                if any(is_mfenced(elem) for elem in group) and len(group) >= 2:
-                    mmul = objectify.Element(MUL_OPS_TAG)
-                    mmul.extend(group)  # don't recurse here... recurse below
-
-                    # remove all the elements in the group and
-                    # replace them with the mmul for the mfenced
-                    group_begin_idx = all_elements.index(group[0])
-                    [all_elements.remove(element) for element in group]
-                    all_elements.insert(group_begin_idx, mmul)
-
-    # lastly handle the elements themselves
-    op_elements = _highest_priority_ops(all_elements)
-    if op_elements:
-        elements_split = isplit(all_elements, op_elements)
-        tag = _modified_tag_for(op_elements[0])
-        op = objectify.Element(tag)
-        for grouped_elems in elements_split:
-            if len(grouped_elems) > 1:  # need to recursively modify
-                placeholder = objectify.Element('placeholder')
-                placeholder.extend(grouped_elems)
-                modified_group_tree = modify(placeholder)
-                op.extend(modified_group_tree.getchildren())  # rm placeholder
-            else:  # just one element so append as leaf -- extend since list
-                op.extend(grouped_elems)
-        modified_tree.append(op)
-    elif len(all_elements) > 1:  # no op elements so must be multiple mn/mi
-        mmul = objectify.Element(MUL_OPS_TAG)
-        mmul.extend(all_elements)
-        modified_tree.append(mmul)
-    else:  # only one element so just leave it alone
-        modified_tree.extend(all_elements)
-
-    # remove namespaces from objectify and return modified tree
-    objectify.deannotate(modified_tree, cleanup_namespaces=True)
-    return modified_tree
-
-
-def _modified_tag_for(element):
-    ' Return the proper modified tag for the element. '
-    if element.text.strip() in ADD_OPS:
-        tag = ADD_OPS_TAG
-    elif element.text.strip() in EQ_OPS:
-        tag = EQ_OPS_TAG
-    elif element.text.strip() in MUL_OPS:
-        tag = MUL_OPS_TAG
-    else:
-        raise Exception("modified tag not found for: {0}".format(element))
+    parser = _PrecedenceParser(all_elements, _make_element,
+                               _negative_one_element)
+    mmltree.extend(parser.parse())
 
-    return tag
+    return mmltree
 
 
-def _highest_priority_ops(elements):
-    ops = [elem for elem in elements if elem.tag == MML_OP]
-    if not ops:
-        return []  # no ops so return empty list
+def _as_node(mmltree):
+    '''
+    The converters group the nested rows of a tree with modify as they
+    go, which regroups an lxml tree in place, so they work on its Node
+    tree instead and leave the caller's elements unchanged. An lxml
+    tree is checked against the limits first, like a parsed document.
+
+    ~> returns the Node tree of mmltree
+    '''
+    if isinstance(mmltree, Node):
+        return mmltree
+    limits.check_tree(mmltree)
+    return element2node(mmltree)
 
-    ops.sort(key=lambda elem: elem.text.strip(), reverse=True)  # by =, +/-, ..
-    highest_priority_op = ops[0]  # highest priority op
-    similar_ops = SIMILAR_OPS.get(highest_priority_op.text.strip(), None)
 
-    if not similar_ops:
-        raise Exception("found op {0} that does not have similar_ops"
-                        .format(highest_priority_op))
+def _radicand(children):
+    '''
+    The children of a msqrt are an inferred mrow, so several of them are
+    grouped into one mrow and modified, like a skip element's.
+
+    ~> returns the list of the one child to convert
+    '''
+    if len(children) == 1:
+        return children
+    return [modify(Node.make('mrow', [_as_node(child) for child in children]))]
+
 
-    return [elem for elem in ops if elem.text.strip() in similar_ops]
+def _modify_step(step_tree):
+    ' ~> returns the modified Node tree of a step of a parsed document '
+    limits.check_time()
+    return modify(element2node(step_tree))
 
 
-def table2trees(mmltree):
+_sympy_module = None
+
+
+def _sympy():
+    '''
+    Import sympy the first time a sympy object is built, so the string
+    only paths (mml2sympy, mml2steps) never pay for importing it.
+    '''
+    global _sympy_module
+    if _sympy_module is None:
+        import sympy
+        _sympy_module = sympy
+    return _sympy_module
+
+
+def _tostring(tree):
+    ' Serialize an lxml element or a Node for error messages. '
+    if isinstance(tree, Node):
+        tree = node2element(tree)
+    return etree.tostring(tree)
+
+
+def _op_text(element):
+    ' Return the stripped text of an mo element, or None for operands. '
+    if element.tag != MML_OP:
+        return None
+    return (element.text or '').strip()
+
+
+def _op_precedence(element, op):
+    ' Return the (binding power, modified tag) of the op element. '
+    if op not in OP_PRECEDENCE:
+        raise MMLStructureError("found op {0} that is not in OP_PRECEDENCE"
+                                .format(_tostring(element)))
+    return OP_PRECEDENCE[op]
+
+
+class _PrecedenceParser(object):
+    '''
+    Precedence climbing parser over a run of sibling elements.
+
+    mo elements are operators looked up in OP_PRECEDENCE, every other
+    element is an operand and two adjacent operands are an implicit
+    multiplication. A leading + is dropped and a leading - becomes a
+    mmul with -1. A - between operands joins the madd like a +, with
+    its right operand negated the same way, so a - b is a + (-1)b.
+    Each element is visited once.
+
+    make(tag, children) and negative_one() build the new elements, so
+    the same parser groups lxml elements and Nodes.
+    '''
+
+    def __init__(self, elements, make, negative_one):
+        self.elements = elements
+        self.make = make
+        self.negative_one = negative_one
+        self.pos = 0
+
+    def parse(self):
+        ' ~> returns the list of grouped elements '
+        if not self.elements:
+            return []
+        grouped = self.expression(0)
+        if self.pos < len(self.elements):
+            raise MMLStructureError("found op {0} without an opening fence"
+                                    .format(_tostring(self.elements[self.pos])))
+        return [grouped]
+
+    def expression(self, min_power):
+        '''
+        Parses operands joined by ops binding tighter than min_power.
+
+        The operands of prefix ops, the contents of mo fences and the
+        right operands of infix ops are parsed in nested frames on an
+        explicit stack instead of by recursion, so deeply nested input
+        doesn't hit the recursion limit.
+        '''
+        stack = []
+        frame = _Frame(min_power, None)
+        polls = limits.POLL_INTERVAL
+        while True:
+            polls -= 1
+            if not polls:
+                limits.check_time()
+                polls = limits.POLL_INTERVAL
+            if frame.left is None:
+                element = self.prefix(frame)
+                if element is None:
+                    # a prefix op or an open fence, parse its operand
+                    stack.append(frame)
+                    frame = frame.nested
+                    continue
+                frame.left = element
+
+            if self.infix(frame):
+                stack.append(frame)
+                frame = frame.nested
+                continue
+
+            # the frame is done, hand its result to the frame below
+            result = frame.result(self.make)
+            if frame.prefix is not None:
+                result = self.close_prefix(frame.prefix, result)
+            if not stack:
+                return result
+            nested, frame = frame, stack.pop()
+            if nested.prefix is not None:
+                frame.left = result
+            else:
+                if frame.negate:
+                    result = self.negate(result)
+                frame.add(result, self.make)
+
+    def prefix(self, frame):
+        '''
+        ~> returns the next operand, or None after opening a nested frame
+            for the operand of a prefix op or the contents of a fence
+        '''
+        if self.pos >= len(self.elements):
+            raise MMLStructureError("expected an operand after {0}"
+                                    .format(_tostring(self.elements[-1])))
+        element = self.elements[self.pos]
+        self.pos += 1
+
+        op = _op_text(element)
+        if op is None:
+            return element
+        elif op == PLUS_SIGN or op == MINUS_SIGN:
+            frame.nested = _Frame(UNARY_POWER, element)
+            return None
+        elif op in OPEN_FENCES:
+            frame.nested = _Frame(0, element)
+            return None
+        raise MMLStructureError("found op {0} without a left operand"
+                                .format(_tostring(element)))
+
+    def close_prefix(self, element, operand):
+        ' ~> returns the operand of a prefix op or fence, grouped '
+        op = _op_text(element)
+        if op == PLUS_SIGN:
+            return operand
+        elif op == MINUS_SIGN:
+            return self.negate(operand)
+
+        if self.pos >= len(self.elements) or \
+                _op_text(self.elements[self.pos]) != OPEN_FENCES[op]:
+            raise MMLStructureError("found op {0} without a closing {1}"
+                                    .format(_tostring(element),
+                                            OPEN_FENCES[op]))
+        self.pos += 1
+        return operand
+
+    def negate(self, operand):
+        ' ~> returns the operand multiplied by -1 '
+        return self.make(MUL_OPS_TAG, [self.negative_one(), operand])
+
+    def infix(self, frame):
+        '''
+        Reads the next infix op (or implicit multiplication) of the frame.
+
+        ~> returns True after opening a nested frame for its right operand,
+            False when the frame ends here
+        '''
+        if self.pos >= len(self.elements):
+            return False
+        element = self.elements[self.pos]
+        op = _op_text(element)
+        implicit = op is None or op in OPEN_FENCES
+        if op in CLOSE_FENCES:
+            return False
+        elif implicit:
+            power, tag = IMPLICIT_MUL_POWER, MUL_OPS_TAG
+        else:
+            power, tag = _op_precedence(element, op)
+        if power <= frame.min_power:
+            return False
+        if not implicit:
+            self.pos += 1
+
+        frame.pending = (power, tag)
+        frame.negate = op == MINUS_SIGN
+        frame.nested = _Frame(power, None)
+        return True
+
+
+class _Frame(object):
+    '''
+    State of one expression being parsed by _PrecedenceParser: its left
+    operand, the n-ary op chain being collected, the op waiting for its
+    right operand (and whether it is a - that negates that operand) and
+    the prefix op or fence it is the operand of.
+    '''
+    __slots__ = ('min_power', 'prefix', 'left', 'chain', 'operands',
+                 'pending', 'negate', 'nested')
+
+    def __init__(self, min_power, prefix):
+        self.min_power = min_power
+        self.prefix = prefix
+        self.left = None
+        self.chain = None  # (power, tag) of the n-ary op being collected
+        self.operands = None
+        self.pending = None
+        self.negate = False
+        self.nested = None
+
+    def add(self, right, make):
+        ' Joins the right operand of the pending op onto the frame. '
+        power, tag = self.pending
+        if self.chain == (power, tag):
+            self.operands.append(right)
+            return
+
+        if self.chain is not None:
+            self.left = make(self.chain[1], self.operands)
+        if tag == DIV_OPS_TAG:
+            self.left = make(tag, [self.left, right])
+            self.chain = None
+        else:
+            self.operands = [self.left, right]
+            self.chain = (power, tag)
+
+    def result(self, make):
+        if self.chain is not None:
+            return make(self.chain[1], self.operands)
+        return self.left
+
+
+def _make_element(tag, children):
+    return _maker(tag, *children)
+
+
+def _negative_one_element():
+    return _maker(MML_NUM, ' -1 ')
+
+
+def _negative_one_node():
+    return Node.leaf(MML_NUM, '-1')
+
+
+def table2trees(mmltree, matrix=False):
+    '''
+    Takes an mtable and returns the first mtd of each mtr, one per step.
+    With matrix, returns every mtd instead, as a list of rows.
+    '''
     if str(type(mmltree)) != "<class 'lxml.objectify.ObjectifiedElement'>":
-        raise Exception("mmltree is not an lxml.objectify.ObjectifiedElement")
+        raise MMLTypeError("mmltree is not an lxml.objectify.ObjectifiedElement")
     if mmltree.tag != 'mtable':
-        raise Exception("mmltree does not contain mtable as its root Element")
+        raise MMLStructureError("mmltree does not contain mtable as its root Element")
+
+    if matrix:
+        return _table_rows(mmltree)
 
-    # TODO: eventually support multiple mtd in mtr
-    # this would support matrices, vectors, etc.
     child_trees = []
     for mtr in mmltree.getchildren():
         if hasattr(mtr, 'mtd'):
@@ -319,15 +957,110 @@ def table2trees(mmltree):
     return child_trees
 
 
-def mml2tree(mml):
+def _table_rows(mtable):
     '''
-    Takes an MML string and converts it to lxml's etree format.
+    Return the mtd cells of a mtable (an lxml element or a Node) as a
+    list of rows, checking that every row has the same width.
     '''
-    if not isinstance(mml, str):
-        raise Exception('mml must be of type str')
+    rows = [[mtd for mtd in mtr.getchildren() if mtd.tag == 'mtd']
+            for mtr in mtable.getchildren() if mtr.tag == 'mtr']
+    if len(set(len(row) for row in rows)) > 1:
+        raise MMLStructureError("mtable {0} has rows of different widths"
+                                .format(_tostring(mtable)))
+    return rows
+
 
-    mml_cleaned = mml.replace(' xmlns="', ' xmlnamespace="')
-    tree = objectify.fromstring(mml_cleaned)
-    objectify.deannotate(tree, cleanup_namespaces=True)
+def mml2tree(mml):
+    '''
+    Takes an MML str, bytes or memoryview and converts it to lxml's
+    objectify format. Raises MMLLimitError for a document over the
+    limits of mml2sympy.limits.
+    '''
+    if isinstance(mml, str):
+        # libxml2 reads UTF-8 bytes faster than a str, which lxml only
+        # takes without an encoding declaration anyway
+        if not mml.startswith('<?xml'):
+            mml = mml.encode('utf-8')
+    elif isinstance(mml, (bytearray, memoryview)):
+        mml = bytes(mml)
+    elif not isinstance(mml, bytes):
+        raise MMLTypeError('mml must be of type str, bytes or memoryview')
+
+    try:
+        tree, qualified = _parse(mml)
+    except (etree.XMLSyntaxError, ValueError) as e:
+        raise MMLParseError(str(e)) from e
+    limits.check_tree(tree, len(mml))
+    if qualified:
+        _strip_namespaces(tree)
+    limits.check_time()
 
     return tree
+
+
+def _parse(mml):
+    '''
+    Parses mml (str or bytes). A document with only the usual namespace
+    (see _ROOT_XMLNS_RE) is fed to a feed parser with its declaration
+    renamed, in FEED_CHUNK pieces of the original buffer so it is never
+    copied whole.
+
+    ~> returns the tree and whether it may have qualified tags
+    '''
+    if isinstance(mml, str):
+        # a str still declares its encoding, which lxml only takes
+        # through a feed parser
+        return _feed_parse((mml, 0, len(mml))), 'xmlns' in mml
+
+    match = _ROOT_XMLNS_RE.match(mml)
+    if match is None or mml.find(_XMLNS, match.end()) != -1:
+        return objectify.fromstring(mml, _parser), _XMLNS in mml
+
+    buffer = memoryview(mml)
+    return _feed_parse((buffer, 0, match.start(1)),
+                       (_XMLNAMESPACE, 0, len(_XMLNAMESPACE)),
+                       (buffer, match.end(1), len(mml))), False
+
+
+def _feed_parse(*pieces):
+    ' Parses the (buffer, start, end) pieces of a document in order. '
+    parser = getattr(_feed_parsers, 'parser', None)
+    if parser is None:
+        parser = _feed_parsers.parser = objectify.makeparser(**_PARSER_OPTIONS)
+    try:
+        for buffer, start, end in pieces:
+            _feed(parser, buffer, start, end)
+    except etree.XMLSyntaxError:
+        _close_quietly(parser)
+        raise
+    return parser.close()
+
+
+def _strip_namespaces(tree):
+    '''
+    Renames every qualified element of tree to its local name, so a
+    document reads the same whatever the form of its namespaces
+    (prefixed, declared on inner elements, quoted with \').
+    '''
+    for element in tree.iter(tag=etree.Element):
+        tag = element.tag
+        if tag[0] == '{':
+            element.tag = etree.QName(tag).localname
+    etree.cleanup_namespaces(tree)
+
+
+def _feed(parser, buffer, start, end):
+    ' Feeds buffer[start:end] (a str, bytes or memoryview) to the parser. '
+    for offset in range(start, end, FEED_CHUNK):
+        piece = buffer[offset:min(offset + FEED_CHUNK, end)]
+        # feed takes str and bytes, not memoryviews
+        parser.feed(piece.tobytes() if isinstance(piece, memoryview)
+                    else piece)
+
+
+def _close_quietly(parser):
+    ' Resets a feed parser that has seen a syntax error. '
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
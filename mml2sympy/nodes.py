@@ -0,0 +1,107 @@
+import sys
+from collections import namedtuple
+
+from lxml import etree
+
+
+class Node(namedtuple('Node', ['tag', 'text', 'children'])):
+    '''
+    Immutable node of the compact tree modify and tree2sympy work on
+    once a document is parsed. Tags are interned, leaf text is stripped
+    and children is a tuple of nodes; non-leaf nodes have no text.
+
+    Equality and hashing walk the tree with an explicit stack, as the
+    tuple versions recurse once per level and so fail on deep trees.
+    '''
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if not isinstance(other, Node):
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            node, other = stack.pop()
+            if node is other:
+                continue
+            if node.tag != other.tag or node.text != other.text or \
+                    len(node.children) != len(other.children):
+                return False
+            stack.extend(zip(node.children, other.children))
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        stack = [(self, False)]
+        hashes = []  # of the finished nodes, the children of a node on top
+        while stack:
+            node, expanded = stack.pop()
+            if not node.children:
+                hashes.append(hash((node.tag, node.text)))
+            elif not expanded:
+                stack.append((node, True))
+                stack.extend((child, False)
+                             for child in reversed(node.children))
+            else:
+                start = len(hashes) - len(node.children)
+                value = hash((node.tag, tuple(hashes[start:])))
+                del hashes[start:]
+                hashes.append(value)
+        return hashes[0]
+
+    def getchildren(self):
+        ' Same as lxml, so the converters walk both kinds of tree. '
+        return self.children
+
+    @classmethod
+    def make(cls, tag, children):
+        return cls(sys.intern(tag), None, tuple(children))
+
+    @classmethod
+    def leaf(cls, tag, text):
+        return cls(sys.intern(tag), sys.intern(text.strip()), ())
+
+
+def element2node(element):
+    '''
+    Builds the Node tree of an lxml element, skipping comments and
+    processing instructions. Namespaced tags are built by local name. Children are built before their parents
+    with an explicit stack, so the depth isn't bound by recursion.
+
+    ~> returns the root Node
+    '''
+    stack = [(element, None)]
+    built = []  # finished Nodes, the children of an element on top
+    while stack:
+        element, children = stack.pop()
+        if children is None:
+            children = list(element.iterchildren(tag=etree.Element))
+            stack.append((element, children))
+            stack.extend((child, None) for child in reversed(children))
+            continue
+        tag = element.tag
+        if tag[0] == '{':
+            tag = etree.QName(tag).localname
+        if children:
+            nodes = tuple(built[len(built) - len(children):])
+            del built[len(built) - len(children):]
+            built.append(Node.make(tag, nodes))
+        else:
+            built.append(Node.leaf(tag, element.text or ''))
+    return built[0]
+
+
+def node2element(node):
+    ' ~> returns the lxml element of a Node tree, e.g. for etree.tostring '
+    root = etree.Element(node.tag)
+    stack = [(node, root)]
+    while stack:
+        node, element = stack.pop()
+        if node.children:
+            stack.extend((child, etree.SubElement(element, child.tag))
+                         for child in node.children)
+        elif node.text:
+            element.text = node.text
+    return root
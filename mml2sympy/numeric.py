@@ -0,0 +1,99 @@
+from functools import lru_cache
+
+from .exceptions import MMLTypeError
+from .mml import (LEAF_SYMBOL, MML_SYM, MML_TYPES, _classify_leaf, mml2steptrees,
+                  modify, tree2expr)
+from .nodes import Node, element2node
+
+COMPILE_CACHE_SIZE = 1024
+
+
+class CompiledStep(object):
+    '''
+    A converted step compiled into a vectorized NumPy function. The
+    arguments are the symbols of the step's mi leaves, in the order they
+    first appear. Equations evaluate to lhs - rhs, so 0 means the
+    equation holds at that point.
+    '''
+    __slots__ = ('symbols', 'expr', 'func')
+
+    def __init__(self, symbols, expr, func):
+        self.symbols = symbols
+        self.expr = expr
+        self.func = func
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def evaluate(self, points):
+        '''
+        Evaluates the step at many points at once, given either as an
+        array of shape (n, len(symbols)) or as a {symbol: values} mapping.
+
+        ~> returns an array of n values
+        '''
+        import numpy
+
+        if isinstance(points, dict):
+            columns = [numpy.asarray(points[symbol]) for symbol in self.symbols]
+            size = len(columns[0]) if columns else 0
+        else:
+            points = numpy.asarray(points, dtype=float)
+            if points.ndim == 1:
+                points = points.reshape(-1, len(self.symbols))
+            columns = list(points.T)
+            size = len(points)
+        # constant steps evaluate to a scalar
+        return numpy.broadcast_to(self.func(*columns), (size,))
+
+
+def mml2funcs(mml):
+    '''
+    Converts the MML string and compiles every step (see compile_step).
+
+    ~> returns a list of CompiledStep
+    '''
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+
+    return [compile_step(modify(element2node(step_tree)))
+            for step_tree in mml2steptrees(mml)]
+
+
+def compile_step(step_tree):
+    '''
+    Compiles a modified step into a CompiledStep. lxml trees are turned
+    into Nodes first; compiled steps are cached on the Node, so steps
+    that only differ in whitespace are compiled once.
+    '''
+    if not isinstance(step_tree, Node):
+        step_tree = element2node(step_tree)
+    return _compile_node(step_tree)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_node(node):
+    import sympy
+
+    names = _symbol_names(node)
+    expr = tree2expr(node)
+    if isinstance(expr, sympy.Equality):
+        expr = expr.lhs - expr.rhs
+    symbols = [sympy.Symbol(name) for name in names]
+    func = sympy.lambdify(symbols, expr, modules='numpy')
+    return CompiledStep(names, expr, func)
+
+
+def _symbol_names(node):
+    ' ~> returns the symbol names of the mi leaves, in document order '
+    names = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(reversed(node.children))
+        elif node.tag == MML_SYM:
+            kind, content = _classify_leaf(node.text)
+            if kind == LEAF_SYMBOL and content not in names:
+                names.append(content)
+    return names
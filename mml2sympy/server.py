@@ -0,0 +1,204 @@
+'''
+A small HTTP/JSON server for mml2sympy and mml2steps:
+
+    python -m mml2sympy.server --port 8000 --workers 4
+
+POST /mml2sympy (or /mml2steps) with {"mml": "<math>...</math>"} answers
+{"result": [...]}, and with {"documents": [...]} answers {"results": [...]}
+holding a {"result": ...} or {"error": ..., "message": ...} per document.
+GET /health answers {"status": "ok", "pending": n}.
+'''
+import argparse
+import asyncio
+import json
+
+from .aio import FUNCS, AsyncConverter, ConverterBusy
+from .batch import DocumentError
+from .limits import Limits
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_CONNECTIONS = 256
+# documents of a batch request sent to a worker at once
+BATCH_CHUNKSIZE = 16
+
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    422: 'Unprocessable Entity',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class _HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super(_HTTPError, self).__init__(message)
+        self.status = status
+
+
+class MMLServer(object):
+    '''
+    Serves conversions from an AsyncConverter over HTTP/1.1 with
+    keep-alive. Requests that would queue beyond the converter's
+    max_queued are answered with 503 right away, and at most
+    max_connections connections are served at once.
+    '''
+
+    def __init__(self, converter=None, max_connections=MAX_CONNECTIONS,
+                 max_body_bytes=MAX_BODY_BYTES):
+        self.converter = converter or AsyncConverter()
+        self.max_connections = max_connections
+        self.max_body_bytes = max_body_bytes
+        self._connections = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        ' ~> returns the started asyncio server '
+        self._connections = asyncio.Semaphore(self.max_connections)
+        return await asyncio.start_server(self._serve, host, port)
+
+    async def _serve(self, reader, writer):
+        async with self._connections:
+            try:
+                keep_alive = True
+                while keep_alive:
+                    keep_alive = await self._serve_request(reader, writer)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+    async def _serve_request(self, reader, writer):
+        ' ~> returns whether the connection stays open for another request '
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            await _respond(writer, 400, {'error': 'headers too long'}, False)
+            return False
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, version = lines[0].split(' ')
+        except ValueError:
+            await _respond(writer, 400, {'error': 'bad request line'}, False)
+            return False
+        headers = dict((name.strip().lower(), value.strip())
+                       for name, _, value in
+                       (line.partition(':') for line in lines[1:] if line))
+        keep_alive = (version == 'HTTP/1.1' and
+                      headers.get('connection', '').lower() != 'close')
+
+        try:
+            length = int(headers.get('content-length', 0))
+            if length > self.max_body_bytes:
+                raise _HTTPError(413, 'the body is over {0} bytes'
+                                 .format(self.max_body_bytes))
+            body = await reader.readexactly(length) if length else b''
+            status, payload = await self.handle(method, path, body)
+        except _HTTPError as e:
+            status, payload = e.status, {'error': str(e)}
+            keep_alive = keep_alive and e.status != 413
+        except ValueError:
+            status, payload = 400, {'error': 'bad content-length'}
+            keep_alive = False
+        await _respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    async def handle(self, method, path, body):
+        ' ~> returns (HTTP status, JSON payload) for a request '
+        if path == '/health':
+            return 200, {'status': 'ok',
+                         'pending': self.converter.pending}
+        func = path.lstrip('/')
+        if func not in FUNCS:
+            raise _HTTPError(404, 'no such endpoint {0}'.format(path))
+        if method != 'POST':
+            raise _HTTPError(405, 'use POST')
+        try:
+            request = json.loads(body.decode('utf-8'))
+        except ValueError:
+            raise _HTTPError(400, 'the body is not JSON') from None
+        if not isinstance(request, dict):
+            raise _HTTPError(400, 'the body is not a JSON object')
+
+        if not isinstance(request.get('documents', []), list):
+            raise _HTTPError(400, 'documents is not a JSON array')
+
+        try:
+            if 'documents' in request:
+                results = await self.converter.convert_many(
+                    request['documents'], func, wait=False,
+                    chunksize=BATCH_CHUNKSIZE)
+                return 200, {'results': [
+                    {'error': result.error, 'message': result.message}
+                    if isinstance(result, DocumentError) else
+                    {'result': result}
+                    for result in results]}
+            if 'mml' in request:
+                result = await self.converter.convert(request['mml'], func,
+                                                      wait=False)
+                return 200, {'result': result}
+        except ConverterBusy as e:
+            raise _HTTPError(503, str(e)) from None
+        except TimeoutError as e:
+            raise _HTTPError(504, str(e)) from None
+        except Exception as e:
+            # the document failed to convert
+            return 422, {'error': type(e).__name__, 'message': str(e)}
+        raise _HTTPError(400, 'expected a "mml" or "documents" key')
+
+
+async def _respond(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write('HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\n'
+                 'Content-Length: {2}\r\nConnection: {3}\r\n\r\n'
+                 .format(status, REASONS[status], len(body),
+                         'keep-alive' if keep_alive else 'close')
+                 .encode('latin-1') + body)
+    await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8000, **kwargs):
+    ' Runs an MMLServer until cancelled; kwargs go to AsyncConverter. '
+    async with AsyncConverter(**kwargs) as converter:
+        server = await MMLServer(converter).start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve mml2sympy over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: the cpu count)')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='conversions in flight at once')
+    parser.add_argument('--max-queued', type=int, default=None,
+                        help='requests waiting for a slot before 503')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds before a conversion answers 504')
+    parser.add_argument('--max-nodes', type=int,
+                        help='answer 422 for documents with more elements')
+    parser.add_argument('--max-depth', type=int,
+                        help='answer 422 for documents nested deeper')
+    parser.add_argument('--max-leaf-length', type=int,
+                        help='answer 422 for documents with a longer text')
+    parser.add_argument('--max-seconds', type=float,
+                        help='answer 422 for documents taking longer')
+    args = parser.parse_args(argv)
+    limits = Limits(args.max_nodes, args.max_depth, args.max_leaf_length,
+                    args.max_seconds)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers,
+                          max_pending=args.max_pending,
+                          max_queued=args.max_queued, timeout=args.timeout,
+                          limits=limits))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import signal
+import threading
+import time
+from collections import namedtuple
+
+from . import limits
+from .exceptions import MMLTypeError
+from .mml import MML_TYPES, _modify_step, mml2steptrees
+
+TIER_STRUCTURAL = 'structural'
+TIER_NUMERIC = 'numeric'
+TIER_SYMBOLIC = 'symbolic'
+TIER_TIMEOUT = 'timeout'
+TIERS = [TIER_STRUCTURAL, TIER_NUMERIC, TIER_SYMBOLIC]
+
+# equivalent is True, False, or None when the symbolic tier timed out
+# or failed (sympy recurses once per level of a deeply nested step)
+StepCheck = namedtuple('StepCheck', ['index', 'equivalent', 'tier'])
+
+
+class TierStats(object):
+    '''
+    Counters of check_steps: how many pairs each tier was run on, how
+    many it decided and the time spent in it.
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.runs = dict((tier, 0) for tier in TIERS)
+        self.decided = dict((tier, 0) for tier in TIERS)
+        self.seconds = dict((tier, 0.0) for tier in TIERS)
+        self.timeouts = 0
+
+    def record(self, tier, decided, seconds):
+        self.runs[tier] += 1
+        self.decided[tier] += 1 if decided else 0
+        self.seconds[tier] += seconds
+
+    def as_dict(self):
+        return dict((tier, {'runs': self.runs[tier],
+                            'decided': self.decided[tier],
+                            'seconds': self.seconds[tier]})
+                    for tier in TIERS)
+
+
+# process wide counters, used when check_steps is not given its own
+STATS = TierStats()
+
+
+def check_steps(mml, samples=16, tolerance=1e-8, timeout=5.0, seed=0,
+                stats=None):
+    '''
+    Checks that each step of the MML string follows from the previous
+    one, trying the cheapest test that can decide first:
+
+    1. structural: the modified trees are identical
+    2. numeric: both steps are evaluated at random points (needs numpy);
+       equations are equivalent when their lhs - rhs residuals are
+       proportional
+    3. symbolic: sympy simplification, limited to timeout seconds
+
+    ~> returns a StepCheck(index, equivalent, tier) for every step after
+        the first, index being the index of the later step.
+    '''
+    if not isinstance(mml, MML_TYPES):
+        raise MMLTypeError('mml must be a string containing the math ML XML')
+    stats = stats if stats is not None else STATS
+
+    started = limits.begin()
+    try:
+        steps = [_modify_step(step_tree) for step_tree in mml2steptrees(mml)]
+        checks = []
+        for index in range(1, len(steps)):
+            limits.check_time()
+            previous, current = steps[index - 1], steps[index]
+            checks.append(StepCheck(index, *_check_pair(
+                previous, current, samples, tolerance, timeout, seed, stats)))
+    finally:
+        limits.end(started)
+    return checks
+
+
+def _check_pair(previous, current, samples, tolerance, timeout, seed, stats):
+    ' Return (equivalent, tier) for two modified step Nodes. '
+    start = time.perf_counter()
+    same = previous == current
+    stats.record(TIER_STRUCTURAL, same, time.perf_counter() - start)
+    if same:
+        return True, TIER_STRUCTURAL
+
+    start = time.perf_counter()
+    equivalent = _probe(previous, current, samples, tolerance, seed)
+    stats.record(TIER_NUMERIC, equivalent is not None,
+                 time.perf_counter() - start)
+    if equivalent is not None:
+        return equivalent, TIER_NUMERIC
+
+    start = time.perf_counter()
+    try:
+        equivalent = _call_with_timeout(_simplifies, timeout,
+                                        previous, current)
+    except TimeoutError:
+        stats.record(TIER_SYMBOLIC, False, time.perf_counter() - start)
+        stats.timeouts += 1
+        return None, TIER_TIMEOUT
+    except RecursionError:
+        stats.record(TIER_SYMBOLIC, False, time.perf_counter() - start)
+        return None, TIER_SYMBOLIC
+    stats.record(TIER_SYMBOLIC, True, time.perf_counter() - start)
+    return equivalent, TIER_SYMBOLIC
+
+
+def _probe(previous, current, samples, tolerance, seed):
+    '''
+    Evaluates both steps at random points.
+
+    ~> returns True/False, or None when inconclusive (no numpy, steps
+        that don't compile or too few points where both are finite)
+    '''
+    try:
+        import numpy
+        from .numeric import compile_step
+        first, second = compile_step(previous), compile_step(current)
+    except Exception:
+        return None
+
+    names = first.symbols + [name for name in second.symbols
+                             if name not in first.symbols]
+    rng = numpy.random.default_rng(seed)
+    points = dict((name, rng.uniform(-10.0, 10.0, samples)) for name in names)
+    try:
+        with numpy.errstate(all='ignore'):
+            a = _evaluate(numpy, first, points, samples)
+            b = _evaluate(numpy, second, points, samples)
+    except Exception:
+        return None
+
+    finite = numpy.isfinite(a) & numpy.isfinite(b)
+    if finite.sum() < max(2, samples // 2):
+        return None
+    a, b = a[finite], b[finite]
+
+    scale = max(1.0, numpy.abs(a).max(), numpy.abs(b).max())
+    if not _is_equation(previous) or not _is_equation(current):
+        return bool(numpy.all(numpy.abs(a - b) <= tolerance * scale))
+
+    # equations: the residuals must be proportional, a = k * b
+    a_zero = numpy.abs(a) <= tolerance * scale
+    b_zero = numpy.abs(b) <= tolerance * scale
+    if numpy.any(a_zero != b_zero):
+        return False
+    if numpy.all(b_zero):
+        return True
+    ratios = a[~b_zero] / b[~b_zero]
+    return bool(numpy.all(numpy.abs(ratios - ratios[0]) <=
+                          tolerance * max(1.0, abs(ratios[0]))))
+
+
+def _evaluate(numpy, step, points, samples):
+    ' Return the values of the step at the points, broadcasting constants. '
+    values = step(*[points[name] for name in step.symbols])
+    return numpy.broadcast_to(numpy.asarray(values, dtype=complex), (samples,))
+
+
+def _simplifies(previous, current):
+    import sympy
+    from .mml import tree2expr
+
+    a, b = tree2expr(previous), tree2expr(current)
+    if isinstance(a, sympy.Equality) and isinstance(b, sympy.Equality):
+        a, b = a.lhs - a.rhs, b.lhs - b.rhs
+        if b == 0:
+            return bool(a == 0)
+        ratio = sympy.simplify(a / b)
+        return bool(ratio.is_number and ratio != 0)
+    return bool(sympy.simplify(a - b) == 0)
+
+
+def _is_equation(node):
+    while node.tag != 'meq' and len(node.children) == 1:
+        node = node.children[0]
+    return node.tag == 'meq'
+
+
+def _call_with_timeout(func, timeout, *args):
+    '''
+    Calls func(*args), raising TimeoutError after timeout seconds. In the
+    main thread this uses SIGALRM; elsewhere func runs in a daemon thread
+    that is abandoned when it times out, and the exceptions it raises
+    are raised again here.
+    '''
+    if timeout is None:
+        return func(*args)
+
+    if hasattr(signal, 'setitimer') and \
+            threading.current_thread() is threading.main_thread():
+        def alarm(signum, frame):
+            raise TimeoutError('step check timed out after {0}s'
+                               .format(timeout))
+
+        previous = signal.signal(signal.SIGALRM, alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return func(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    outcome = []  # (result, None) or (None, the exception func raised)
+
+    def run():
+        try:
+            outcome.append((func(*args), None))
+        except BaseException as e:
+            outcome.append((None, e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError('step check timed out after {0}s'.format(timeout))
+    result, error = outcome[0]
+    if error is not None:
+        raise error
+    return result
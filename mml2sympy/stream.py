@@ -0,0 +1,39 @@
+from lxml import etree
+
+from .batch import DocumentError
+from .exceptions import MMLParseError
+from .mml import mml2sympy
+
+MATHML_NAMESPACE = 'http://www.w3.org/1998/Math/MathML'
+MATH_TAGS = ('math', '{%s}math' % MATHML_NAMESPACE)
+
+
+def mml2sympy_stream(source, func=mml2sympy):
+    '''
+    Streams a file (a path or a binary file object) holding any number
+    of <math> elements, e.g. one per answer inside a root element, and
+    converts each with func as soon as it closes. Processed elements are
+    cleared so memory stays flat regardless of the file size.
+
+    ~> yields (index, steps) for each math element, where steps is
+        func(mml), or a DocumentError if the element failed to convert.
+    '''
+    index = 0
+    try:
+        for _, element in etree.iterparse(source, events=('end',),
+                                          tag=MATH_TAGS):
+            mml = etree.tostring(element, encoding='unicode', with_tail=False)
+            try:
+                steps = func(mml)
+            except Exception as e:
+                steps = DocumentError(index, type(e).__name__, str(e))
+            yield index, steps
+            index += 1
+
+            # drop the element and everything parsed before it
+            element.clear()
+            for node in [element] + list(element.iterancestors()):
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+    except etree.XMLSyntaxError as e:
+        raise MMLParseError(str(e)) from e
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mml2sympy import MMLParseError, MMLTypeError, mml2steps, mml2sympy
+from mml2sympy.aio import FUNCS, AsyncConverter, ConverterBusy, convert
+
+MML = '<math><mstyle><mn>{0}</mn><mi>x</mi><mo>=</mo><mn>7</mn></mstyle></math>'
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_convert():
+    assert run(convert(MML.format(2))) == mml2sympy(MML.format(2))
+
+
+def test_async_converter():
+    async def main():
+        async with AsyncConverter(workers=2) as converter:
+            steps = await converter.convert(MML.format(2), 'mml2steps')
+            with pytest.raises(MMLParseError):
+                await converter.convert('<math>')
+            documents = [MML.format(1), '<math>', MML.format(3)]
+            results = await converter.convert_many(documents, chunksize=2)
+            with pytest.raises(MMLTypeError):
+                await converter.convert_many(MML.format(1))
+            return steps, results
+
+    steps, results = run(main())
+    assert steps == mml2steps(MML.format(2))
+    assert results[0] == mml2sympy(MML.format(1))
+    assert results[1].index == 1
+    assert results[1].error == 'MMLParseError'
+    assert results[2] == mml2sympy(MML.format(3))
+
+
+def test_backpressure_and_timeout(monkeypatch):
+    monkeypatch.setitem(FUNCS, 'slow', lambda mml: time.sleep(0.2) or mml)
+
+    async def main():
+        executor = ThreadPoolExecutor(2)
+        converter = AsyncConverter(max_pending=1, max_queued=0,
+                                   executor=executor)
+        slow = asyncio.ensure_future(converter.convert('a', 'slow'))
+        await asyncio.sleep(0.01)
+        assert converter.pending == 1
+        with pytest.raises(ConverterBusy):
+            await converter.convert('b', 'slow', wait=False)
+        # waits for the slot instead
+        assert await converter.convert('c', 'slow') == 'c'
+        assert await slow == 'a'
+
+        with pytest.raises(TimeoutError):
+            await converter.convert('d', 'slow', timeout=0.05)
+        assert converter.pending == 1  # until the executor is done with it
+        await asyncio.sleep(0.3)
+        assert converter.pending == 0
+        executor.shutdown()
+
+    run(main())
+
+
+def test_busy_batch_is_cancelled(monkeypatch):
+    converted = []
+    monkeypatch.setitem(FUNCS, 'slow',
+                        lambda mml: time.sleep(0.1) or converted.append(mml))
+
+    async def main():
+        executor = ThreadPoolExecutor(2)
+        converter = AsyncConverter(max_pending=1, max_queued=0,
+                                   executor=executor)
+        slow = asyncio.ensure_future(converter.convert('a', 'slow'))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ConverterBusy):
+            await converter.convert_many(['b', 'c', 'd'], 'slow',
+                                         wait=False, chunksize=1)
+        await slow
+        await asyncio.sleep(0.3)
+        assert converted == ['a']
+        assert converter.pending == 0
+        executor.shutdown()
+
+    run(main())
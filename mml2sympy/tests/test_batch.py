@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from mml2sympy import batch
+from mml2sympy import mml2sympy, mml2sympy_batch, DocumentError, MMLTypeError
+
+
+MML = '''
+    <math xmlns="http://www.w3.org/1998/Math/MathML">
+      <mstyle displaystyle="true">
+        <mn> {0} </mn>
+        <mi> x </mi>
+        <mo> = </mo>
+        <mn> 7 </mn>
+      </mstyle>
+    </math>
+'''
+
+
+def test_mml2sympy_batch():
+    documents = [MML.format(n) for n in range(10)]
+    results = list(mml2sympy_batch(documents, workers=2, chunksize=3))
+    assert results == [mml2sympy(document) for document in documents]
+
+
+def test_mml2sympy_batch_errors():
+    documents = [MML.format(1), '<math><mn>', None, MML.format(2)]
+    results = list(mml2sympy_batch(documents, workers=1))
+    assert len(results) == 4
+    assert results[0] == mml2sympy(documents[0])
+    assert isinstance(results[1], DocumentError)
+    assert results[1].index == 1
+    assert results[1].error == 'MMLParseError'
+    assert results[2].error == 'MMLTypeError'
+    assert results[3] == mml2sympy(documents[3])
+
+
+def test_mml2sympy_batch_arguments():
+    # raised on the call, before the results are iterated
+    with pytest.raises(ValueError):
+        mml2sympy_batch([MML.format(1)], workers=0)
+    with pytest.raises(ValueError):
+        mml2sympy_batch([MML.format(1)], chunksize=0)
+    # a single document, not an iterable of them
+    with pytest.raises(MMLTypeError):
+        mml2sympy_batch(MML.format(1))
+    with pytest.raises(MMLTypeError):
+        mml2sympy_batch(MML.format(1).encode('utf-8'))
+
+
+def test_mml2sympy_batch_window(monkeypatch):
+    monkeypatch.setattr(batch, 'WINDOW_CHUNKS', 2)
+    read = []
+
+    def documents():
+        for n in range(1000):
+            read.append(n)
+            yield MML.format(n)
+
+    results = mml2sympy_batch(documents(), workers=2, chunksize=3)
+    assert next(results) == mml2sympy(MML.format(0))
+    time.sleep(0.5)
+    # the window of 2 chunks, one more taken by the result and one
+    # read by the task handler waiting for room
+    assert len(read) <= 2 * 3 + 2
+    results.close()
@@ -0,0 +1,55 @@
+import pytest
+from sympy import srepr
+
+from mml2sympy import mml2exprs
+from mml2sympy.binary import binary2exprs, mml2binary, tree2binary
+from mml2sympy.mml import mml2steptrees, modify, tree2expr
+from mml2sympy.nodes import element2node
+
+MML = '''
+    <math xmlns="http://www.w3.org/1998/Math/MathML">
+      <mstyle displaystyle="true">
+        <mtable>
+          <mtr><mtd>
+            <mfrac><mrow><mn>3</mn><mi>x</mi></mrow><mn>2</mn></mfrac>
+            <mo>-</mo><mn>-70000</mn><mo>=</mo><msqrt><mn>2.5</mn></msqrt>
+          </mtd></mtr>
+          <mtr><mtd>
+            <mfrac><mrow><mn>3</mn><mi>x</mi></mrow><mn>2</mn></mfrac>
+            <mo>=</mo><msup><mi>θ</mi><mn>2</mn></msup>
+          </mtd></mtr>
+          <mtr><mtd><mrow/></mtd></mtr>
+          <mtr><mtd>
+            <mn>2</mn><mtable>
+              <mtr><mtd><mn>1</mn></mtd><mtd><mi>x</mi></mtd></mtr>
+              <mtr><mtd><mi>y</mi></mtd><mtd><mn>0</mn></mtd></mtr>
+            </mtable>
+          </mtd></mtr>
+        </mtable>
+      </mstyle>
+    </math>
+'''
+
+
+def test_binary_round_trip():
+    data = mml2binary(MML)
+    exprs = binary2exprs(data)
+    assert [srepr(expr) for expr in exprs] == \
+        [srepr(expr) for expr in mml2exprs(MML)]
+    assert exprs[2] is None
+    # the repeated fraction is written once and decoded to one object
+    assert exprs[0].lhs.args[0] is exprs[1].lhs
+    assert len(data) < 100
+
+    tree = modify(element2node(mml2steptrees(MML)[0]))
+    for evaluate in [False, True]:
+        assert binary2exprs(tree2binary(tree, evaluate=evaluate)) == \
+            [tree2expr(tree, evaluate=evaluate)]
+
+
+def test_binary_errors():
+    data = mml2binary(MML)
+    with pytest.raises(ValueError):
+        binary2exprs(b'\x00' + data[1:])
+    with pytest.raises(ValueError):
+        binary2exprs(data + b'\x01')
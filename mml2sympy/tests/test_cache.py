@@ -0,0 +1,76 @@
+from mml2sympy import mml2sympy, mml2steps
+from mml2sympy.cache import ConversionCache, MemoryBackend, SQLiteBackend
+
+
+MML = '''
+    <math xmlns="http://www.w3.org/1998/Math/MathML">
+      <mstyle displaystyle="true">
+        <mn> {0} </mn>
+        <mi> x </mi>
+        <mo> = </mo>
+        <mn> 7 </mn>
+      </mstyle>
+    </math>
+'''
+
+
+def test_conversion_cache():
+    cache = ConversionCache()
+    assert cache.mml2sympy(MML.format(2)) == mml2sympy(MML.format(2))
+    assert cache.mml2steps(MML.format(2)) == mml2steps(MML.format(2))
+
+    # same document up to the whitespace between tags and namespace
+    flat = '<math><mstyle displaystyle="true"><mn> 2 </mn><mi> x </mi>' \
+           '<mo> = </mo><mn> 7 </mn></mstyle></math>'
+    assert cache.mml2sympy(flat) == mml2sympy(MML.format(2))
+    assert cache.mml2sympy(flat.encode('utf-8')) == mml2sympy(flat)
+    assert cache.mml2sympy(memoryview(MML.format(2).encode('utf-8'))) == \
+        mml2sympy(flat)
+    assert cache.stats() == {'hits': 3, 'misses': 2, 'entries': 2}
+    quoted = MML.format(2).replace(' xmlns="http://www.w3.org/1998/Math/MathML"',
+                                   "\n xmlns='http://www.w3.org/1998/Math/MathML'")
+    assert cache.mml2sympy(quoted) == mml2sympy(quoted) == mml2sympy(flat)
+    assert cache.stats() == {'hits': 4, 'misses': 2, 'entries': 2}
+
+    # leaf text is kept verbatim
+    spaced = flat.replace('<mi> x </mi>', '<mi>a  b</mi>')
+    assert cache.mml2steps(spaced) == mml2steps(spaced)
+    assert cache.mml2steps(spaced.replace('a  b', 'a b')) == \
+        mml2steps(spaced.replace('a  b', 'a b'))
+    assert cache.stats()['misses'] == 4
+
+
+def test_memory_backend_eviction():
+    cache = ConversionCache(MemoryBackend(max_entries=2))
+    for n in [1, 2, 1, 3]:
+        cache.mml2sympy(MML.format(n))
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'entries': 2}
+    cache.mml2sympy(MML.format(1))  # still cached, 2 was evicted
+    cache.mml2sympy(MML.format(2))
+    assert cache.stats()['hits'] == 2
+
+    backend = MemoryBackend(max_entries=None, max_bytes=300)
+    cache = ConversionCache(backend)
+    for n in range(10):
+        cache.mml2sympy(MML.format(n))
+    assert 0 < backend.bytes <= 300
+    assert len(backend) < 10
+
+    # the budget counts bytes, not characters
+    backend = MemoryBackend(max_entries=None)
+    backend.set('k', ['×'])
+    assert backend.bytes == 3
+
+
+def test_sqlite_backend(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ConversionCache(SQLiteBackend(path, max_entries=2))
+    for n in [1, 2, 1, 3]:
+        cache.mml2sympy(MML.format(n))
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'entries': 2}
+
+    # a second cache on the same file shares the entries
+    other = ConversionCache(SQLiteBackend(path, max_entries=2))
+    assert other.mml2sympy(MML.format(1)) == mml2sympy(MML.format(1))
+    assert other.mml2sympy(MML.format(3)) == mml2sympy(MML.format(3))
+    assert other.stats()['hits'] == 2
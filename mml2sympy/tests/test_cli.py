@@ -0,0 +1,88 @@
+import json
+
+from mml2sympy import mml2steps, mml2sympy
+from mml2sympy import batch, cli
+from mml2sympy.cli import convert_rows, main, resume_point
+
+MML = '<math><mstyle><mn>{0}</mn><mi>x</mi><mo>=</mo><mn>7</mn></mstyle></math>'
+
+
+def read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_cli_jsonl(tmp_path, capsys):
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    rows = [json.dumps({'id': n, 'mml': MML.format(n)}) for n in range(5)]
+    source.write_text('\n'.join(rows[:3] + ['{broken', '{"mml": "<math>"}'] +
+                                rows[3:]) + '\n')
+
+    assert main([str(source), '-o', str(output), '--jobs', '2',
+                 '--chunksize', '2']) == 0
+    records = read_output(output)
+    assert [record['row'] for record in records] == list(range(7))
+    assert records[0] == {'row': 0, 'id': 0, 'result': mml2sympy(MML.format(0))}
+    assert records[3]['error'] == 'ValueError'
+    assert records[4]['error'] == 'MMLParseError'
+    assert records[6]['result'] == mml2sympy(MML.format(4))
+    assert '7 rows converted (2 errors, 0 skipped)' in capsys.readouterr().err
+
+    # an interrupted run, cut in the middle of a row
+    complete = output.read_bytes()
+    output.write_bytes(complete[:complete.index(b'\n', 200) + 10])
+    main([str(source), '-o', str(output), '--resume'])
+    assert output.read_bytes() == complete
+
+
+def test_cli_csv_and_lines(tmp_path):
+    source, output = tmp_path / 'in.csv', tmp_path / 'out.jsonl'
+    source.write_text('key,answer\nk1,{0}\nk2,{1}\n'.format(MML.format(1),
+                                                            MML.format(2)))
+    main([str(source), '-o', str(output), '--field', 'answer',
+          '--id-field', 'key', '--steps'])
+    assert read_output(output) == [
+        {'row': 0, 'id': 'k1', 'result': mml2steps(MML.format(1))},
+        {'row': 1, 'id': 'k2', 'result': mml2steps(MML.format(2))}]
+
+    source = tmp_path / 'in.tsv'
+    source.write_text('key\tanswer\nk3\t{0}\n'.format(MML.format(3)))
+    main([str(source), '-o', str(output), '--field', 'answer',
+          '--id-field', 'key'])
+    assert read_output(output) == [
+        {'row': 0, 'id': 'k3', 'result': mml2sympy(MML.format(3))}]
+
+    source = tmp_path / 'in.txt'
+    source.write_text(MML.format(3) + '\n')
+    main([str(source), '-o', str(output)])
+    assert read_output(output) == [{'row': 0, 'result': mml2sympy(MML.format(3))}]
+
+
+def test_convert_rows_window(monkeypatch):
+    monkeypatch.setattr(batch, 'WINDOW_CHUNKS', 1)
+    rows = [(n, MML.format(n)) for n in range(20)]
+    results = list(convert_rows(iter(rows), jobs=2, chunksize=2))
+    assert results == [(n, mml2sympy(MML.format(n))) for n in range(20)]
+
+    # closing the results early stops the pool
+    results = convert_rows(iter(rows), jobs=2, chunksize=2)
+    assert next(results) == (0, mml2sympy(MML.format(0)))
+    results.close()
+
+
+def test_resume_point(tmp_path, monkeypatch):
+    # blocks smaller than a row, so the tail is read in several of them
+    monkeypatch.setattr(cli, 'RESUME_BLOCK', 4)
+    output = tmp_path / 'out.jsonl'
+    assert resume_point(str(output)) == 0
+    rows = b''.join(json.dumps({'row': n, 'result': ['x' * n]}).encode() + b'\n'
+                    for n in range(5))
+    output.write_bytes(rows)
+    assert resume_point(str(output)) == 5
+    assert output.read_bytes() == rows
+    output.write_bytes(rows + b'{"row": 5, "res')
+    assert resume_point(str(output)) == 5
+    assert output.read_bytes() == rows
+    output.write_bytes(b'{"row": 0, "res')
+    assert resume_point(str(output)) == 0
+    assert output.read_bytes() == b''
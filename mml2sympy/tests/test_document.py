@@ -0,0 +1,38 @@
+import pytest
+
+from mml2sympy import mml2exprs, mml2steps, mml2sympy
+from mml2sympy.document import ParsedDocument
+from mml2sympy.exceptions import MMLTypeError
+
+MML = '''
+    <math xmlns="http://www.w3.org/1998/Math/MathML">
+      <mstyle displaystyle="true">
+        <mtable>
+          <mtr><mtd><mn>2</mn><mi>x</mi><mo>=</mo><mn>6</mn></mtd></mtr>
+          <mtr><mtd><mi>x</mi><mo>=</mo><mfrac><mn>6</mn><mn>2</mn></mfrac></mtd></mtr>
+          <mtr><mtd/></mtr>
+        </mtable>
+      </mstyle>
+    </math>
+'''
+
+
+def test_parsed_document():
+    document = ParsedDocument(MML)
+    assert len(document) == 3
+    assert document.sreprs == mml2sympy(MML)
+    # the step trees are left intact for the conversions that follow
+    assert document.steps == mml2steps(MML)
+    assert document.steps[2] == '<math><mstyle/></math>'
+    assert document.exprs == mml2exprs(MML)
+    assert document.sreprs is document.sreprs
+    assert document.steps is document.steps
+
+    memoized = ParsedDocument(MML.encode('utf-8'), memoize=True)
+    assert memoized.exprs == document.exprs
+    assert memoized.sreprs == document.sreprs
+
+
+def test_parsed_document_type():
+    with pytest.raises(MMLTypeError):
+        ParsedDocument(None)
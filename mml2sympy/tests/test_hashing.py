@@ -0,0 +1,57 @@
+import pytest
+
+from mml2sympy import fingerprint
+from mml2sympy.exceptions import MMLStructureError, MMLTypeError
+
+STEP = '<mtr><mtd>{0}</mtd></mtr>'
+
+
+def document(*steps):
+    return ('<math><mstyle><mtable>' +
+            ''.join(STEP.format(step) for step in steps) +
+            '</mtable></mstyle></math>')
+
+
+def test_fingerprint_canonical():
+    steps = [
+        '<mn>3</mn><mo>+</mo><mn>2</mn><mi>x</mi><mo>=</mo><mn>7</mn>',
+        # reordered terms and factors, whitespace and leading zeros
+        '<mi> x </mi><mo>×</mo><mn>2</mn><mo>+</mo><mn>03</mn>'
+        '<mo>=</mo><mn>7</mn>',
+        '<mfenced><mrow><mn>2</mn><mi>x</mi><mo>+</mo><mn>3</mn></mrow>'
+        '</mfenced><mo>=</mo><mn>7</mn>',
+        # not the same: a sides swap, a fraction flipped, a float
+        '<mn>7</mn><mo>=</mo><mn>3</mn><mo>+</mo><mn>2</mn><mi>x</mi>',
+        '<mfrac><mn>2</mn><mi>x</mi></mfrac><mo>=</mo><mn>7</mn>',
+        '<mfrac><mi>x</mi><mn>2</mn></mfrac><mo>=</mo><mn>7</mn>',
+        '<mn>3</mn><mo>+</mo><mn>2</mn><mi>x</mi><mo>=</mo><mn>7.0</mn>',
+        '<mn>3</mn><mo>+</mo><mn>2</mn><mi>x</mi><mo>=</mo><mn>7.00</mn>',
+    ]
+    fingerprints = fingerprint(document(*steps))
+    assert fingerprint(document(*steps), memoize=True) == fingerprints
+    assert all(len(digest) == 32 for digest in fingerprints)
+    assert fingerprints[0] == fingerprints[1] == fingerprints[2]
+    assert fingerprints[6] == fingerprints[7]
+    assert len(set(fingerprints[2:7])) == 5
+
+
+def test_fingerprint_signs():
+    steps = [
+        '<mn>2</mn><mi>x</mi><mo>-</mo><mn>4</mn><mo>=</mo><mn>7</mn>',
+        '<mn>2</mn><mi>x</mi><mo>+</mo><mn>4</mn><mo>=</mo><mn>7</mn>',
+        '<mi>a</mi><mo>-</mo><mi>b</mi>',
+        '<mi>a</mi><mo>+</mo><mi>b</mi>',
+        '<mi>b</mi><mo>-</mo><mi>a</mi>',
+        # the same as a - b
+        '<mo>-</mo><mi>b</mi><mo>+</mo><mi>a</mi>',
+    ]
+    fingerprints = fingerprint(document(*steps))
+    assert len(set(fingerprints[:5])) == 5
+    assert fingerprints[5] == fingerprints[2]
+
+
+def test_fingerprint_errors():
+    with pytest.raises(MMLTypeError):
+        fingerprint(None)
+    with pytest.raises(MMLStructureError):
+        fingerprint(document('<msup><mi>x</mi></msup>'))
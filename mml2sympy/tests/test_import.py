@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+# generous, importing sympy alone takes longer than this
+IMPORT_BUDGET_US = 250000
+
+SCRIPT = '''
+import mml2sympy
+mml = '<math><mstyle><mn>2</mn><mi>x</mi><mo>=</mo><mn>7</mn></mstyle></math>'
+mml2sympy.mml2sympy(mml)
+mml2sympy.mml2steps(mml)
+'''
+
+
+def importtime(script):
+    ' ~> returns {module: cumulative import time in us} of running script '
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            stderr=subprocess.PIPE, check=True)
+    times = {}
+    for line in result.stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time():
+    times = importtime(SCRIPT)
+    assert 'mml2sympy' in times
+    assert not [module for module in times
+                if module == 'sympy' or module.startswith('sympy.')]
+    assert times['mml2sympy'] < IMPORT_BUDGET_US
+
+
+def test_sympy_imported_on_first_use():
+    times = importtime(SCRIPT + 'mml2sympy.mml2exprs(mml)\n')
+    assert 'sympy' in times
@@ -0,0 +1,45 @@
+import pytest
+
+from mml2sympy import mml2sympy
+from mml2sympy.incremental import IncrementalConverter
+
+ROW = '<mtr><mtd><mn>{0}</mn><mi>x</mi><mo>+</mo><mn>{1}</mn></mtd></mtr>'
+
+
+def document(rows):
+    return ('<math><mstyle><mtable>' +
+            ''.join(ROW.format(*row) for row in rows) +
+            '</mtable></mstyle></math>')
+
+
+def test_incremental_update():
+    converter = IncrementalConverter()
+    rows = [(n, n + 1) for n in range(5)]
+    mml = document(rows)
+    assert converter.update(mml) == mml2sympy(mml)
+    assert converter.rows_converted == 5
+
+    rows[2] = (2, 9)
+    mml = document(rows)
+    assert converter.update(mml) == mml2sympy(mml)
+    assert (converter.rows_converted, converter.rows_reused) == (6, 4)
+
+    # a single character edit of the last row
+    position = mml.rindex('<mn>4</mn>') + 4
+    sreprs = converter.edit(position, position + 1, '8')
+    assert converter.mml == mml[:position] + '8' + mml[position + 1:]
+    assert sreprs == mml2sympy(converter.mml)
+    assert converter.rows_converted == 7
+
+
+def test_incremental_errors():
+    converter = IncrementalConverter()
+    with pytest.raises(ValueError):
+        converter.edit(0, 0, '<math/>')
+
+    mml = document([(1, 2)])
+    sreprs = converter.update(mml)
+    with pytest.raises(Exception):
+        converter.update('<math><mn>1</mn>')
+    # a failed update leaves the previous version in place
+    assert (converter.mml, converter.sreprs) == (mml, sreprs)
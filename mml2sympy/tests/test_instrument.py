@@ -0,0 +1,62 @@
+from mml2sympy import instrument, mml2exprs, mml2steps, mml2sympy
+from mml2sympy.instrument import Recorder, StatsAggregator
+
+MML = '''
+    <math>
+      <mtable>
+        <mtr><mtd><mn>2</mn><mi>x</mi><mo>=</mo><mn>7</mn></mtd></mtr>
+        <mtr><mtd><mi>x</mi><mo>=</mo><mfrac><mn>7</mn><mn>2</mn></mfrac></mtd></mtr>
+      </mtable>
+    </math>
+'''
+
+
+def test_recorder():
+    with Recorder() as recorder:
+        sreprs = mml2sympy(MML)
+        mml2steps(MML)
+        mml2exprs(MML)
+    mml2sympy(MML)
+    assert not instrument.enabled()
+
+    converted, steps, exprs = recorder.documents
+    assert converted.name == 'mml2sympy'
+    assert sorted(converted.seconds) == ['mml2steptrees', 'mml2tree',
+                                         'modify', 'tree2sympy']
+    assert converted.steps == 2
+    # mtd(meq(mmul(2, x), 7)) and mtd(meq(x, mfrac(7, 2)))
+    assert converted.nodes == 12
+    assert converted.depth == 4
+    assert converted.output_size == sum(len(srepr) for srepr in sreprs)
+
+    assert sorted(steps.seconds) == ['mml2steptrees', 'mml2tree']
+    assert steps.steps == 2
+    assert 'tree2expr' in exprs.seconds
+
+
+def test_document_stage():
+    with Recorder() as recorder:
+        with instrument.document('graded'):
+            sreprs = mml2sympy(MML)
+            instrument.stage('sympify', len, sreprs[0])
+    stats, = recorder.documents
+    assert stats.name == 'graded'
+    assert stats.steps == 2
+    assert 'sympify' in stats.seconds
+
+
+def test_stats_aggregator():
+    aggregator = StatsAggregator()
+    instrument.add_hook(aggregator)
+    try:
+        mml2sympy(MML)
+        mml2sympy(MML)
+    finally:
+        instrument.remove_hook(aggregator)
+
+    metrics = aggregator.export()
+    assert metrics['documents_total'] == 2
+    assert metrics['steps_total'] == 4
+    assert metrics['depth_max'] == 4
+    assert metrics['seconds_total.modify'] > 0
+    assert 'mml2sympy_seconds_total{stage="tree2sympy"} ' in aggregator.expose()
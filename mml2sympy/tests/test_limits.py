@@ -0,0 +1,124 @@
+import itertools
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from mml2sympy import (MMLLimitError, IncrementalConverter, ParsedDocument,
+                       fingerprint, limits, mml2binary, mml2exprs, mml2steps,
+                       mml2sympy, mml2tree, tree2expr, tree2sympy)
+from mml2sympy.batch import mml2sympy_batch
+from mml2sympy.binary import tree2binary
+from mml2sympy.hashing import tree2fingerprint
+from mml2sympy.steps import check_steps
+
+MML = ('<math><mstyle>{0}<mo>+</mo><mi>x</mi><mo>=</mo><mn>7</mn>'
+       '</mstyle></math>')
+
+
+def nested(depth):
+    return MML.format('<mfenced>' * depth + '<mn>1</mn>' + '</mfenced>' * depth)
+
+
+def test_limits():
+    long_number = MML.format('<mn>{0}</mn>'.format('9' * 1000))
+    with limits.limited(max_nodes=30, max_depth=10, max_leaf_length=100):
+        assert mml2sympy(nested(5)) == \
+            ["Eq(Add(Integer(1),Symbol('x'),evaluate=False),Integer(7),evaluate=False)"]
+        with pytest.raises(MMLLimitError, match='deeper than 10'):
+            mml2sympy(nested(20))
+        with pytest.raises(MMLLimitError, match='elements'):
+            mml2steps(MML.format('<mn>1</mn><mo>+</mo>' * 15 + '<mn>1</mn>'))
+        with pytest.raises(MMLLimitError, match='longer than 100'):
+            mml2exprs(long_number)
+        # the thread's limits win over the process's
+        with limits.limited(limits.NO_LIMITS):
+            assert mml2sympy(long_number)
+    assert limits.get_limits() == limits.NO_LIMITS
+    assert mml2sympy(nested(20))
+
+    results = list(mml2sympy_batch([nested(5), nested(20)], workers=2,
+                                   limits=limits.Limits(max_depth=10)))
+    assert isinstance(results[0], list)
+    assert results[1].error == 'MMLLimitError'
+
+
+def test_time_limit(monkeypatch):
+    from mml2sympy import mml
+
+    def slow_step(step_tree, modify_step=mml._modify_step):
+        time.sleep(0.02)
+        return modify_step(step_tree)
+    monkeypatch.setattr(mml, '_modify_step', slow_step)
+    document = MML.format('<mn>2</mn>')
+    mtable = ('<math><mstyle><mtable>' +
+              '<mtr><mtd><mi>x</mi><mo>=</mo><mn>1</mn></mtd></mtr>' * 20 +
+              '</mtable></mstyle></math>')
+
+    limits.set_limits(limits.Limits(max_seconds=0.1))
+    try:
+        assert mml2sympy(document)
+        with pytest.raises(MMLLimitError, match='longer than 0.1s'):
+            mml2sympy(mtable)
+        # the clock of the failed document doesn't carry over
+        assert mml2sympy(document)
+    finally:
+        limits.set_limits(None)
+    assert len(mml2sympy(mtable)) == 20
+
+
+@pytest.mark.parametrize('convert', [
+    lambda mml: ParsedDocument(mml).sreprs,
+    lambda mml: ParsedDocument(mml).exprs,
+    lambda mml: IncrementalConverter().update(mml),
+    lambda mml: check_steps(mml, samples=0),
+    mml2binary,
+    fingerprint,
+    lambda mml: tree2binary(mml2tree(mml).mstyle),
+    lambda mml: tree2fingerprint(mml2tree(mml).mstyle),
+    lambda mml: tree2sympy(mml2tree(mml).mstyle),
+    lambda mml: tree2expr(mml2tree(mml).mstyle),
+])
+def test_limits_entry_points(convert):
+    document = MML.format('<mn>2</mn>')
+    assert convert(document) is not None
+    with limits.limited(max_seconds=0):
+        with pytest.raises(MMLLimitError, match='longer than 0s'):
+            convert(document)
+    # a tree given to the tree2 converters is checked too
+    tree = mml2tree(document).mstyle
+    for tree_convert in [tree2binary, tree2fingerprint, tree2sympy, tree2expr]:
+        with limits.limited(max_nodes=3):
+            with pytest.raises(MMLLimitError, match='elements'):
+                tree_convert(tree)
+
+
+def test_limits_subtree():
+    rows = ''.join('<mtr><mtd><mi>x</mi><mo>=</mo><mn>{0}</mn></mtd></mtr>'
+                   .format(n) for n in range(50))
+    tree = mml2tree('<math><mstyle><mtable>' + rows +
+                    '</mtable></mstyle></math>')
+    row = tree.mstyle.mtable.mtr[3]
+    # only the row is counted and measured, not the document around it
+    with limits.limited(max_nodes=20, max_depth=3, max_leaf_length=5):
+        assert tree2sympy(row) == "Eq(Symbol('x'),Integer(3),evaluate=False)"
+        with pytest.raises(MMLLimitError, match='elements'):
+            tree2sympy(tree)
+    with limits.limited(max_depth=2):
+        with pytest.raises(MMLLimitError, match='deeper than 2'):
+            tree2sympy(row)
+
+
+def test_time_limit_within_step(monkeypatch):
+    # a clock that moves one second per reading
+    clock = itertools.count()
+    monkeypatch.setattr(limits, 'time',
+                        SimpleNamespace(perf_counter=lambda: next(clock)))
+    monkeypatch.setattr(limits, 'POLL_INTERVAL', 4)
+    row = MML.format('<mn>1</mn><mo>+</mo>' * 50 + '<mn>1</mn>')
+    with limits.limited(max_seconds=20):
+        for convert in [mml2sympy, mml2exprs, mml2binary, fingerprint]:
+            with pytest.raises(MMLLimitError):
+                convert(row)
+        monkeypatch.setattr(limits, 'POLL_INTERVAL', 10 ** 6)
+        assert mml2sympy(row)
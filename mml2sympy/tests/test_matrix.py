@@ -0,0 +1,92 @@
+import pytest
+from lxml import etree
+from sympy import ImmutableMatrix, Rational, Symbol, sympify
+
+from mml2sympy import mml2sympy, mml2exprs, mml2tree, table2trees
+from mml2sympy.matrix import mml2matrices, table2array, table2matrix
+
+
+MATRIX = '''
+    <mtable>
+      <mtr>
+        <mtd><mn> 1 </mn></mtd>
+        <mtd><mo> - </mo><mn> 2 </mn></mtd>
+      </mtr>
+      <mtr>
+        <mtd><mn> {0} </mn></mtd>
+        <mtd><mn> 4 </mn></mtd>
+      </mtr>
+    </mtable>
+'''
+
+
+def document(body):
+    return '''
+        <math xmlns="http://www.w3.org/1998/Math/MathML">
+          <mstyle displaystyle="true">{0}</mstyle>
+        </math>
+    '''.format(body)
+
+
+def test_table2trees_matrix():
+    rows = table2trees(mml2tree(MATRIX.format(3)), matrix=True)
+    assert len(rows) == 2
+    assert [len(row) for row in rows] == [2, 2]
+    assert rows[0][1].mn == 2
+
+
+def test_matrix_in_expression():
+    mml = document('<mi>A</mi><mo>=</mo><mn>2</mn>'
+                   '<mfenced open="[" close="]">{0}</mfenced>'
+                   .format(MATRIX.format('x')))
+    expected = 2 * ImmutableMatrix([[1, -2], [Symbol('x'), 4]])
+    for expr in [sympify(mml2sympy(mml)[0], evaluate=False), mml2exprs(mml)[0]]:
+        assert expr.lhs == Symbol('A')
+        assert expr.rhs.doit() == expected
+
+
+def test_matrix_between_mo_fences():
+    matrix = ImmutableMatrix([[1, -2], [3, 4]])
+    for body in ['<mi>A</mi><mo>=</mo><mo>[</mo>{0}<mo>]</mo>',
+                 '<mo>[</mo>{0}<mo>]</mo>']:
+        mml = document(body.format(MATRIX.format(3)))
+        sreprs = mml2sympy(mml)
+        assert len(sreprs) == 1
+        expr = mml2exprs(mml)[0]
+        assert sympify(sreprs[0], evaluate=False) == expr
+        assert (expr.rhs if body.startswith('<mi>') else expr).doit() == matrix
+
+
+def test_table2matrix_leaves_table_unchanged():
+    mtable = mml2tree(MATRIX.format('x'))
+    before = etree.tostring(mtable)
+    assert table2matrix(mtable) == table2matrix(mtable)
+    assert etree.tostring(mtable) == before
+
+
+def test_mml2matrices():
+    mml = document('<mo>[</mo>{0}<mo>]</mo><mo>+</mo><mfenced>{1}</mfenced>'
+                   .format(MATRIX.format('x'), MATRIX.format(3)))
+    symbolic, numeric = mml2matrices(mml, numeric=False)
+    assert symbolic.doit() == ImmutableMatrix([[1, -2], [Symbol('x'), 4]])
+    assert numeric.doit() == ImmutableMatrix([[1, -2], [3, 4]])
+
+    mml = document('<mfenced><mtable><mtr><mtd><mfrac><mn>1</mn><mn>2</mn>'
+                   '</mfrac></mtd></mtr></mtable></mfenced>')
+    matrices = mml2matrices(mml)
+    assert len(matrices) == 1
+    assert matrices[0].doit() == ImmutableMatrix([[Rational(1, 2)]])
+
+
+def test_table2array():
+    numpy = pytest.importorskip('numpy')
+    array = table2array(mml2tree(MATRIX.format(3)))
+    assert array.dtype == numpy.int64
+    assert array.tolist() == [[1, -2], [3, 4]]
+
+    array = table2matrix(mml2tree(MATRIX.format('2.5e1')))
+    assert array.dtype == float
+    assert array.tolist() == [[1.0, -2.0], [25.0, 4.0]]
+
+    assert table2array(mml2tree(MATRIX.format('x'))) is None
+    assert table2array(mml2tree(MATRIX.format('9' * 30))) is None
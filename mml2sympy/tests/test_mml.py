@@ -1,6 +1,12 @@
+import io
+
+import pytest
+
 from lxml import etree
-from mml2sympy import mml2tree, tree2sympy, table2trees, modify, mml2sympy, mml2steps
-from mml2sympy.mml import _highest_priority_ops
+from sympy import Eq, Symbol, sqrt, srepr, sympify
+from mml2sympy import mml2tree, tree2sympy, tree2expr, table2trees, modify, mml2sympy, mml2exprs, mml2steps
+from mml2sympy.mml import SubtreeMemo, mml2steptrees, _classify_leaf, LEAF_INTEGER, LEAF_FLOAT, LEAF_SYMBOL
+from mml2sympy.exceptions import MMLParseError, MMLTypeError
 from mml2sympy.util import flatten_string
 
 
@@ -22,7 +28,10 @@ def test_modify():
               <mn>2</mn>
               <mi>x</mi>
             </mmul>
-            <mn>4</mn>
+            <mmul>
+              <mn>-1</mn>
+              <mn>4</mn>
+            </mmul>
             <mn>7</mn>
           </madd>
         </mtd>
@@ -36,6 +45,8 @@ def test_modify():
     assert hasattr(modified_tree.madd, 'mn')
     assert hasattr(modified_tree.madd, 'mmul')
     assert hasattr(modified_tree.madd.mmul, 'mi')
+    assert modified_tree.madd.countchildren() == 3
+    assert modified_tree.madd.mmul[1].mn[0] == -1
 
     modify_mml = '''
         <mtd>
@@ -55,7 +66,10 @@ def test_modify():
                 <mn>2</mn>
                 <mi>x</mi>
               </mmul>
-              <mn>4</mn>
+              <mmul>
+                <mn>-1</mn>
+                <mn>4</mn>
+              </mmul>
             </madd>
             <mn>7</mn>
           </meq>
@@ -71,21 +85,6 @@ def test_modify():
     assert hasattr(modified_tree.meq.madd, 'mmul')
 
 
-def test_modify__highest_priority_ops():
-    modify_mml = '''
-        <mtd>
-          <mn> 2 </mn>
-          <mo> &#x00D7; </mo>
-          <mo> - </mo>
-          <mn> 4 </mn>
-        </mtd>
-    '''
-    tree = mml2tree(modify_mml)
-    ops = _highest_priority_ops(tree.getchildren())
-    assert len(ops) == 1
-    assert ops[0].text.strip() == '×'
-
-
 def test_modify_times():
     modify_mml = '''
         <mtd>
@@ -370,6 +369,57 @@ def test_mml2tree():
     assert hasattr(mstyle, 'mtable')
 
 
+def test_mml2tree_bytes(monkeypatch):
+    mml = ('<math xmlns="http://www.w3.org/1998/Math/MathML"><mstyle>'
+           '<mn>2</mn><mi>x</mi><mo>=</mo><mi>θ</mi></mstyle></math>')
+    expected = mml2sympy(mml)
+    for document in [mml.encode('utf-8'), memoryview(mml.encode('utf-8')),
+                     bytearray(mml.encode('utf-8'))]:
+        tree = mml2tree(document)
+        assert tree.tag == 'math' and tree.mstyle.mn.tag == 'mn'
+        assert mml2sympy(document) == expected
+
+    # namespaces declared on more than one element, or not at all
+    nested = mml.replace('<mstyle>', '<mstyle xmlns="x">')
+    assert mml2sympy(nested) == expected
+    plain = mml.replace(' xmlns="http://www.w3.org/1998/Math/MathML"', '')
+    assert mml2sympy(plain.encode('utf-8')) == expected
+
+    # fed in pieces that split the θ and the tags
+    monkeypatch.setattr('mml2sympy.mml.FEED_CHUNK', 3)
+    for document in [mml, nested, mml.encode('utf-8'),
+                     '<?xml version="1.0"?>' + nested]:
+        assert mml2sympy(document) == expected
+    monkeypatch.undo()
+
+    # other forms of the namespace are stripped from the tree
+    single = mml.replace('"http://www.w3.org/1998/Math/MathML"',
+                         "'http://www.w3.org/1998/Math/MathML'")
+    newline = mml.replace(' xmlns=', '\n  xmlns=')
+    prefixed = mml.replace(' xmlns=', ' xmlns:m=').replace('<', '<m:') \
+        .replace('<m:/', '</m:')
+    for document in [single, newline, prefixed, prefixed.encode('utf-8'),
+                     '<?xml version="1.0"?>' + prefixed]:
+        tree = mml2tree(document)
+        assert tree.tag == 'math' and tree.mstyle.mn.tag == 'mn'
+        assert mml2sympy(document) == expected
+    # a namespaced tree built elsewhere converts by local names
+    assert tree2sympy(etree.fromstring(mml).find('{*}mstyle')) == expected[0]
+
+    # a str with an encoding declaration and no namespace
+    declared = '<?xml version="1.0" encoding="UTF-8"?>' + plain
+    assert mml2sympy(declared) == expected
+
+    # a syntax error doesn't leave the parser in a bad state
+    with pytest.raises(MMLParseError):
+        mml2tree(mml[:-3])
+    with pytest.raises(MMLParseError):
+        mml2tree(declared[:-3])
+    assert mml2sympy(mml) == expected
+    with pytest.raises(MMLTypeError):
+        mml2tree(42)
+
+
 def test_mml2sympy():
     mml = '''
         <math xmlns="http://www.w3.org/1998/Math/MathML">
@@ -386,7 +436,7 @@ def test_mml2sympy():
     step_sympies = mml2sympy(mml)
     assert step_sympies is not None
     assert len(step_sympies) == 1
-    assert step_sympies[0] == "Eq(Add(Mul(Integer(2),Symbol('x'),evaluate=False),Integer(4),evaluate=False),Integer(7),evaluate=False)"
+    assert step_sympies[0] == "Eq(Add(Mul(Integer(2),Symbol('x'),evaluate=False),Mul(Integer(-1),Integer(4),evaluate=False),evaluate=False),Integer(7),evaluate=False)"
 
     mml = '''
         <math xmlns="http://www.w3.org/1998/Math/MathML">
@@ -431,7 +481,7 @@ def test_mml2sympy():
     step_sympies = mml2sympy(mml)
     assert step_sympies is not None
     assert len(step_sympies) == 3
-    assert step_sympies[0] == "Eq(Add(Mul(Integer(2),Symbol('x'),evaluate=False),Integer(4),evaluate=False),Integer(7),evaluate=False)"
+    assert step_sympies[0] == "Eq(Add(Mul(Integer(2),Symbol('x'),evaluate=False),Mul(Integer(-1),Integer(4),evaluate=False),evaluate=False),Integer(7),evaluate=False)"
 
 
 def test_mml2steps():
@@ -480,3 +530,381 @@ def test_mml2steps():
     print(type(steps_mml[0]))
     assert steps_mml[0] == '<math><mstyle><mn> 2 </mn><mi> x </mi><mo> - </mo><mn> 4 </mn><mo> = </mo><mn> 7 </mn></mstyle></math>'
     assert steps_mml[1] == '<math><mstyle><mn> 2 </mn><mi> x </mi><mo> = </mo><mn> 11 </mn></mstyle></math>'
+
+
+def test_tree2expr():
+    tree_mml = '''
+      <meq>
+        <madd>
+          <mmul>
+            <mn>2</mn>
+            <mi>x</mi>
+          </mmul>
+          <mn>4</mn>
+        </madd>
+        <mn>7</mn>
+      </meq>
+    '''
+    tree = mml2tree(tree_mml)
+    expr = tree2expr(tree)
+    assert expr == sympify(tree2sympy(mml2tree(tree_mml)), evaluate=False)
+    assert srepr(expr) == "Equality(Add(Mul(Integer(2), Symbol('x')), Integer(4)), Integer(7))"
+
+    tree_mml = '''
+      <mfrac>
+        <mrow>
+          <mi>x</mi>
+          <mo>+</mo>
+          <mn>4</mn>
+        </mrow>
+        <msqrt>
+          <mi>y</mi>
+        </msqrt>
+      </mfrac>
+    '''
+    tree = mml2tree(tree_mml)
+    expr = tree2expr(tree)
+    assert expr == sympify(tree2sympy(mml2tree(tree_mml)), evaluate=False)
+
+
+def test_mml2exprs():
+    mml = '''
+        <math xmlns="http://www.w3.org/1998/Math/MathML">
+          <mstyle displaystyle="true">
+            <mtable columnalign="left">
+              <mtr>
+                <mtd>
+                  <mn> 2 </mn>
+                  <mi> x </mi>
+                  <mo> - </mo>
+                  <mn> 4 </mn>
+                  <mo> = </mo>
+                  <mn> 7 </mn>
+                </mtd>
+              </mtr>
+              <mtr>
+                <mtd>
+                  <mi> x </mi>
+                  <mo> = </mo>
+                  <mfrac>
+                    <mrow>
+                      <mn> 11 </mn>
+                    </mrow>
+                    <mrow>
+                      <mn> 2 </mn>
+                    </mrow>
+                  </mfrac>
+                </mtd>
+              </mtr>
+            </mtable>
+          </mstyle>
+        </math>
+    '''
+    exprs = mml2exprs(mml)
+    assert len(exprs) == 2
+    assert exprs == [sympify(s, evaluate=False) for s in mml2sympy(mml)]
+
+
+def test_classify_leaf():
+    assert _classify_leaf(' 2 ') == (LEAF_INTEGER, '2')
+    assert _classify_leaf('-4') == (LEAF_INTEGER, '-4')
+    assert _classify_leaf('0') == (LEAF_INTEGER, '0')
+    assert _classify_leaf('3.14') == (LEAF_FLOAT, '3.14')
+    assert _classify_leaf('.5') == (LEAF_FLOAT, '.5')
+    assert _classify_leaf('-2.5e-3') == (LEAF_FLOAT, '-2.5e-3')
+    assert _classify_leaf('6E23') == (LEAF_FLOAT, '6E23')
+    assert _classify_leaf(' x ') == (LEAF_SYMBOL, 'x')
+    assert _classify_leaf('θ') == (LEAF_SYMBOL, 'θ')
+    assert _classify_leaf('abc') == (LEAF_SYMBOL, 'abc')
+    assert _classify_leaf('2x') == (LEAF_SYMBOL, '2x')
+    assert _classify_leaf('e') == (LEAF_SYMBOL, 'e')
+
+
+def test_modify_in_place():
+    modify_mml = '''
+        <mtd>
+          <mn> 2 </mn>
+          <mi> x </mi>
+          <mo> - </mo>
+          <mn> 4 </mn>
+          <mo> = </mo>
+          <mn> 7 </mn>
+        </mtd>
+    '''
+    tree = mml2tree(modify_mml)
+    mi = tree.mi
+    modified_tree = modify(tree)
+    assert modified_tree is tree
+    assert modified_tree.meq.madd.mmul.mi is mi
+    assert b'py:pytype' not in etree.tostring(modified_tree)
+
+
+def test_tree2sympy_leaves_tree_unchanged():
+    from mml2sympy.binary import tree2binary
+    from mml2sympy.hashing import tree2fingerprint
+
+    tree = modify(mml2tree('''
+        <mtd>
+          <mn>2</mn>
+          <mfenced><mrow><mi>x</mi><mo>-</mo><mn>4</mn></mrow></mfenced>
+          <mo>=</mo>
+          <msqrt><mi>y</mi><mo>+</mo><mn>1</mn></msqrt>
+        </mtd>
+    '''))
+    before = etree.tostring(tree)
+    for convert in [tree2sympy, tree2expr, tree2binary, tree2fingerprint]:
+        assert convert(tree) == convert(tree)
+        assert etree.tostring(tree) == before
+    assert sympify(tree2sympy(tree), evaluate=False) == tree2expr(tree)
+    x, y = Symbol('x'), Symbol('y')
+    assert tree2expr(tree).doit() == Eq(2 * (x - 4), sqrt(y + 1))
+
+
+def test_msqrt_inferred_mrow():
+    from mml2sympy import fingerprint
+    from mml2sympy.binary import binary2exprs, mml2binary
+
+    mml = '<math><mstyle><msqrt>{0}</msqrt></mstyle></math>'
+    several = mml.format('<mi>y</mi><mo>+</mo><mn>1</mn>')
+    one = mml.format('<mrow><mi>y</mi><mo>+</mo><mn>1</mn></mrow>')
+    expected = "Pow(Add(Symbol('y'),Integer(1),evaluate=False),Rational(1,2),evaluate=False)"
+    assert mml2sympy(several) == mml2sympy(one) == [expected]
+    assert mml2exprs(several)[0].doit() == sqrt(Symbol('y') + 1)
+    assert binary2exprs(mml2binary(several)) == mml2exprs(several)
+    assert fingerprint(several) == fingerprint(one)
+    assert fingerprint(several) != fingerprint(mml.format('<mi>y</mi>'))
+
+
+def test_modify_precedence():
+    modify_mml = '''
+        <mtd>
+          <mn>2</mn>
+          <mfenced>
+            <mrow>
+              <mi>x</mi>
+              <mo>-</mo>
+              <mn>4</mn>
+            </mrow>
+          </mfenced>
+          <mo>=</mo>
+          <mn>6</mn>
+          <mi>x</mi>
+          <mo>/</mo>
+          <mn>3</mn>
+          <mo>&#x00D7;</mo>
+          <mi>y</mi>
+        </mtd>
+    '''
+    modify_to_mml = flatten_string('''
+            <mtd>
+              <meq>
+                <mmul>
+                  <mn>2</mn>
+                  <mfenced>
+                    <mrow>
+                      <mi>x</mi>
+                      <mo>-</mo>
+                      <mn>4</mn>
+                    </mrow>
+                  </mfenced>
+                </mmul>
+                <mmul>
+                  <mfrac>
+                    <mmul>
+                      <mn>6</mn>
+                      <mi>x</mi>
+                    </mmul>
+                    <mn>3</mn>
+                  </mfrac>
+                  <mi>y</mi>
+                </mmul>
+              </meq>
+            </mtd>
+        ''')
+    tree = mml2tree(modify_mml)
+    modified_tree = modify(tree)
+    assert etree.tostring(modified_tree).decode('utf-8') == modify_to_mml
+
+
+def test_modify_unary_minus():
+    modify_mml = '''
+        <mtd>
+          <mi>x</mi>
+          <mo>=</mo>
+          <mo>-</mo>
+          <mn>2</mn>
+          <mi>y</mi>
+        </mtd>
+    '''
+    modify_to_mml = flatten_string('''
+            <mtd>
+              <meq>
+                <mi>x</mi>
+                <mmul>
+                  <mmul>
+                    <mn> -1 </mn>
+                    <mn>2</mn>
+                  </mmul>
+                  <mi>y</mi>
+                </mmul>
+              </meq>
+            </mtd>
+        ''').replace('<mn>-1</mn>', '<mn> -1 </mn>')
+    tree = mml2tree(modify_mml)
+    modified_tree = modify(tree)
+    assert etree.tostring(modified_tree).decode('utf-8') == modify_to_mml
+
+
+def test_modify_binary_minus():
+    modify_mml = '''
+        <mtd>
+          <mi>a</mi>
+          <mo>-</mo>
+          <mi>b</mi>
+          <mo>+</mo>
+          <mi>c</mi>
+          <mo>-</mo>
+          <mn>2</mn>
+          <mi>d</mi>
+        </mtd>
+    '''
+    modify_to_mml = flatten_string('''
+            <mtd>
+              <madd>
+                <mi>a</mi>
+                <mmul>
+                  <mn> -1 </mn>
+                  <mi>b</mi>
+                </mmul>
+                <mi>c</mi>
+                <mmul>
+                  <mn> -1 </mn>
+                  <mmul>
+                    <mn>2</mn>
+                    <mi>d</mi>
+                  </mmul>
+                </mmul>
+              </madd>
+            </mtd>
+        ''').replace('<mn>-1</mn>', '<mn> -1 </mn>')
+    tree = mml2tree(modify_mml)
+    modified_tree = modify(tree)
+    assert etree.tostring(modified_tree).decode('utf-8') == modify_to_mml
+    assert mml2sympy('<math><mstyle><mi>a</mi><mo>-</mo><mi>b</mi></mstyle></math>') != \
+        mml2sympy('<math><mstyle><mi>a</mi><mo>+</mo><mi>b</mi></mstyle></math>')
+
+
+def test_subtree_memo():
+    row = '''
+        <mtr>
+          <mtd>
+            <mfrac>
+              <mrow>
+                <mi> x </mi>
+                <mo> + </mo>
+                <mn> 1 </mn>
+              </mrow>
+              <mn> 2 </mn>
+            </mfrac>
+            <mo> = </mo>
+            <mn> {0} </mn>
+          </mtd>
+        </mtr>
+    '''
+    mml = '''
+        <math xmlns="http://www.w3.org/1998/Math/MathML">
+          <mstyle displaystyle="true">
+            <mtable>{0}</mtable>
+          </mstyle>
+        </math>
+    '''.format(''.join(row.format(n) for n in range(3)))
+    assert mml2sympy(mml, memoize=True) == mml2sympy(mml)
+    assert mml2exprs(mml, memoize=True) == mml2exprs(mml)
+
+    memo = SubtreeMemo()
+    for step_tree in mml2steptrees(mml):
+        tree2sympy(modify(step_tree), memo=memo)
+    assert memo.misses == 6  # meq of each row, the mfrac, its mrow and madd
+    assert memo.hits == 2  # the mfrac of the last two rows
+
+
+def test_modify_mo_fences():
+    modify_mml = '''
+        <mtd>
+          <mn>2</mn>
+          <mo>(</mo>
+          <mi>x</mi>
+          <mo>+</mo>
+          <mn>1</mn>
+          <mo>)</mo>
+          <mo>=</mo>
+          <mn>4</mn>
+        </mtd>
+    '''
+    modify_to_mml = flatten_string('''
+            <mtd>
+              <meq>
+                <mmul>
+                  <mn>2</mn>
+                  <madd>
+                    <mi>x</mi>
+                    <mn>1</mn>
+                  </madd>
+                </mmul>
+                <mn>4</mn>
+              </meq>
+            </mtd>
+        ''')
+    tree = mml2tree(modify_mml)
+    modified_tree = modify(tree)
+    assert etree.tostring(modified_tree).decode('utf-8') == modify_to_mml
+
+
+def test_deep_nesting():
+    depth = 2000
+    mml = '<math><mstyle>{0}<mi>x</mi>{1}</mstyle></math>'.format(
+        '<mrow><mfenced>' * (depth // 2), '</mfenced></mrow>' * (depth // 2))
+    assert mml2sympy(mml) == ["Symbol('x')"]
+
+    roots = '<math><mstyle>{0}<mi>x</mi>{1}</mstyle></math>'.format(
+        '<msqrt>' * depth, '</msqrt>' * depth)
+    srepr_string, = mml2sympy(roots)
+    assert srepr_string.count('Pow(') == depth
+    expr, = mml2exprs(roots, memoize=True)
+    assert expr.has(sympify('x'))
+
+    # flat runs of mo fences and prefix ops are parsed without recursion
+    fences = '<mtd>{0}<mi>x</mi>{1}</mtd>'.format(
+        '<mo>(</mo>' * depth, '<mo>)</mo>' * depth)
+    assert tree2sympy(modify(mml2tree(fences))) == "Symbol('x')"
+    minuses = '<mtd>{0}<mi>x</mi></mtd>'.format('<mo>-</mo>' * depth)
+    assert tree2sympy(modify(mml2tree(minuses))).count('Integer(-1)') == depth
+
+
+def test_tree2sympy_out(monkeypatch):
+    mml = '''
+        <mtd>
+          <mfenced>
+            <mtable>
+              <mtr><mtd><mfrac><mi>x</mi><mn>2</mn></mfrac></mtd><mtd><mn>0</mn></mtd></mtr>
+              <mtr><mtd><mn>1.5</mn></mtd><mtd><mfrac><mi>x</mi><mn>2</mn></mfrac></mtd></mtr>
+            </mtable>
+          </mfenced>
+          <mo>=</mo>
+          <msqrt><mi>y</mi></msqrt>
+        </mtd>
+    '''
+    expected = tree2sympy(modify(mml2tree(mml)))
+    assert expected.startswith("Eq(ImmutableMatrix([[Mul(Symbol('x'),Pow(")
+
+    out, memo = io.StringIO(), SubtreeMemo()
+    assert tree2sympy(modify(mml2tree(mml)), memo=memo, out=out) is None
+    assert out.getvalue() == expected
+    assert memo.hits == 1  # the second mfrac
+
+    # subtrees partly written out before they end are not memoized
+    monkeypatch.setattr('mml2sympy.mml.OUT_CHUNK_PIECES', 2)
+    out, memo = io.StringIO(), SubtreeMemo()
+    tree2sympy(modify(mml2tree(mml)), memo=memo, out=out)
+    assert out.getvalue() == expected
+    assert tree2sympy(modify(mml2tree(mml)), memo=memo) == expected
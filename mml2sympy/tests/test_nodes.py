@@ -0,0 +1,49 @@
+from lxml import etree
+from mml2sympy import mml2tree, modify, tree2sympy, tree2expr
+from mml2sympy.nodes import Node, element2node, node2element
+
+
+MML = '''
+    <mtd>
+      <mn> 2 </mn>
+      <mfenced>
+        <mrow>
+          <mi> x </mi>
+          <mo> - </mo>
+          <mn> 4 </mn>
+        </mrow>
+      </mfenced>
+      <!-- a comment -->
+      <mo> = </mo>
+      <mo> - </mo>
+      <mfrac>
+        <mn> 1 </mn>
+        <mi> y </mi>
+      </mfrac>
+    </mtd>
+'''
+
+
+def test_element2node():
+    node = element2node(mml2tree(MML))
+    assert node.tag == 'mtd'
+    assert node.text is None
+    assert len(node.children) == 5
+    assert node.children[0] == Node('mn', '2', ())
+    assert node.children[1].children[0].children[1] == Node('mo', '-', ())
+    assert etree.tostring(node2element(node)) == \
+        b'<mtd><mn>2</mn><mfenced><mrow><mi>x</mi><mo>-</mo><mn>4</mn>' \
+        b'</mrow></mfenced><mo>=</mo><mo>-</mo>' \
+        b'<mfrac><mn>1</mn><mi>y</mi></mfrac></mtd>'
+
+
+def test_modify_node():
+    node = element2node(mml2tree(MML))
+    modified_node = modify(node)
+    assert modified_node is not node
+    assert node == element2node(mml2tree(MML))  # nodes are immutable
+
+    modified_tree = modify(mml2tree(MML))
+    assert modified_node == element2node(modified_tree)
+    assert tree2sympy(modified_node) == tree2sympy(modified_tree)
+    assert tree2expr(modified_node) == tree2expr(modified_tree)
@@ -0,0 +1,62 @@
+import pytest
+
+from mml2sympy import mml2tree, modify
+from mml2sympy.numeric import compile_step, mml2funcs
+
+numpy = pytest.importorskip('numpy')
+
+
+MML = '''
+    <math xmlns="http://www.w3.org/1998/Math/MathML">
+      <mstyle displaystyle="true">
+        <mtable>
+          <mtr>
+            <mtd>
+              <mn> 2 </mn>
+              <mi> y </mi>
+              <mo> + </mo>
+              <mfrac>
+                <mi> x </mi>
+                <mn> 2 </mn>
+              </mfrac>
+              <mo> = </mo>
+              <mn> 7 </mn>
+            </mtd>
+          </mtr>
+          <mtr>
+            <mtd>
+              <msup>
+                <mi> θ </mi>
+                <mn> 2 </mn>
+              </msup>
+            </mtd>
+          </mtr>
+          <mtr>
+            <mtd>
+              <mn> 3.5 </mn>
+            </mtd>
+          </mtr>
+        </mtable>
+      </mstyle>
+    </math>
+'''
+
+
+def test_mml2funcs():
+    equation, power, constant = mml2funcs(MML)
+    assert equation.symbols == ['y', 'x']
+    assert equation(1.0, 2.0) == -4.0
+    assert equation.evaluate([[1, 2], [3, 4]]).tolist() == [-4.0, 1.0]
+    assert equation.evaluate({'x': [2, 4], 'y': [1, 3]}).tolist() == [-4.0, 1.0]
+
+    assert power.symbols == ['θ']
+    assert power.evaluate(numpy.array([1.0, 2.0, 3.0])).tolist() == [1, 4, 9]
+
+    assert constant.symbols == []
+    assert constant.evaluate(numpy.empty((3, 0))).tolist() == [3.5] * 3
+
+
+def test_compile_step_cache():
+    first = compile_step(modify(mml2tree('<mtd><mi> x </mi><mo>+</mo><mn>1</mn></mtd>')))
+    second = compile_step(modify(mml2tree('<mtd><mi>x</mi><mo> + </mo><mn> 1 </mn></mtd>')))
+    assert first is second
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from mml2sympy import mml2steps, mml2sympy
+from mml2sympy.aio import AsyncConverter
+from mml2sympy.server import MMLServer
+
+MML = '<math><mstyle><mn>{0}</mn><mi>x</mi><mo>=</mo><mn>7</mn></mstyle></math>'
+
+
+async def request(port, method, path, payload=None):
+    ' ~> returns (status, JSON payload) of one request on a new connection '
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write('{0} {1} HTTP/1.1\r\nContent-Length: {2}\r\n'
+                 'Connection: close\r\n\r\n'.format(method, path, len(body))
+                 .encode('latin-1') + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ')[1]), json.loads(body.decode('utf-8'))
+
+
+def test_server():
+    async def main():
+        executor = ThreadPoolExecutor(2)
+        converter = AsyncConverter(max_pending=8, executor=executor)
+        server = await MMLServer(converter).start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            responses = await asyncio.gather(
+                request(port, 'POST', '/mml2sympy', {'mml': MML.format(2)}),
+                request(port, 'POST', '/mml2steps', {'mml': MML.format(3)}),
+                request(port, 'POST', '/mml2sympy',
+                        {'documents': [MML.format(4), '<math>']}),
+                request(port, 'POST', '/mml2sympy', {'mml': '<math>'}),
+                request(port, 'GET', '/health'),
+                request(port, 'POST', '/nothing', {}),
+                request(port, 'POST', '/mml2sympy', {'xml': ''}),
+                request(port, 'POST', '/mml2sympy',
+                        {'documents': MML.format(5)}))
+        executor.shutdown()
+        return responses
+
+    single, steps, batch, error, health, missing, bad, single_document = \
+        asyncio.run(main())
+    assert single == (200, {'result': mml2sympy(MML.format(2))})
+    assert steps == (200, {'result': mml2steps(MML.format(3))})
+    status, payload = batch
+    assert payload['results'][0] == {'result': mml2sympy(MML.format(4))}
+    assert payload['results'][1]['error'] == 'MMLParseError'
+    assert error[0] == 422 and error[1]['error'] == 'MMLParseError'
+    assert health[0] == 200 and health[1]['status'] == 'ok'
+    assert missing[0] == 404
+    assert bad[0] == 400
+    assert single_document[0] == 400
+
+
+def test_server_busy():
+    async def main():
+        executor = ThreadPoolExecutor(1)
+        converter = AsyncConverter(max_pending=1, max_queued=0,
+                                   executor=executor)
+        server = await MMLServer(converter).start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        documents = [MML.format(n) for n in range(40)]
+        async with server:
+            batch = asyncio.ensure_future(request(
+                port, 'POST', '/mml2sympy', {'documents': documents}))
+            while not converter.pending:
+                await asyncio.sleep(0.001)
+            busy = await request(port, 'POST', '/mml2sympy',
+                                 {'mml': MML.format(1)})
+            batch = await batch
+        executor.shutdown()
+        return batch, busy
+
+    batch, busy = asyncio.run(main())
+    assert busy[0] == 503
+    # the batch took its chunks one slot at a time
+    assert batch[0] == 200 and len(batch[1]['results']) == 40
@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mml2sympy.steps import TierStats, _call_with_timeout, check_steps
+
+ROW = '<mtr><mtd>{0}</mtd></mtr>'
+MML = '<math xmlns="http://www.w3.org/1998/Math/MathML"><mtable>{0}</mtable></math>'
+
+
+def derivation(*rows):
+    return MML.format(''.join(ROW.format(row) for row in rows))
+
+
+EQUATION = '<mn>2</mn><mi>x</mi><mo>+</mo><mn>4</mn><mo>=</mo><mn>10</mn>'
+STEPS = derivation(
+    EQUATION,
+    EQUATION,
+    '<mn>2</mn><mi>x</mi><mo>=</mo><mn>6</mn>',
+    '<mi>x</mi><mo>=</mo><mn>3</mn>',
+    '<mi>x</mi><mo>=</mo><mn>4</mn>',
+)
+
+
+def test_check_steps():
+    pytest.importorskip('numpy')
+    stats = TierStats()
+    checks = check_steps(STEPS, stats=stats)
+    assert [(c.index, c.equivalent, c.tier) for c in checks] == [
+        (1, True, 'structural'),
+        (2, True, 'numeric'),
+        (3, True, 'numeric'),
+        (4, False, 'numeric'),
+    ]
+    assert stats.runs == {'structural': 4, 'numeric': 3, 'symbolic': 0}
+    assert stats.decided['structural'] == 1
+
+
+def test_check_steps_symbolic():
+    # without sample points the numeric tier is inconclusive
+    stats = TierStats()
+    checks = check_steps(STEPS, samples=0, stats=stats)
+    assert [c.equivalent for c in checks] == [True, True, True, False]
+    assert [c.tier for c in checks[1:]] == ['symbolic'] * 3
+    assert stats.decided['symbolic'] == 3
+
+    expressions = derivation(
+        '<msup><mrow><mi>x</mi><mo>+</mo><mn>1</mn></mrow><mn>2</mn></msup>',
+        '<msup><mi>x</mi><mn>2</mn></msup><mo>+</mo><mn>2</mn><mi>x</mi>'
+        '<mo>+</mo><mn>1</mn>',
+    )
+    assert check_steps(expressions, samples=0) == [(1, True, 'symbolic')]
+
+
+def test_check_steps_subtraction():
+    pytest.importorskip('numpy')
+    steps = derivation(
+        '<mn>2</mn><mi>x</mi><mo>-</mo><mn>4</mn><mo>=</mo><mn>6</mn>',
+        '<mn>2</mn><mi>x</mi><mo>=</mo><mn>10</mn>',
+        '<mi>x</mi><mo>-</mo><mn>5</mn><mo>=</mo><mn>0</mn>',
+        '<mi>x</mi><mo>+</mo><mn>5</mn><mo>=</mo><mn>0</mn>',
+    )
+    assert check_steps(steps) == [
+        (1, True, 'numeric'),
+        (2, True, 'numeric'),
+        (3, False, 'numeric'),
+    ]
+    assert [c.equivalent for c in check_steps(steps, samples=0)] == \
+        [True, True, False]
+
+
+def test_check_steps_deep():
+    # deeper than the recursion limit, as a namedtuple compares
+    nested = '<msqrt>' * 1900 + '<mi>{0}</mi>' + '</msqrt>' * 1900
+    steps = derivation(nested.format('x'), nested.format('x'),
+                       nested.format('y'))
+    checks = check_steps(steps, timeout=None)
+    assert checks[0] == (1, True, 'structural')
+    assert checks[1] == (2, None, 'symbolic')
+
+
+def test_call_with_timeout():
+    assert _call_with_timeout(pow, 1.0, 2, 3) == 8
+    with pytest.raises(TimeoutError):
+        _call_with_timeout(time.sleep, 0.05, 1.0)
+
+
+def test_call_with_timeout_thread():
+    # off the main thread, func runs in a thread of its own
+    def call(*args):
+        with ThreadPoolExecutor(1) as executor:
+            return executor.submit(_call_with_timeout, *args).result()
+
+    assert call(pow, 1.0, 2, 3) == 8
+    assert call(lambda: None, 1.0) is None
+    start = time.perf_counter()
+    with pytest.raises(ValueError):
+        call(int, 5.0, 'x')
+    assert time.perf_counter() - start < 1.0
+    with pytest.raises(TimeoutError):
+        call(time.sleep, 0.05, 1.0)
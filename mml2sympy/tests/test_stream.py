@@ -0,0 +1,41 @@
+import io
+
+from mml2sympy import mml2sympy, mml2steps, mml2sympy_stream, DocumentError
+
+
+MML = '''
+    <math xmlns="http://www.w3.org/1998/Math/MathML">
+      <mstyle displaystyle="true">
+        <mn> {0} </mn>
+        <mi> x </mi>
+        <mo> = </mo>
+        <mn> 7 </mn>
+      </mstyle>
+    </math>
+'''
+
+
+def archive(documents):
+    answers = ''.join('<answer>{0}</answer>'.format(document)
+                      for document in documents)
+    return io.BytesIO('<answers>{0}</answers>'.format(answers).encode('utf-8'))
+
+
+def test_mml2sympy_stream():
+    documents = [MML.format(n) for n in range(5)]
+    results = list(mml2sympy_stream(archive(documents)))
+    assert [index for index, _ in results] == list(range(5))
+    assert [steps for _, steps in results] == \
+        [mml2sympy(document) for document in documents]
+
+    results = list(mml2sympy_stream(archive(documents), func=mml2steps))
+    assert results[0][1] == mml2steps(documents[0])
+
+
+def test_mml2sympy_stream_errors():
+    documents = [MML.format(1), '<math><mo>=</mo></math>', MML.format(2)]
+    results = list(mml2sympy_stream(archive(documents)))
+    assert len(results) == 3
+    assert isinstance(results[1][1], DocumentError)
+    assert results[1][1].error == 'MMLStructureError'
+    assert results[2][1] == mml2sympy(documents[2])
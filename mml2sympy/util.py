@@ -1,16 +1,27 @@
-import itertools
+import re
 
-
-def isplit(iterable, splitters):
-    '''
-    Splits an iterable into 2d list based on a value in splitters
-
-    http://stackoverflow.com/questions/4322705/split-a-list-into-nested-lists-on-a-value
-    '''
-    return [list(g) for k, g
-            in itertools.groupby(iterable, lambda x:x in splitters) if not k]
+# the default xmlns declarations (quoted either way) and the whitespace
+# between tags, for str and bytes
+XMLNS_RE = re.compile(r'(<[^<>]*?)\s+xmlns\s*=\s*(?:"[^"]*"|\'[^\']*\')')
+XMLNS_BYTES_RE = re.compile(XMLNS_RE.pattern.encode('ascii'))
+TAG_WHITESPACE_RE = re.compile(r'>\s+<')
+TAG_WHITESPACE_BYTES_RE = re.compile(TAG_WHITESPACE_RE.pattern.encode('ascii'))
 
 
 def flatten_string(s):
     ''' Flattens a readable new line mml string into one line '''
     return ''.join(s.split())
+
+
+def normalize_mml(mml):
+    '''
+    Normalizes an mml str or bytes for use as a cache key: drops the
+    default xmlns declarations, which mml2tree strips and the whitespace between
+    tags, which the parser drops too. Leaf text is kept verbatim, since
+    mml2steps returns it as is.
+    '''
+    if isinstance(mml, str):
+        mml = XMLNS_RE.sub(r'\1', mml)
+        return TAG_WHITESPACE_RE.sub('><', mml).strip()
+    mml = XMLNS_BYTES_RE.sub(br'\1', mml)
+    return TAG_WHITESPACE_BYTES_RE.sub(b'><', mml).strip()
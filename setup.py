@@ -2,6 +2,8 @@ from setuptools import setup, find_packages
 setup(
 	name='mml2sympy', 
 	version='0.3.1',
-	packages=find_packages(exclude=['tests']),
+	packages=find_packages(exclude=['tests', 'benchmarks', 'benchmarks.*']),
 	install_requires=['sympy', 'lxml'],
+	extras_require={'numeric': ['numpy']},
+	entry_points={'console_scripts': ['mml2sympy=mml2sympy.cli:main']},
 )